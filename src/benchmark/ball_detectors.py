@@ -0,0 +1,94 @@
+import argparse
+import json
+from time import perf_counter
+import numpy as np
+
+from ..capture.replay_source import ReplayFrameSource
+from ..detection.ball_detectors import BALL_DETECTORS
+from ..detection.detector import Detector
+
+
+def load_frames(path: str) -> list[np.ndarray]:
+    """
+    Loads all the frames of a recording (video file, folder of frames or single image).
+    """
+    with ReplayFrameSource(path) as source:
+        return list(source)
+
+
+def compare_ball_detectors(frames: list[np.ndarray], labels: list[tuple[int, int, int] | None] | None = None,
+                           reference: str = "hough", repeat: int = 10) -> list[dict]:
+    """
+    Measures the latency and hit rate of every registered ball detector on a set of frames.
+
+    Parameters
+    ----------
+    `frames` : `list[np.ndarray]`
+        The recorded frames.
+    `labels` : `list[tuple[int, int, int] | None] | None`, optional
+        The labeled (x, y, r) ball of each frame in frame coordinates, `None` for frames without ball.
+        If `None`, the detections of the `reference` detector are used as labels, by default `None`
+    `reference` : `str`, optional
+        The detector used as ground truth without labels, by default `"hough"`
+    `repeat` : `int`, optional
+        Number of timed runs of each detector on each frame, by default `10`
+
+    Returns
+    -------
+    `list[dict]`
+        One result per detector, sorted by mean latency.
+    """
+    bands = [Detector.preprocessor.process(frame) for frame in frames]
+    for band in bands:
+        band.gray
+    if labels is None:
+        labels = []
+        for frame, band in zip(frames, bands):
+            ball = Detector.detect_ball(frame, band, reference)
+            labels.append(tuple(int(v) for v in ball) if ball[2] else None)
+
+    results = []
+    for name, find_ball in BALL_DETECTORS.items():
+        latencies = []
+        hits = 0
+        for band, label in zip(bands, labels):
+            for _ in range(repeat):
+                start = perf_counter()
+                x, y, r = find_ball(band.gray, band.height)
+                latencies.append(perf_counter() - start)
+            found = bool(r)
+            if label is None:
+                hits += not found
+            elif found:
+                factor = band.resize_factor
+                x, y = int(x) * factor, (int(y) + band.crop_y1) * factor
+                hits += np.hypot(x - label[0], y - label[1]) <= max(label[2], 1) / 2
+        latencies_ms = np.array(latencies) * 1000
+        results.append({
+            "detector": name,
+            "mean_ms": float(latencies_ms.mean()),
+            "p50_ms": float(np.percentile(latencies_ms, 50)),
+            "p95_ms": float(np.percentile(latencies_ms, 95)),
+            "hit_rate": hits / len(bands),
+        })
+    return sorted(results, key=lambda result: result["mean_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the latency and hit rate of the ball detectors on recorded frames.")
+    parser.add_argument("path", nargs="?", default="images", help="Video file, folder of frames or image")
+    parser.add_argument("--labels", help="JSON file with the [x, y, r] ball (or null) of each frame, in order")
+    parser.add_argument("--reference", default="hough", help="Detector used as ground truth without labels")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of timed runs per frame")
+    args = parser.parse_args()
+
+    labels = None
+    if args.labels:
+        with open(args.labels) as file:
+            labels = [tuple(label) if label else None for label in json.load(file)]
+
+    results = compare_ball_detectors(load_frames(args.path), labels, args.reference, args.repeat)
+    print(f"{'Detector':<12}{'Mean (ms)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}{'Hit rate':>12}")
+    for result in results:
+        print(f"{result['detector']:<12}{result['mean_ms']:>12.3f}{result['p50_ms']:>12.3f}"
+              f"{result['p95_ms']:>12.3f}{result['hit_rate']:>12.1%}")
@@ -0,0 +1,110 @@
+import argparse
+from time import perf_counter
+import cv2
+import numpy as np
+
+from ..detection.detector import Detector
+from ..detection.edge_detectors import EDGE_DETECTORS
+from .ball_detectors import load_frames
+
+
+def _draw_lines(lines: np.ndarray | None, shape: tuple[int, int]) -> np.ndarray:
+    """
+    Rasterizes lines with a thickness of 1 pixel.
+    """
+    image = np.zeros(shape, dtype=np.uint8)
+    if lines is not None:
+        for x1, y1, x2, y2 in lines.reshape(-1, 4):
+            cv2.line(image, (int(x1), int(y1)), (int(x2), int(y2)), 255, 1)
+    return image
+
+
+def _matched_pixels(lines: np.ndarray, others: np.ndarray, tolerance: float) -> tuple[int, int]:
+    """
+    Counts the pixels of rasterized lines within a distance of other rasterized lines, and the total of their pixels.
+    """
+    pixels = lines > 0
+    if not others.any():
+        return 0, int(pixels.sum())
+    distance = cv2.distanceTransform(cv2.bitwise_not(others), cv2.DIST_L2, 3)
+    return int((distance[pixels] <= tolerance).sum()), int(pixels.sum())
+
+
+def compare_edge_detectors(frames: list[np.ndarray], reference: str = "hough", repeat: int = 10,
+                           tolerance: float = 2) -> list[dict]:
+    """
+    Measures the latency of every registered path edges detector on a set of frames,
+    and how its lines match those of the reference detector.
+
+    The recall is the share of the pixels of the reference lines within `tolerance` of the lines of a detector,
+    and the precision the share of the pixels of its lines within `tolerance` of the reference lines.
+
+    Parameters
+    ----------
+    `frames` : `list[np.ndarray]`
+        The recorded frames.
+    `reference` : `str`, optional
+        The detector used as ground truth, by default `"hough"`
+    `repeat` : `int`, optional
+        Number of timed runs of each detector on each frame, by default `10`
+    `tolerance` : `float`, optional
+        The maximum distance between matching lines, in band pixels, by default `2`
+
+    Returns
+    -------
+    `list[dict]`
+        One result per detector, sorted by mean latency.
+    """
+    bands = [Detector.preprocessor.process(frame) for frame in frames]
+    references = [_draw_lines(EDGE_DETECTORS[reference](band.bgr, band.height), band.bgr.shape[:2]) for band in bands]
+
+    results = []
+    for name, find_edge_lines in EDGE_DETECTORS.items():
+        latencies = []
+        counts = np.zeros(4, dtype=np.int64)  # Matched & total pixels of the reference lines, then of the detected lines
+        lines_count = 0
+        for band, expected in zip(bands, references):
+            for _ in range(repeat):
+                start = perf_counter()
+                lines = find_edge_lines(band.bgr, band.height)
+                latencies.append(perf_counter() - start)
+            lines_count += 0 if lines is None else len(lines)
+            detected = _draw_lines(lines, band.bgr.shape[:2])
+            counts += (*_matched_pixels(expected, detected, tolerance), *_matched_pixels(detected, expected, tolerance))
+        latencies_ms = np.array(latencies) * 1000
+        results.append({
+            "detector": name,
+            "mean_ms": float(latencies_ms.mean()),
+            "p50_ms": float(np.percentile(latencies_ms, 50)),
+            "p95_ms": float(np.percentile(latencies_ms, 95)),
+            "lines": lines_count / len(bands),
+            "recall": counts[0] / counts[1] if counts[1] else 1.0,
+            "precision": counts[2] / counts[3] if counts[3] else 1.0,
+        })
+    return sorted(results, key=lambda result: result["mean_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the latency and the lines of the path edges detectors on recorded frames.")
+    parser.add_argument("path", nargs="?", default="images", help="Video file, folder of frames or image")
+    parser.add_argument("--reference", default="hough", help="Detector used as ground truth")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of timed runs per frame")
+    parser.add_argument("--simulator", type=int, default=0, help="Number of simulated frames added to the recorded ones")
+    args = parser.parse_args()
+
+    frames = load_frames(args.path)
+    if args.simulator:
+        from ..simulation.simulator import ZigZagSimulator
+
+        simulator = ZigZagSimulator(realtime=False, game_over_screen=None)
+        for i in range(args.simulator * 10):
+            frame = simulator.read()
+            # A frame every 10 simulated frames, so the path changes between them
+            if i % 10 == 0:
+                frames.append(frame.copy())
+
+    results = compare_edge_detectors(frames, args.reference, args.repeat)
+    print(f"{'Detector':<12}{'Mean (ms)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}{'Lines':>8}{'Recall':>10}{'Precision':>11}")
+    for result in results:
+        print(f"{result['detector']:<12}{result['mean_ms']:>12.3f}{result['p50_ms']:>12.3f}{result['p95_ms']:>12.3f}"
+              f"{result['lines']:>8.1f}{result['recall']:>10.1%}{result['precision']:>11.1%}")
@@ -0,0 +1,90 @@
+import os
+from time import perf_counter
+import cv2
+import numpy as np
+
+from ..detection.detector import Detector
+from ..detection.preprocessor import FramePreprocessor
+from ..utils import crop_centered
+
+
+def check_equivalence(frame: np.ndarray, preprocessor: FramePreprocessor) -> bool:
+    """
+    Checks that the shared preprocessing gives the same band as resizing the whole frame then cropping it,
+    which guarantees the detections are unchanged.
+
+    Parameters
+    ----------
+    `frame` : `np.ndarray`
+        The frame to check.
+    `preprocessor` : `FramePreprocessor`
+        The preprocessing stage to check.
+
+    Returns
+    -------
+    `bool`
+        `True` if both bands are identical; otherwise, `False`.
+    """
+    factor = preprocessor.resize_factor
+    resized = cv2.resize(frame, (0, 0), fx=1/factor, fy=1/factor)
+    expected, crop_y1, _ = crop_centered(resized, preprocessor.center_ratio, preprocessor.crop_ratio)
+    band = preprocessor.process(frame)
+    return band.crop_y1 == crop_y1 and np.array_equal(band.bgr, expected)
+
+
+def time_per_frame(func, frames: list[np.ndarray], repeat: int) -> float:
+    """
+    Measures the average time of a function over a set of frames.
+
+    Returns
+    -------
+    `float`
+        The average time per frame, in milliseconds.
+    """
+    start = perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            func(frame)
+    return (perf_counter() - start) * 1000 / (repeat * len(frames))
+
+
+def benchmark(frame_paths: list[str], repeat: int = 50) -> None:
+    """
+    Compares the per-frame cost of the legacy resize-then-crop preprocessing with the shared preprocessing stage,
+    and checks both give the same detection band.
+
+    Parameters
+    ----------
+    `frame_paths` : `list[str]`
+        Paths of the recorded frames to benchmark on.
+    `repeat` : `int`, optional
+        Number of passes over the frames, by default `50`
+    """
+    frames = [cv2.imread(path) for path in frame_paths]
+    preprocessor = FramePreprocessor()
+
+    for path, frame in zip(frame_paths, frames):
+        band = preprocessor.process(frame)
+        ball = Detector.detect_ball(frame, band)
+        lines = Detector.detect_path_edges(frame, band)
+        print(f"{os.path.basename(path)}: ball={tuple(int(v) for v in ball)}, "
+              f"lines={0 if lines is None else len(lines)}, same band: {check_equivalence(frame, preprocessor)}")
+
+    def legacy_preprocess(frame):
+        for conversion in (cv2.COLOR_BGR2GRAY, cv2.COLOR_BGR2HSV):
+            resized = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
+            cropped_frame, _, _ = crop_centered(resized, 0.47, 0.10)
+            cv2.cvtColor(cropped_frame, conversion)
+
+    def shared_preprocess(frame):
+        band = preprocessor.process(frame)
+        band.gray, band.hsv
+
+    legacy_ms = time_per_frame(legacy_preprocess, frames, repeat)
+    shared_ms = time_per_frame(shared_preprocess, frames, repeat)
+    print(f"Preprocessing: legacy {legacy_ms:.3f} ms/frame, shared {shared_ms:.3f} ms/frame "
+          f"({legacy_ms / shared_ms:.1f}x faster, {legacy_ms - shared_ms:.3f} ms saved per frame)")
+
+
+if __name__ == "__main__":
+    benchmark([os.path.join("images", f"game_sample_{i}.jpg") for i in (1, 2, 3)])
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import sys
+from time import perf_counter, time
+from typing import Callable
+import numpy as np
+
+from ..config import DETECTION_CENTER_RATIO, DETECTION_CROP_RATIO
+from ..constants import Direction
+from ..control.action_controller import ActionController
+from ..control.actuator import RecordingActuator
+from ..detection.detector import Detector
+from ..detection.preprocessor import FrameBand
+from ..ui.drawing_manager import DrawingManager
+from ..utils import crop_centered
+from .ball_detectors import load_frames
+
+DEFAULT_FRAMES = [os.path.join("images", f"game_sample_{i}.jpg") for i in (1, 2, 3)]
+
+
+class Sample:
+    """
+    Frame with the inputs of every stage precomputed, so that each stage is timed alone.
+    """
+    __slots__ = ("frame", "band", "ball", "lines")
+
+    def __init__(self, frame: np.ndarray) -> None:
+        self.frame = frame
+        self.band = Detector.preprocessor.process(frame)
+        self.ball = Detector.detect_ball(frame, self.band)
+        self.lines = Detector.detect_path_edges(frame, self.band)
+
+
+def _new_band(sample: Sample) -> FrameBand:
+    # Bands cache their color conversions, so each timed run needs a fresh one
+    return FrameBand(sample.band.bgr, sample.band.crop_y1, sample.band.resize_factor)
+
+
+def _decide_action(sample: Sample) -> None:
+    x, y, _ = sample.ball
+    ActionController.decide_action((x, y), sample.lines, sample.frame, Direction.RIGHT)
+
+
+def _pipeline(sample: Sample) -> None:
+    frame = sample.frame
+    band = Detector.preprocessor.process(frame)
+    x, y, r = Detector.detect_ball(frame, band)
+    lines = Detector.detect_path_edges(frame, band)
+    if r:
+        ActionController.decide_action((x, y), lines, frame, Direction.RIGHT)
+
+
+STAGES: dict[str, Callable[[Sample], object]] = {
+    "crop_centered": lambda sample: crop_centered(sample.frame, DETECTION_CENTER_RATIO, DETECTION_CROP_RATIO),
+    "preprocess": lambda sample: Detector.preprocessor.process(sample.frame),
+    "detect_ball": lambda sample: Detector.detect_ball(sample.frame, _new_band(sample)),
+    "detect_path_edges": lambda sample: Detector.detect_path_edges(sample.frame, _new_band(sample)),
+    "diamond_mask": lambda sample: Detector.diamond_mask(sample.band.bgr),
+    "get_path_edges_image": lambda sample: DrawingManager.get_path_edges_image(sample.frame, sample.lines),
+    "decide_action": _decide_action,
+    "pipeline": _pipeline,
+}
+
+
+def time_stage(stage: Callable[[Sample], object], samples: list[Sample], repeat: int, warmup: int = 2) -> dict[str, float]:
+    """
+    Times a stage on every sample.
+
+    Parameters
+    ----------
+    `stage` : `Callable[[Sample], object]`
+        The stage to time.
+    `samples` : `list[Sample]`
+        The prepared frames.
+    `repeat` : `int`
+        Number of timed runs on each sample.
+    `warmup` : `int`, optional
+        Number of untimed runs on each sample before timing, by default `2`
+
+    Returns
+    -------
+    `dict[str, float]`
+        The number of runs, the throughput (runs per second) and the mean, p50, p95 & p99 latencies in milliseconds.
+    """
+    for sample in samples:
+        for _ in range(warmup):
+            stage(sample)
+
+    latencies = np.empty(repeat * len(samples))
+    i = 0
+    for _ in range(repeat):
+        for sample in samples:
+            start = perf_counter()
+            stage(sample)
+            latencies[i] = perf_counter() - start
+            i += 1
+
+    latencies_ms = latencies * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, (50, 95, 99))
+    return {
+        "runs": len(latencies),
+        "throughput": len(latencies) / latencies.sum(),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def run_suite(frames: list[np.ndarray], repeat: int = 20, stages: list[str] | None = None) -> dict:
+    """
+    Runs the benchmark of the stages on a set of frames.
+
+    The clicks decided during the benchmark are only recorded.
+
+    Parameters
+    ----------
+    `frames` : `list[np.ndarray]`
+        The frames to benchmark on.
+    `repeat` : `int`, optional
+        Number of timed runs of each stage on each frame, by default `20`
+    `stages` : `list[str] | None`, optional
+        The names of the stages to run. If `None`, all the stages are run, by default `None`
+
+    Returns
+    -------
+    `dict`
+        The results: environment, number of frames and the timings of each stage.
+
+    Raises
+    ------
+    `ValueError`
+        If a stage is unknown.
+    """
+    stages = list(STAGES) if stages is None else stages
+    for name in stages:
+        if name not in STAGES:
+            raise ValueError(f"Invalid stage: {name} (expected: {', '.join(STAGES)})")
+
+    actuator = ActionController.actuator
+    ActionController.actuator = RecordingActuator()
+    try:
+        samples = [Sample(frame) for frame in frames]
+        timings = {name: time_stage(STAGES[name], samples, repeat) for name in stages}
+    finally:
+        ActionController.actuator = actuator
+
+    return {
+        "time": time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": len(frames),
+        "repeat": repeat,
+        "stages": timings,
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float = 0.25,
+                        metric: str = "p50_ms") -> list[dict]:
+    """
+    Compares benchmark results with a baseline.
+
+    Parameters
+    ----------
+    `results` : `dict`
+        The current results, from `run_suite`.
+    `baseline` : `dict`
+        The baseline results, from `run_suite`.
+    `threshold` : `float`, optional
+        Maximum relative slowdown of a stage before it is a regression, by default `0.25`
+    `metric` : `str`, optional
+        The compared latency, by default `"p50_ms"`
+
+    Returns
+    -------
+    `list[dict]`
+        The comparison of each stage present in both results: stage, baseline & current latencies, ratio and regression flag.
+    """
+    comparison = []
+    for name, timings in results["stages"].items():
+        if name not in baseline["stages"]:
+            continue
+        reference = baseline["stages"][name][metric]
+        ratio = timings[metric] / reference if reference > 0 else 1.0
+        comparison.append({
+            "stage": name,
+            "baseline_ms": reference,
+            "current_ms": timings[metric],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return comparison
+
+
+def print_results(results: dict, comparison: list[dict] | None = None) -> None:
+    """
+    Prints the timings of each stage, with the baseline comparison if specified.
+    """
+    ratios = {row["stage"]: row for row in comparison or []}
+    print(f"{results['frames']} frames x {results['repeat']} runs")
+    print(f"{'Stage':<22}{'Runs/s':>10}{'Mean (ms)':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'vs base':>10}")
+    for name, timings in results["stages"].items():
+        row = ratios.get(name)
+        versus = f"{row['ratio']:.2f}x{'!' if row['regression'] else ''}" if row else "-"
+        print(f"{name:<22}{timings['throughput']:>10.0f}{timings['mean_ms']:>11.3f}{timings['p50_ms']:>10.3f}"
+              f"{timings['p95_ms']:>10.3f}{timings['p99_ms']:>10.3f}{versus:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vision & decision stages on recorded frames (headless).")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_FRAMES, help="Images, folders of frames or videos")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs per frame and stage")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="Stages to run (default: all)")
+    parser.add_argument("--output", default=os.path.join("metrics", "benchmark.json"), help="JSON file of the results")
+    parser.add_argument("--baseline", help="JSON results to compare with; exits with 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Maximum relative p50 slowdown of a stage")
+    args = parser.parse_args()
+
+    frames = [frame for path in args.paths for frame in load_frames(path)]
+    results = run_suite(frames, args.repeat, args.stages)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            comparison = compare_to_baseline(results, json.load(file), args.threshold)
+        results["baseline"] = {"path": args.baseline, "threshold": args.threshold, "comparison": comparison}
+    print_results(results, comparison)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    if comparison and any(row["regression"] for row in comparison):
+        sys.exit(1)
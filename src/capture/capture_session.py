@@ -0,0 +1,229 @@
+import ctypes
+from ctypes import wintypes
+from typing import Callable
+import numpy as np
+import win32api
+import win32con
+import win32gui
+
+from .screen_capture import ScreenCapture
+
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", wintypes.DWORD),
+        ("biWidth", wintypes.LONG),
+        ("biHeight", wintypes.LONG),
+        ("biPlanes", wintypes.WORD),
+        ("biBitCount", wintypes.WORD),
+        ("biCompression", wintypes.DWORD),
+        ("biSizeImage", wintypes.DWORD),
+        ("biXPelsPerMeter", wintypes.LONG),
+        ("biYPelsPerMeter", wintypes.LONG),
+        ("biClrUsed", wintypes.DWORD),
+        ("biClrImportant", wintypes.DWORD),
+    ]
+
+
+class BITMAPINFO(ctypes.Structure):
+    _fields_ = [
+        ("bmiHeader", BITMAPINFOHEADER),
+        ("bmiColors", wintypes.DWORD * 3),
+    ]
+
+
+BI_RGB = 0
+DIB_RGB_COLORS = 0
+
+
+class CaptureSession:
+    """
+    Persistent capture of a window into a preallocated numpy buffer.
+
+    The window handle, device contexts, DIB section and border geometry are kept between frames,
+    so a capture only costs a `PrintWindow` call and a single copy into the output buffer.
+    Everything is rebuilt when the window size changes.
+
+    With a region of interest, only the rows of that region are copied. The output buffer keeps the full frame size
+    (rows outside the region stay black), so coordinates in the frame are the same as without it.
+    """
+    def __init__(self, window_name: str, roi: Callable[[int], tuple[int, int]] | None = None, gdi32=None) -> None:
+        """
+        Parameters
+        ----------
+        `window_name` : `str`
+            The name of the window to capture.
+        `roi` : `Callable[[int], tuple[int, int]] | None`, optional
+            Function giving the (top, bottom) rows to copy for a frame height. If `None`, the whole frame is copied, by default `None`
+        `gdi32` : optional
+            The gdi32 library. If `None`, the one of Windows is loaded, by default `None`
+
+        Raises
+        ------
+        `ValueError`
+            If the window with the specified name is not found.
+        """
+        # Make the program DPI aware once for the whole session
+        ScreenCapture.user32.SetProcessDPIAware()
+        self.gdi32 = CaptureSession._load_gdi32() if gdi32 is None else gdi32
+
+        self.window_name = window_name
+        self.roi = roi
+        self.hwnd = ScreenCapture.find_window(window_name)
+        self.width = 0
+        self.height = 0
+        self.allocations = 0  # Number of times the GDI objects & buffers were (re)allocated
+        self.frames = 0  # Number of frames captured
+
+        self._hwnd_dc = None
+        self._mem_dc = None
+        self._bitmap = None
+        self._old_bitmap = None
+        self._bgra = None
+        self._frame = None
+        self._src = None
+        self._dst = None
+        self._origin = (0, 0)  # Position of the frames in the window
+
+    def __enter__(self) -> "CaptureSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def _load_gdi32():
+        """
+        Loads the gdi32 library of Windows, declaring the handle return types of its functions
+        so they are not truncated on 64-bit Python.
+        """
+        gdi32 = ctypes.windll.gdi32
+        gdi32.CreateCompatibleDC.restype = ctypes.c_void_p
+        gdi32.CreateCompatibleDC.argtypes = [ctypes.c_void_p]
+        gdi32.CreateDIBSection.restype = ctypes.c_void_p
+        gdi32.CreateDIBSection.argtypes = [ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT,
+                                           ctypes.POINTER(ctypes.c_void_p), ctypes.c_void_p, wintypes.DWORD]
+        gdi32.SelectObject.restype = ctypes.c_void_p
+        gdi32.SelectObject.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        gdi32.DeleteObject.argtypes = [ctypes.c_void_p]
+        gdi32.DeleteDC.argtypes = [ctypes.c_void_p]
+        return gdi32
+
+    def capture(self) -> np.ndarray:
+        """
+        Captures the window into the session buffer.
+
+        Returns
+        -------
+        `np.ndarray`
+            The captured window (without title bar and borders) as a contiguous BGR numpy array.
+            The array is reused by the next capture; copy it to keep it.
+        """
+        _, _, _, _, width, height = ScreenCapture._get_window_dimensions(self.hwnd)
+        if (width, height) != (self.width, self.height):
+            self._rebuild(width, height)
+
+        # Captures the window image directly into the DIB section memory
+        # If Special K is running, this number is 3. If not, 1
+        ScreenCapture.user32.PrintWindow(self.hwnd, self._mem_dc, 3)
+        self.gdi32.GdiFlush()
+
+        # Single copy dropping the Alpha channel & the window borders
+        np.copyto(self._dst, self._src)
+        self.frames += 1
+
+        return self._frame
+
+    def screen_point(self, x: int, y: int) -> tuple[int, int]:
+        """
+        Converts a point of the captured frames to screen coordinates.
+
+        Parameters
+        ----------
+        `x` : `int`
+            The x-coordinate in the frame.
+        `y` : `int`
+            The y-coordinate in the frame.
+
+        Returns
+        -------
+        `tuple[int, int]`
+            The (x, y) screen coordinates.
+        """
+        left, top, *_ = ScreenCapture._get_window_dimensions(self.hwnd)
+        return left + self._origin[0] + x, top + self._origin[1] + y
+
+    def _rebuild(self, width: int, height: int) -> None:
+        """
+        (Re)allocates the device contexts, the DIB section and the output buffer for the specified window size.
+
+        Parameters
+        ----------
+        `width` : `int`
+            The window width, in pixels.
+        `height` : `int`
+            The window height, in pixels.
+        """
+        self._release()
+        gdi32 = self.gdi32
+
+        # Get the window's title bar height, in pixels.
+        title_bar_height = win32api.GetSystemMetrics(win32con.SM_CYMENUCHECK) * 2
+        window_border_w = win32api.GetSystemMetrics(win32con.SM_CYFRAME)
+
+        self._hwnd_dc = win32gui.GetWindowDC(self.hwnd)
+        self._mem_dc = gdi32.CreateCompatibleDC(self._hwnd_dc)
+
+        # Top-down 32 bits DIB section, so its memory can be viewed as a (height, width, 4) array
+        bmi = BITMAPINFO()
+        bmi.bmiHeader.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        bmi.bmiHeader.biWidth = width
+        bmi.bmiHeader.biHeight = -height
+        bmi.bmiHeader.biPlanes = 1
+        bmi.bmiHeader.biBitCount = 32
+        bmi.bmiHeader.biCompression = BI_RGB
+        bits = ctypes.c_void_p()
+        self._bitmap = gdi32.CreateDIBSection(self._hwnd_dc, ctypes.byref(bmi), DIB_RGB_COLORS, ctypes.byref(bits), None, 0)
+        if not self._bitmap or not bits.value:
+            self._release()
+            raise OSError(f"Could not create a {width}x{height} DIB section for window '{self.window_name}'")
+        self._old_bitmap = gdi32.SelectObject(self._mem_dc, self._bitmap)
+
+        buffer = (ctypes.c_ubyte * (width * height * 4)).from_address(bits.value)
+        self._bgra = np.frombuffer(buffer, dtype=np.uint8).reshape((height, width, 4))
+
+        # Views of the copied region, without the title bar & borders, in the DIB section and in the output buffer
+        window = self._bgra[title_bar_height + window_border_w:height - window_border_w,
+                            window_border_w:width - window_border_w, :3]
+        self._frame = np.zeros(window.shape, dtype=np.uint8)
+        self._origin = (window_border_w, title_bar_height + window_border_w)
+        rows = slice(*self.roi(window.shape[0])) if self.roi is not None else slice(None)
+        self._src = window[rows]
+        self._dst = self._frame[rows]
+
+        self.width, self.height = width, height
+        self.allocations += 1
+
+    def _release(self) -> None:
+        """
+        Frees the GDI resources of the session, if any.
+        """
+        gdi32 = self.gdi32
+        self._bgra = self._src = None
+        if self._mem_dc:
+            if self._old_bitmap:
+                gdi32.SelectObject(self._mem_dc, self._old_bitmap)
+            gdi32.DeleteDC(self._mem_dc)
+        if self._bitmap:
+            gdi32.DeleteObject(self._bitmap)
+        if self._hwnd_dc:
+            win32gui.ReleaseDC(self.hwnd, self._hwnd_dc)
+        self._hwnd_dc = self._mem_dc = self._bitmap = self._old_bitmap = None
+        self.width = self.height = 0
+
+    def close(self) -> None:
+        """
+        Frees the GDI resources of the session.
+        """
+        self._release()
+        self._frame = self._dst = None
@@ -0,0 +1,119 @@
+from abc import ABC, abstractmethod
+from typing import Callable
+import numpy as np
+
+from ..config import FRAME_SOURCE, WINDOW_NAME, REPLAY_PATH, REPLAY_FPS, REPLAY_LOOP
+
+
+class FrameSource(ABC):
+    """
+    Base class of every frame provider of the bot (live window capture, replay, ...).
+    """
+
+    @abstractmethod
+    def read(self) -> np.ndarray | None:
+        """
+        Reads the next frame.
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The next BGR frame, or `None` if the source is exhausted.
+        """
+
+    def screen_point(self, x: int, y: int) -> tuple[int, int] | None:
+        """
+        Converts a point of the frames to screen coordinates, to click on it.
+
+        Parameters
+        ----------
+        `x` : `int`
+            The x-coordinate in the frame.
+        `y` : `int`
+            The y-coordinate in the frame.
+
+        Returns
+        -------
+        `tuple[int, int] | None`
+            The (x, y) screen coordinates, or `None` if the frames are not on the screen.
+        """
+        return None
+
+    def close(self) -> None:
+        """
+        Frees the resources of the source.
+        """
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __iter__(self):
+        while (frame := self.read()) is not None:
+            yield frame
+
+
+class WindowFrameSource(FrameSource):
+    """
+    Frame source capturing a live window through a persistent `CaptureSession`.
+    """
+
+    def __init__(self, window_name: str, roi: Callable[[int], tuple[int, int]] | None = None) -> None:
+        """
+        Parameters
+        ----------
+        `window_name` : `str`
+            The name of the window to capture.
+        `roi` : `Callable[[int], tuple[int, int]] | None`, optional
+            Function giving the (top, bottom) rows to copy for a frame height. If `None`, the whole frame is copied, by default `None`
+        """
+        # Imported here so the other sources can be used where win32 is not available
+        from .capture_session import CaptureSession
+
+        self.window_name = window_name
+        self.session = CaptureSession(window_name, roi)
+
+    def read(self) -> np.ndarray:
+        return self.session.capture()
+
+    def screen_point(self, x: int, y: int) -> tuple[int, int]:
+        return self.session.screen_point(x, y)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def create_frame_source(kind: str = FRAME_SOURCE, roi: Callable[[int], tuple[int, int]] | None = None) -> FrameSource:
+    """
+    Creates the frame source selected in the configuration.
+
+    Parameters
+    ----------
+    `kind` : `str`, optional
+        The kind of source: `"window"`, `"replay"` or `"simulator"`, by default `FRAME_SOURCE`
+    `roi` : `Callable[[int], tuple[int, int]] | None`, optional
+        Function giving the (top, bottom) rows to capture for a frame height. If `None`, whole frames are captured, by default `None`
+
+    Returns
+    -------
+    `FrameSource`
+        The created frame source.
+
+    Raises
+    ------
+    `ValueError`
+        If the kind of source is invalid.
+    """
+    if kind == "window":
+        return WindowFrameSource(WINDOW_NAME, roi)
+    elif kind == "replay":
+        from .replay_source import ReplayFrameSource
+        return ReplayFrameSource(REPLAY_PATH, fps=REPLAY_FPS, loop=REPLAY_LOOP, roi=roi)
+    elif kind == "simulator":
+        # The simulator draws whole frames, the region of interest is ignored
+        from ..simulation.simulator import get_simulator
+        return get_simulator()
+    else:
+        raise ValueError(f"Invalid frame source: {kind} (expected: 'window', 'replay', 'simulator')")
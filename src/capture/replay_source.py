@@ -0,0 +1,161 @@
+import os
+import queue
+import threading
+from time import perf_counter, sleep
+from typing import Callable
+import cv2
+import numpy as np
+
+from .frame_source import FrameSource
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    Frame source replaying a recorded video file, a folder of image frames or a single image.
+
+    Frames are decoded ahead of time by a background thread, and delivered either at a fixed rate
+    or as fast as possible.
+
+    With a region of interest, only its rows are kept after decoding and copied into a reused full size frame
+    (rows outside the region stay black), the same way as the window capture.
+    """
+
+    def __init__(self, path: str, fps: float | None = None, loop: bool = False, prefetch: int = 16,
+                 roi: Callable[[int], tuple[int, int]] | None = None) -> None:
+        """
+        Parameters
+        ----------
+        `path` : `str`
+            Path of a video file, of a folder of JPEG/PNG frames (read in name order) or of a single image.
+        `fps` : `float | None`, optional
+            Rate at which frames are delivered. If `None`, frames are delivered as fast as possible, by default `None`
+        `loop` : `bool`, optional
+            Restart from the first frame when the recording ends, by default `False`
+        `prefetch` : `int`, optional
+            Maximum number of decoded frames waiting to be read, by default `16`
+        `roi` : `Callable[[int], tuple[int, int]] | None`, optional
+            Function giving the (top, bottom) rows to keep for a frame height. If `None`, the whole frame is kept, by default `None`
+
+        Raises
+        ------
+        `ValueError`
+            If the path does not exist or contains no frame.
+        """
+        if not os.path.exists(path):
+            raise ValueError(f"Replay path '{path}' not found")
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.roi = roi
+        self.frames_read = 0
+        self._frame = None
+
+        self._image_paths = None
+        if os.path.isdir(path):
+            self._image_paths = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                                 if name.lower().endswith(IMAGE_EXTENSIONS)]
+            if not self._image_paths:
+                raise ValueError(f"No frame found in '{path}'")
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            self._image_paths = [path]
+
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._next_time = None
+        self._exhausted = False
+        self._thread = threading.Thread(target=self._decode_loop, name="replay-decoder", daemon=True)
+        self._thread.start()
+
+    def _frames(self):
+        """
+        Yields the decoded frames of one pass over the recording.
+        """
+        if self._image_paths is not None:
+            for image_path in self._image_paths:
+                frame = cv2.imread(image_path)
+                if frame is not None:
+                    yield frame
+        else:
+            video = cv2.VideoCapture(self.path)
+            try:
+                while True:
+                    ok, frame = video.read()
+                    if not ok:
+                        break
+                    yield frame
+            finally:
+                video.release()
+
+    def _decode_loop(self) -> None:
+        """
+        Decodes the frames in the background and pushes them to the prefetch queue.
+        """
+        while not self._stop.is_set():
+            decoded = 0
+            for frame in self._frames():
+                if self.roi is not None:
+                    y1, y2 = self.roi(frame.shape[0])
+                    frame = (frame.shape, y1, frame[y1:y2].copy())
+                if not self._put(frame):
+                    return
+                decoded += 1
+            if not self.loop or decoded == 0:
+                break
+        self._put(None)
+
+    def _put(self, item) -> bool:
+        """
+        Pushes an item to the prefetch queue, waiting for room unless the source is closed.
+
+        Returns
+        -------
+        `bool`
+            `True` if the item was pushed; `False` if the source was closed meanwhile.
+        """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read(self) -> np.ndarray | None:
+        if self._exhausted:
+            return None
+        frame = self._queue.get()
+        if frame is None:
+            self._exhausted = True
+            return None
+        if self.roi is not None:
+            shape, y1, rows = frame
+            if self._frame is None or self._frame.shape != shape:
+                self._frame = np.zeros(shape, dtype=np.uint8)
+            frame = self._frame
+            frame[y1:y1 + rows.shape[0]] = rows
+
+        # Pace the delivery to the requested frame rate
+        if self.fps:
+            now = perf_counter()
+            if self._next_time is None or now - self._next_time > 1:
+                self._next_time = now
+            elif self._next_time > now:
+                sleep(self._next_time - now)
+            self._next_time += 1 / self.fps
+
+        self.frames_read += 1
+        return frame
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+
+if __name__ == "__main__":
+    with ReplayFrameSource("images") as source:
+        start = perf_counter()
+        for frame in source:
+            print(f"Frame {source.frames_read}: {frame.shape}")
+        print(f"{source.frames_read / (perf_counter() - start):.1f} frames/s")
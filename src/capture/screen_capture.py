@@ -3,19 +3,21 @@ import numpy as np
 import win32api
 import win32con
 import win32gui
-import win32ui
 
 from ..constants import Align
 
 
 class ScreenCapture:
     user32 = windll.user32
+    _sessions = {}
 
     @staticmethod
     def capture_window(window_name: str) -> np.ndarray:
         """
         Captures the window with the specified name and returns an usable numpy array of the image.
 
+        A persistent `CaptureSession` is kept per window name, so the GDI setup is only done once.
+
         Parameters
         ----------
         `window_name` : `str`
@@ -25,54 +27,19 @@ class ScreenCapture:
         -------
         `np.ndarray`
             The captured window as a continguous numpy array.
+            The array is reused by the next capture of the same window; copy it to keep it.
 
         Raises
         ------
         `ValueError`
             If the window with the specified name is not found.
         """
-        # Make the program DPI aware to prevent scaling issues & capture
-        # hardware accelerated windows (e.g. Chrome, Windows Calculator)
-        # https://stackoverflow.com/questions/76373625/pywin32-cannot-capture-certain-windows-giving-black-screen-python-windows
-        ScreenCapture.user32.SetProcessDPIAware()
+        from .capture_session import CaptureSession
 
-        hwnd = ScreenCapture.find_window(window_name)
-
-        # Get window dimensions
-        left, top, right, bottom, width, height = ScreenCapture._get_window_dimensions(hwnd)
-        # Get the window's title bar height, in pixels.
-        title_bar_height = win32api.GetSystemMetrics(win32con.SM_CYMENUCHECK) * 2
-        window_border_w = win32api.GetSystemMetrics(win32con.SM_CYFRAME)
-
-        # Get window device context
-        hwnd_dc = win32gui.GetWindowDC(hwnd)
-        dc_obj = win32ui.CreateDCFromHandle(hwnd_dc)
-        comp_dc = dc_obj.CreateCompatibleDC()
-        bitmap = win32ui.CreateBitmap()
-        bitmap.CreateCompatibleBitmap(dc_obj, width, height)
-        comp_dc.SelectObject(bitmap)
-
-        # Captures the window image
-        # If Special K is running, this number is 3. If not, 1
-        result = ScreenCapture.user32.PrintWindow(hwnd, comp_dc.GetSafeHdc(), 3)
-
-        # Convert window to numpy array
-        bmp_str = bitmap.GetBitmapBits(True)
-        img = np.frombuffer(bmp_str, dtype=np.uint8).reshape((height, width, 4))
-
-        # Make image C_CONTIGUOUS & drop the Alpha channel
-        img = np.ascontiguousarray(img[..., :3])
-
-        # Crop the title bar from the image
-        img = img[title_bar_height+window_border_w:height-window_border_w, window_border_w:width-window_border_w]
-
-        # Free resources
-        dc_obj.DeleteDC()
-        comp_dc.DeleteDC()
-        win32gui.ReleaseDC(hwnd, hwnd_dc)
-        win32gui.DeleteObject(bitmap.GetHandle())
-
-        return img
+        session = ScreenCapture._sessions.get(window_name)
+        if session is None:
+            session = ScreenCapture._sessions[window_name] = CaptureSession(window_name)
+        return session.capture()
 
     @staticmethod
     def find_window(window_name: str) -> int:
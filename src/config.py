@@ -11,11 +11,92 @@ from enum import Enum
 # CONFIGURATION ###################
 WINDOW_NAME = "BlueStacks App Player"
 VISION_EN = True  # Enable vision processing & image display
+VIEWER_FPS = 30  # Maximum refresh rate of the vision window
+VIEWER_SCALE = 0.5  # Size of the vision window relative to the captured frames
+VIEWER_SLOTS = 4  # Number of frames in the shared memory ring of the vision window
 WINDOW_HEIGHT = 1200  # Target window height
 PROCESSING_DELAY = 100  # Time in milliseconds before starting processing
+FRAME_SOURCE = "window"  # Source of the frames: "window" (live capture), "replay" (recorded frames) or "simulator" (headless game)
+REPLAY_PATH = "images"  # Video file, folder of frames or image replayed when FRAME_SOURCE is "replay"
+REPLAY_FPS = None  # Replay frame rate (None to replay as fast as possible)
+REPLAY_LOOP = True  # Restart the replay when the recording ends
+SIM_WIDTH = 676  # Width of the simulator frames
+SIM_HEIGHT = 1208  # Height of the simulator frames
+SIM_FPS = 60  # Frame rate of the simulator
+SIM_SPEED = 3.0  # Initial ball speed in the simulator, in tiles per second
+SIM_SPEED_UP = 0.01  # Ball speed gained per tile travelled in the simulator, in tiles per second
+SIM_MAX_SPEED = 8.0  # Maximum ball speed in the simulator, in tiles per second
+SIM_INPUT_LAG = 30  # Time in milliseconds between a click and the ball turn in the simulator
+SIM_REALTIME = True  # Run the simulator on the real clock (False: one frame period per frame read, reproducible)
+SIM_SEED = 0  # Seed of the simulator paths
+SIM_GAME_OVER_SCREEN = "images/states/game_over.jpg"  # Game over screen of the simulator, then a tap to start screen (None to restart automatically, when GAME_STATE_EN is False)
+PIPELINE_THREADED = True  # Run capture, detection and actuation on separate threads
+MAX_FRAME_AGE = 100  # Maximum age in milliseconds of a frame for a decision to be taken on it
+CAPTURE_ROI_EN = True  # Only copy the detection band of the frames when VISION_EN is False
+PATH_MAP_EN = True  # Merge the path edges of successive frames, so the edges detection can be skipped on some frames
+EDGES_INCREMENTAL_EN = True  # Only detect the path edges on the rows exposed by the scroll, moving the previous ones
+GAME_STATE_EN = True  # Detect the game over & menu screens, skip the detection outside the rounds and click through the restarts
+ADAPTIVE_RESIZE_EN = True  # Adapt the downscale factor of the detection band to the frame time budget & the ball detection
+ACTUATOR = "pyautogui"  # Click backend: "pyautogui", "sendinput" (direct injection, Windows) or "recording" (no click, for tests)
+                        # The simulator clicks are always used with the "simulator" frame source
+ACTUATOR_ASYNC = True  # Deliver the clicks on a background thread, so the decisions never wait on them
+METRICS_EN = True  # Periodically write the stages timings & the click timing metrics to METRICS_DIR
+METRICS_DIR = "metrics"  # Folder of the timings files
+METRICS_INTERVAL = 5  # Time in seconds between two timings summaries
+METRICS_WINDOW = 1024  # Number of runs of each stage used for the timings percentiles
+TRACE_EN = False  # Also write a Chrome trace of the stages runs when the bot stops
+RECORDER_EN = False  # Keep the last processed frames, saved when the ball is lost or 's' is pressed in the vision window
+                     # The frames ring takes RECORDER_MAX_MEMORY of shared memory (~184 MB uncapped for 5 s at 60 FPS of 1208x676 captures)
+RECORDER_SECONDS = 5  # Duration of the saved recordings, in seconds
+RECORDER_FPS = 60  # Maximum recorded frame rate
+RECORDER_SCALE = 0.5  # Size of the recorded frames relative to the captured frames
+RECORDER_QUALITY = 90  # JPEG quality of the recorded frames
+RECORDER_MAX_MEMORY = 64  # Maximum size of the frames ring in MB, the recorded frame rate being lowered to keep RECORDER_SECONDS
+RECORDINGS_DIR = "recordings"  # Folder of the recordings, each one replayable with FRAME_SOURCE = "replay"
 
 
 # PARAMETERS ######################
+DETECTION_CENTER_RATIO = 0.47  # Vertical center of the detection band, relative to the frame height
+DETECTION_CROP_RATIO = 0.10  # Height of the detection band, relative to the frame height
+RESIZE_FACTOR = 2  # Downscale factor applied to the detection band
+RESIZE_FACTORS = (1, 2, 3)  # Downscale factors allowed when ADAPTIVE_RESIZE_EN is True
+FRAME_BUDGET = 8  # Target processing time of a frame in milliseconds, for the adaptive downscale factor
+MAX_BALL_STEP = 0.02  # Maximum ball travel between two processed frames, relative to the frame height
+MIN_BALL_HIT_RATE = 0.9  # Minimum rate of frames where the tracked ball is found, for the adaptive downscale factor
+BALL_DETECTOR = "hough"  # Ball detector: "hough", "template" or "contour"
+BALL_MAX_GRAY = 80  # Maximum gray level of the ball pixels for the "contour" detector
+BALL_TEMPLATE_THRESHOLD = 0.6  # Minimum correlation score of the "template" detector
+BALL_CIRCLE_PARAM1 = 20  # Canny high threshold of HoughCircles for the "hough" ball detector
+BALL_CIRCLE_PARAM2 = 0.26  # Accumulator threshold of HoughCircles for the "hough" ball detector, relative to the detection band height
+BALL_MIN_RADIUS = 0.13  # Minimum ball radius, relative to the detection band height
+BALL_MAX_RADIUS = 0.15  # Maximum ball radius, relative to the detection band height
+EDGE_DETECTOR = "hough"  # Path edges detector: "hough" (Canny & HoughLinesP) or "isometric" (projections along the path directions)
+EDGE_CANNY_THRESHOLD1 = 190  # First Canny threshold of the "hough" path edges detector
+EDGE_CANNY_THRESHOLD2 = 135  # Second Canny threshold of the "hough" path edges detector
+EDGE_HOUGH_THRESHOLD = 0.32  # Accumulator threshold of HoughLinesP for the "hough" path edges detector, relative to the detection band height
+EDGE_MIN_LINE_RATIO = 0.15  # Minimum length of the path edges lines, relative to the detection band height
+EDGE_MAX_LINE_GAP = 0.02  # Maximum gap between two points of a path edges line of the "hough" detector, relative to the detection band height
+EDGE_ISO_ANGLES = (25, 31)  # Range of the angle of the isometric path edges to the horizontal, in degrees, for the "isometric" detector
+TRACKER_WINDOW_RATIO = 3  # Half size of the ball tracking search window, in ball radii
+TRACKER_LOST_FRAMES = 10  # Number of frames without ball before it is considered lost
+CAPTURE_ROI_MARGIN = 0.03  # Extra height captured above & below the detection band, relative to the frame height
+PATH_EDGES_INTERVAL = 2  # Number of frames between two path edges detections when PATH_MAP_EN is True
+EDGES_REFRESH_INTERVAL = 8  # Maximum number of path edges detections between two detections on the whole band, when EDGES_INCREMENTAL_EN is True
+PROBE_LOOKAHEAD = 0.055  # Horizontal distance between the ball and the front probe, relative to the frame height
+CLICK_COMPENSATION_EN = True  # Push the action probes by the distance the ball travels during the capture-to-click latency
+CLICK_MAX_EXTRA_LOOKAHEAD = 0.05  # Maximum latency compensation of the probes, relative to the frame height
+GAME_STATE_REFERENCES = {"images/states/game_over.jpg": (0.5, 0.55)}  # Reference menu screens, with the point clicked on each relative to the frame size
+GAME_STATE_THRESHOLD = 0.85  # Minimum correlation of the screen fingerprint with a reference screen
+GAME_STATE_MOTION = 0.5  # Mean gray level change of the screen fingerprint between two frames above which the screen moves
+GAME_STATE_STILL_FRAMES = 15  # Number of frames without motion (or with a still ball) after which the screen is taken for a menu
+GAME_STATE_CLICK_INTERVAL = 150  # Time in milliseconds between two clicks on a menu screen
+COLOR_RANGES = {  # HSV ranges (low, high) of the pixel classes of the color lookup table, the hue being in [0, 180]
+    "DIAMOND": ((153, 96, 175), (156, 255, 255)),
+    "WHITE": ((0, 0, 250), (180, 6, 255)),
+    "PATH": ((95, 90, 90), (115, 255, 255)),
+}
+COLOR_RANGES_PATH = "color_ranges.json"  # JSON file of tuned COLOR_RANGES, reloaded into the color lookup table when it changes (None to disable)
+COLOR_RELOAD_INTERVAL = 1000  # Time in milliseconds between two checks of COLOR_RANGES_PATH
 
 
 class Colors(Enum):
@@ -25,3 +25,32 @@ class Direction(Enum):
     """
     LEFT = 0
     RIGHT = 1
+
+
+class TrackState(Enum):
+    """
+    Enum class for ball tracking states.
+    """
+    SEARCHING = 0  # No reliable track, the whole band is searched
+    TRACKING = 1  # The ball is searched around its predicted position
+    LOST = 2  # The ball was not found for too long (fell off the path)
+
+
+class GameState(Enum):
+    """
+    Enum class for game states.
+    """
+    PLAYING = 0  # A round is played, the ball & path edges are detected
+    DEAD = 1  # The ball was lost, waiting for a menu screen
+    MENU = 2  # A menu screen (game over, start) waiting for a click
+    UNKNOWN = 3  # The bot just started: a moving screen is a round already being played
+
+
+class ColorClass(Enum):
+    """
+    Enum class for the pixel classes of the color lookup table, by increasing priority.
+    """
+    OTHER = 0
+    PATH = 1  # Faces of the path tiles
+    WHITE = 2  # White background, outside the path
+    DIAMOND = 3  # Pink diamonds on the path
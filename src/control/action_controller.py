@@ -1,16 +1,30 @@
-import cv2
 import numpy as np
 
-from ..config import VISION_EN
+from ..config import CLICK_COMPENSATION_EN, PROBE_LOOKAHEAD
 from ..constants import Direction
+from ..detection.colors import ColorClassifier
+from ..detection.detector import Detector
 
-from .actions import Actions
-from ..utils import isometric_front_point
+from .actuator import Actuator, PyAutoGUIActuator
+from .probes import get_probe_geometry, is_white
+from .timing import ClickTiming
+from ..utils import segments_near_boxes
+
+# Distance along the axes within which a segment touches a probe region.
+# Matches the former rasterization of the lines with a thickness of 3 pixels.
+LINE_PROBE_DISTANCE = 2
 
 
 class ActionController:
+    last_probes = ()  # (x, y) positions of the probes checked by the last decision, for the vision overlay
+    timing = ClickTiming()  # Ball speed & click latency estimates
+    actuator: Actuator = PyAutoGUIActuator()  # Replaced by the configured actuator when the bot starts
+    colors: ColorClassifier = Detector.colors  # Color lookup table labeling the white background, shared with the Detector
+    lookahead = PROBE_LOOKAHEAD  # Horizontal distance between the ball and the front probe, overridden by the parameter tuner
+
     @staticmethod
-    def decide_action(ball_pos: tuple[int, int], edge_lines: np.ndarray, frame: np.ndarray, direction: Direction) -> bool:
+    def decide_action(ball_pos: tuple[int, int], edge_lines: np.ndarray | None, frame: np.ndarray, direction: Direction,
+                      timestamp: float | None = None) -> bool:
         """
         Decides which action to perform based on the ball position and edge lines proximity.
 
@@ -18,72 +32,57 @@ class ActionController:
         ----------
         `ball_pos` : `tuple[int, int]`
             The (x, y) coordinates of the ball.
-        `edge_lines` : `np.ndarray`
-            Image of white edge lines detected in the frame.
+        `edge_lines` : `np.ndarray | None`
+            Path edges lines detected in the frame, coming from HoughLinesP.
         `frame` : `np.ndarray`
             The frame for which the action is to be decided.
         `direction` : `Direction`
             The current ball direction.
+        `timestamp` : `float | None`, optional
+            The `perf_counter` capture time of the frame, in seconds. If specified, the ball speed and the click latency
+            are measured, and the probes are pushed forward to compensate the latency, by default `None`
 
         Returns
         -------
         `bool`
             `True` if the direction is changed; otherwise, `False`.
         """
-        if edge_lines.size == 0 or ball_pos == (0, 0) or ball_pos[0] > frame.shape[1] or ball_pos[0] < 0:
+        ActionController.last_probes = ()
+        ball_x, ball_y = int(ball_pos[0]), int(ball_pos[1])
+        if (ball_x, ball_y) == (0, 0) or ball_x > frame.shape[1] or ball_x < 0:
             return False
 
-        b, g, r = cv2.split(frame)
+        timing = ActionController.timing
+        extra_distance = 0
+        if timestamp is not None:
+            timing.observe(ball_x, timestamp)
+            if CLICK_COMPENSATION_EN:
+                extra_distance = timing.extra_distance(frame.shape[0])
 
         # Perform a click action if a line is present within the horizontal point region and isometric point region of the ball, and depending on the direction.
-        horizontal_distance = int(frame.shape[0] * 55/1000)
-        iso_x, iso_y = isometric_front_point((ball_pos[0], ball_pos[1]), horizontal_distance, direction)
-        region_size = 7
-        if direction == Direction.LEFT:
-            x = int(ball_pos[0]) - horizontal_distance
-            x_low, x_high = x, x + region_size * 2
-            iso_x_low, iso_x_high = iso_x - region_size, iso_x + region_size
-        elif direction == Direction.RIGHT:
-            x = int(ball_pos[0]) + horizontal_distance
-            x_low, x_high = x - region_size * 2, x
-            iso_x_low, iso_x_high = iso_x - region_size, iso_x + region_size
-        else:
-            raise ValueError(f"Invalid direction: {direction}. Expected LEFT or RIGHT.")
-        y = ball_pos[1]
-        y_low, y_high = y - region_size, y + region_size
-        iso_y_low, iso_y_high = iso_y - region_size, iso_y + region_size
+        geometry = get_probe_geometry(frame.shape[0], direction, extra_distance, ActionController.lookahead)
+        x, y = ball_x + geometry.front_dx, ball_y
+        iso_x, iso_y = ball_x + geometry.iso_dx, ball_y + geometry.iso_dy
 
-        if VISION_EN:
-            cv2.circle(frame, (x, y), radius=6, color=(0, 0, 255), thickness=-1)
-            cv2.circle(frame, (iso_x, iso_y), radius=6, color=(0, 0, 255), thickness=-1)
+        ActionController.last_probes = ((x, y), (iso_x, iso_y))
 
         # If the ball is at the edge of the screen, do not click.
         if x < 0 or x > frame.shape[1]:
             return False
 
-        # Check if any line is within a region of 'region_size' pixels around the points on the edge_lines image, or if the white background is reached.
-        line_on_front_point = np.any(edge_lines[y_low:y_high,
-                                                x_low:x_high] == 255)
-        line_on_iso_point = np.any(edge_lines[iso_y_low:iso_y_high,
-                                              iso_x_low:iso_x_high] == 255)
-        try:
-            ws = 3
-            front_white_background = np.any(
-                b[y-ws:y+ws, x-ws:x+ws] == 255) and np.any(
-                    g[y-ws:y+ws, x-ws:x+ws] == 255) and np.any(
-                        r[y-ws:y+ws, x-ws:x+ws] == 255)
-            iso_white_background = np.any(
-                b[iso_y-ws:iso_y+ws, iso_x-ws:iso_x+ws] == 255) and np.any(
-                    g[iso_y-ws:iso_y+ws, iso_x-ws:iso_x+ws] == 255) and np.any(
-                        r[iso_y-ws:iso_y+ws, iso_x-ws:iso_x+ws] == 255)
-            white_background_detected = front_white_background and iso_white_background
-        except IndexError as e:
-            print(f"IndexError: y={y}, x={x}, iso_y={iso_y}, iso_x={iso_x}, b.shape={b.shape}, frame.shape={frame.shape}")
-            print(e)
-            white_background_detected = True
+        # Check if any line is within the region around the points, or if the white background is reached.
+        probe_boxes = geometry.box_offsets + (ball_x, ball_y, ball_x, ball_y)
+        line_on_front_point, line_on_iso_point = segments_near_boxes(edge_lines, probe_boxes, LINE_PROBE_DISTANCE)
+        colors = ActionController.colors
+        white_background_detected = (is_white(frame, x, y, geometry.white_size, colors)
+                                     and is_white(frame, iso_x, iso_y, geometry.white_size, colors))
 
         if (line_on_front_point and line_on_iso_point) or white_background_detected:
-            Actions.click()
+            on_delivered = None
+            if timestamp is not None:
+                def on_delivered(record):
+                    timing.record_click(timestamp, extra_distance, record.delivered_at)
+            ActionController.actuator.click(on_delivered=on_delivered)
             return True
 
         return False
@@ -0,0 +1,349 @@
+import ctypes
+from ctypes import wintypes
+from abc import ABC, abstractmethod
+from collections import deque
+import queue
+import threading
+from time import perf_counter, sleep
+from typing import Callable
+
+from ..config import ACTUATOR, ACTUATOR_ASYNC
+
+
+class ClickRecord:
+    """
+    Click request, timestamped from its enqueue to its delivery.
+    """
+    __slots__ = ("x", "y", "enqueued_at", "delivered_at", "on_delivered")
+
+    def __init__(self, x: int | None, y: int | None, on_delivered: Callable[["ClickRecord"], None] | None = None) -> None:
+        """
+        Parameters
+        ----------
+        `x` : `int | None`
+            The x-coordinate of the click, `None` for the current mouse position.
+        `y` : `int | None`
+            The y-coordinate of the click, `None` for the current mouse position.
+        `on_delivered` : `Callable[[ClickRecord], None] | None`, optional
+            Function called with the record once the click is delivered, by default `None`
+        """
+        self.x = x
+        self.y = y
+        self.enqueued_at = perf_counter()
+        self.delivered_at = None
+        self.on_delivered = on_delivered
+
+    @property
+    def latency(self) -> float | None:
+        """
+        Time between the enqueue and the delivery of the click, in seconds, or `None` if not delivered yet.
+        """
+        return None if self.delivered_at is None else self.delivered_at - self.enqueued_at
+
+
+class Actuator(ABC):
+    """
+    Delivers the clicks decided by the controller.
+
+    Backends implement `_deliver`. The delivered clicks are kept in `records`, most recent last.
+    """
+
+    def __init__(self, history: int = 1000, position: tuple[int, int] | None = None) -> None:
+        """
+        Parameters
+        ----------
+        `history` : `int`, optional
+            Number of delivered click records kept, by default `1000`
+        `position` : `tuple[int, int] | None`, optional
+            The (x, y) screen position of the clicks without coordinates. If `None`, they are delivered
+            at the current mouse position, by default `None`
+        """
+        self.records: deque[ClickRecord] = deque(maxlen=history)
+        self.clicks = 0
+        self.position = position
+
+    @abstractmethod
+    def _deliver(self, x: int | None, y: int | None) -> None:
+        """
+        Sends a click to the system, blocking until it is delivered.
+        """
+
+    def click(self, x: int | None = None, y: int | None = None,
+              on_delivered: Callable[[ClickRecord], None] | None = None) -> ClickRecord:
+        """
+        Clicks at the specified coordinates. By default, it clicks at `position`, or at the current mouse position.
+
+        Parameters
+        ----------
+        `x` : `int | None`, optional
+            The x-coordinate of the click, by default `None`
+        `y` : `int | None`, optional
+            The y-coordinate of the click, by default `None`
+        `on_delivered` : `Callable[[ClickRecord], None] | None`, optional
+            Function called with the record once the click is delivered, by default `None`
+
+        Returns
+        -------
+        `ClickRecord`
+            The record of the click.
+        """
+        if x is None and y is None and self.position is not None:
+            x, y = self.position
+        record = ClickRecord(x, y, on_delivered)
+        self._complete(record)
+        return record
+
+    def _complete(self, record: ClickRecord) -> None:
+        """
+        Delivers a click and timestamps its record.
+        """
+        self._deliver(record.x, record.y)
+        record.delivered_at = perf_counter()
+        self.records.append(record)
+        self.clicks += 1
+        if record.on_delivered is not None:
+            record.on_delivered(record)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Actuator":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class PyAutoGUIActuator(Actuator):
+    """
+    Clicks through `pyautogui`, with its fail-safe checks.
+
+    `pyautogui` is only imported by the first click, so the controller can be imported without display.
+    """
+
+    def _deliver(self, x: int | None, y: int | None) -> None:
+        import pyautogui
+        pyautogui.click(x, y)
+
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", wintypes.LONG),
+        ("dy", wintypes.LONG),
+        ("mouseData", wintypes.DWORD),
+        ("dwFlags", wintypes.DWORD),
+        ("time", wintypes.DWORD),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+class INPUT(ctypes.Structure):
+    # MOUSEINPUT is the largest member of the input union, so the structure has the expected size
+    _fields_ = [
+        ("type", wintypes.DWORD),
+        ("mi", MOUSEINPUT),
+    ]
+
+
+INPUT_MOUSE = 0
+MOUSEEVENTF_LEFTDOWN = 0x0002
+MOUSEEVENTF_LEFTUP = 0x0004
+
+
+class SendInputActuator(Actuator):
+    """
+    Clicks by injecting the mouse button events directly with `SendInput`, in a single call.
+    """
+
+    def __init__(self, history: int = 1000) -> None:
+        super().__init__(history)
+        self.user32 = ctypes.windll.user32
+        self.user32.SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int]
+        self.user32.SendInput.restype = wintypes.UINT
+        # The down & up events are prepared once and sent together
+        self._inputs = (INPUT * 2)(
+            INPUT(INPUT_MOUSE, MOUSEINPUT(0, 0, 0, MOUSEEVENTF_LEFTDOWN, 0, 0)),
+            INPUT(INPUT_MOUSE, MOUSEINPUT(0, 0, 0, MOUSEEVENTF_LEFTUP, 0, 0)),
+        )
+        self._input_size = ctypes.sizeof(INPUT)
+
+    def _deliver(self, x: int | None, y: int | None) -> None:
+        if x is not None and y is not None:
+            self.user32.SetCursorPos(x, y)
+        if self.user32.SendInput(2, self._inputs, self._input_size) != 2:
+            raise ctypes.WinError()
+
+
+class RecordingActuator(Actuator):
+    """
+    Records the clicks without sending them, with an optional delivery delay. Used to test the click latency & ordering without display.
+    """
+
+    def __init__(self, delay: float = 0.0, history: int = 1000) -> None:
+        """
+        Parameters
+        ----------
+        `delay` : `float`, optional
+            Simulated delivery time of a click, in seconds, by default `0.0`
+        `history` : `int`, optional
+            Number of delivered click records kept, by default `1000`
+        """
+        super().__init__(history)
+        self.delay = delay
+
+    def _deliver(self, x: int | None, y: int | None) -> None:
+        if self.delay:
+            sleep(self.delay)
+
+
+class AsyncActuator(Actuator):
+    """
+    Non-blocking actuator: clicks are queued and delivered by another actuator on a background thread,
+    so the caller never waits on the input delivery.
+
+    `records`, `clicks` & `position` are those of the backend, so `Actuator.__init__` is not called:
+    it would give the actuator its own copies, never updated by the deliveries.
+    """
+
+    def __init__(self, backend: Actuator) -> None:
+        """
+        Parameters
+        ----------
+        `backend` : `Actuator`
+            The actuator delivering the clicks.
+        """
+        self.backend = backend
+        self.records = backend.records
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="actuator", daemon=True)
+        self._thread.start()
+
+    @property
+    def clicks(self) -> int:
+        return self.backend.clicks
+
+    @property
+    def position(self) -> tuple[int, int] | None:
+        return self.backend.position
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of queued clicks not delivered yet.
+        """
+        return self._queue.unfinished_tasks
+
+    def _deliver(self, x: int | None, y: int | None) -> None:
+        self.backend._deliver(x, y)
+
+    def click(self, x: int | None = None, y: int | None = None,
+              on_delivered: Callable[[ClickRecord], None] | None = None) -> ClickRecord:
+        """
+        Queues a click at the specified coordinates and returns immediately. By default, it clicks at `position`,
+        or at the current mouse position.
+
+        Parameters
+        ----------
+        `x` : `int | None`, optional
+            The x-coordinate of the click, by default `None`
+        `y` : `int | None`, optional
+            The y-coordinate of the click, by default `None`
+        `on_delivered` : `Callable[[ClickRecord], None] | None`, optional
+            Function called on the actuator thread with the record once the click is delivered, by default `None`
+
+        Returns
+        -------
+        `ClickRecord`
+            The record of the click, timestamped on delivery.
+
+        Raises
+        ------
+        `Exception`
+            The error of a previous delivery, if it failed.
+        """
+        if self._error is not None:
+            raise self._error
+        if x is None and y is None and self.position is not None:
+            x, y = self.position
+        record = ClickRecord(x, y, on_delivered)
+        self._queue.put(record)
+        return record
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Waits for the queued clicks to be delivered.
+
+        Returns
+        -------
+        `bool`
+            `True` if every queued click is delivered; otherwise, `False`.
+        """
+        end = None if timeout is None else perf_counter() + timeout
+        while self._queue.unfinished_tasks and self._thread.is_alive():
+            if end is not None and perf_counter() >= end:
+                return False
+            sleep(0.001)
+        return not self._queue.unfinished_tasks
+
+    def close(self) -> None:
+        """
+        Delivers the queued clicks, then stops the actuator thread and closes the backend.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=1)
+        self.backend.close()
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                self.backend._complete(record)
+            except Exception as e:
+                self._error = e
+                return
+            finally:
+                self._queue.task_done()
+
+
+def create_actuator(kind: str = ACTUATOR, asynchronous: bool = ACTUATOR_ASYNC,
+                    position: tuple[int, int] | None = None) -> Actuator:
+    """
+    Creates the actuator selected in the configuration.
+
+    Parameters
+    ----------
+    `kind` : `str`, optional
+        The backend: `"pyautogui"`, `"sendinput"`, `"recording"` or `"simulator"`, by default `ACTUATOR`
+    `asynchronous` : `bool`, optional
+        Deliver the clicks on a background thread, by default `ACTUATOR_ASYNC`
+    `position` : `tuple[int, int] | None`, optional
+        The (x, y) screen position of the clicks, such as the center of the game window.
+        If `None`, the clicks are delivered at the current mouse position, by default `None`
+
+    Returns
+    -------
+    `Actuator`
+        The created actuator.
+
+    Raises
+    ------
+    `ValueError`
+        If the backend is invalid.
+    """
+    if kind == "pyautogui":
+        actuator = PyAutoGUIActuator()
+    elif kind == "sendinput":
+        actuator = SendInputActuator()
+    elif kind == "recording":
+        actuator = RecordingActuator()
+    elif kind == "simulator":
+        from ..simulation.simulator import SimulatorActuator, get_simulator
+        actuator = SimulatorActuator(get_simulator())
+    else:
+        raise ValueError(f"Invalid actuator: {kind} (expected: 'pyautogui', 'sendinput', 'recording', 'simulator')")
+    actuator.position = position
+    return AsyncActuator(actuator) if asynchronous else actuator
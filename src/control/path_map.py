@@ -0,0 +1,227 @@
+import math
+import numpy as np
+
+from ..constants import Direction
+
+TAN30 = math.tan(math.radians(30))
+
+
+class PathMap:
+    """
+    Persistent model of the path edges, merged across frames in world coordinates.
+
+    The camera follows the ball vertically, so the screen scrolls down by `tan(30°)` pixels for each pixel the ball
+    moves horizontally. The world coordinates are the screen ones minus this accumulated scroll. The scroll estimated
+    from the ball is corrected on each frame by registering the new edges on the known ones.
+
+    Each edge is an isometric line (slope of ±tan(30°) on screen) stored by its slope sign, its world intercept and
+    its horizontal extent. The edges seen on several frames are kept until the ball has passed them.
+    """
+
+    def __init__(self, min_hits: int = 2, merge_distance: float = 3, merge_gap: float = 10,
+                 register_distance: float = 12, slope_tolerance: float = 0.15, behind_margin: float = 0.05,
+                 max_edges: int = 256) -> None:
+        """
+        Parameters
+        ----------
+        `min_hits` : `int`, optional
+            The number of frames an edge must be seen on to be used, by default `2`
+        `merge_distance` : `float`, optional
+            The maximum intercept difference of two merged edges, in pixels, by default `3`
+        `merge_gap` : `float`, optional
+            The maximum horizontal gap between two merged edges, in pixels, by default `10`
+        `register_distance` : `float`, optional
+            The maximum intercept difference of a new edge matched to a known one to correct the scroll,
+            in pixels, by default `12`
+        `slope_tolerance` : `float`, optional
+            The maximum slope difference of a segment to ±tan(30°) to be mapped, by default `0.15`
+        `behind_margin` : `float`, optional
+            Height below the ball after which the edges are forgotten, relative to the frame height, by default `0.05`
+        `max_edges` : `int`, optional
+            The maximum number of kept edges, the oldest ones being forgotten first, by default `256`
+        """
+        self.min_hits = min_hits
+        self.merge_distance = merge_distance
+        self.merge_gap = merge_gap
+        self.register_distance = register_distance
+        self.slope_tolerance = slope_tolerance
+        self.behind_margin = behind_margin
+        self.max_edges = max_edges
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets the path, when the ball is lost.
+        """
+        # Edges (slope sign, world intercept, x min, x max, hits, last frame)
+        self.edges = np.empty((0, 6))
+        self.scroll = 0.0
+        self.frames = 0
+        self.corrections = 0
+        self.ball = None  # Last ball (x, y) in world coordinates
+        self.direction = Direction.RIGHT
+        self.width = self.height = None
+        self._ball_x = None
+
+    def update(self, ball: tuple[int, int, int] | None, lines: np.ndarray | None, direction: Direction,
+               frame_shape: tuple[int, ...]) -> None:
+        """
+        Scrolls the map with the ball and merges the edges detected on a new frame.
+
+        Parameters
+        ----------
+        `ball` : `tuple[int, int, int] | None`
+            The ball (x, y, r) found on the frame, or `None` (or a null radius) if it is not found.
+        `lines` : `np.ndarray | None`
+            The path edges lines detected on the frame, coming from HoughLinesP, or `None` if the detection was skipped.
+        `direction` : `Direction`
+            The current ball direction.
+        `frame_shape` : `tuple[int, ...]`
+            The shape of the frame.
+        """
+        self.height, self.width = frame_shape[:2]
+        self.direction = direction
+        self.frames += 1
+        if ball is not None and ball[2]:
+            if self._ball_x is not None:
+                self.scroll += abs(ball[0] - self._ball_x) * TAN30
+            self._ball_x = ball[0]
+
+        if lines is not None and len(lines):
+            segments = self._isometric_segments(np.asarray(lines, dtype=np.float64).reshape(-1, 4))
+            if len(segments):
+                self._register(segments)
+                self._merge(segments)
+
+        if ball is not None and ball[2]:
+            self.ball = (ball[0], ball[1] - self.scroll)
+            self._forget_behind()
+
+    def _isometric_segments(self, lines: np.ndarray) -> np.ndarray:
+        """
+        Converts the isometric lines to (slope sign, world intercept, x min, x max) segments.
+        """
+        dx = lines[:, 2] - lines[:, 0]
+        dy = lines[:, 3] - lines[:, 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(dx != 0, dy / dx, np.inf)
+        keep = np.abs(np.abs(slope) - TAN30) < self.slope_tolerance
+        lines, slope = lines[keep], slope[keep]
+        sign = np.sign(slope)
+        x_mid = (lines[:, 0] + lines[:, 2]) / 2
+        y_mid = (lines[:, 1] + lines[:, 3]) / 2
+        intercept = y_mid - sign * TAN30 * x_mid - self.scroll
+        x_min = np.minimum(lines[:, 0], lines[:, 2])
+        x_max = np.maximum(lines[:, 0], lines[:, 2])
+        return np.column_stack((sign, intercept, x_min, x_max))
+
+    def _closest_edges(self, segments: np.ndarray, distance: float,
+                       edges: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gets for each segment the closest edge with the same slope, overlapping or close to it.
+
+        Returns
+        -------
+        `tuple[np.ndarray, np.ndarray]`
+            The index of the closest edge of each segment, -1 if there is none within the distance,
+            and the intercept differences between the segments and these edges.
+        """
+        edges = self.edges if edges is None else edges
+        if not len(edges):
+            return np.full(len(segments), -1), np.zeros(len(segments))
+        differences = segments[:, None, 1] - edges[None, :, 1]
+        matches = ((segments[:, None, 0] == edges[None, :, 0]) & (np.abs(differences) <= distance)
+                   & (edges[None, :, 2] <= segments[:, None, 3] + self.merge_gap)
+                   & (edges[None, :, 3] >= segments[:, None, 2] - self.merge_gap))
+        closest = np.argmin(np.where(matches, np.abs(differences), np.inf), axis=1)
+        rows = np.arange(len(segments))
+        return np.where(matches[rows, closest], closest, -1), differences[rows, closest]
+
+    def _register(self, segments: np.ndarray) -> None:
+        """
+        Corrects the scroll with the intercept differences between the new segments and the known edges.
+        """
+        confirmed = self.edges[self.edges[:, 4] >= self.min_hits]
+        if not len(confirmed):
+            return
+        closest, differences = self._closest_edges(segments, self.register_distance, confirmed)
+        residuals = differences[closest >= 0]
+        if len(residuals) >= 2:
+            correction = float(np.median(residuals))
+            self.scroll += correction
+            segments[:, 1] -= correction
+            self.corrections += 1
+
+    def _merge(self, segments: np.ndarray) -> None:
+        """
+        Merges each segment into the closest known edge, or adds it as a new edge.
+        """
+        closest, _ = self._closest_edges(segments, self.merge_distance)
+        for i, segment in zip(closest, segments):
+            if i < 0:
+                continue
+            edge = self.edges[i]
+            edge[1] += (segment[1] - edge[1]) / (edge[4] + 1)
+            edge[2] = min(edge[2], segment[2])
+            edge[3] = max(edge[3], segment[3])
+            edge[4] += 1
+            edge[5] = self.frames
+
+        new = segments[closest < 0]
+        if len(new):
+            new = np.column_stack((new, np.ones(len(new)), np.full(len(new), self.frames)))
+            self.edges = np.vstack((self.edges, new))
+            if len(self.edges) > self.max_edges:
+                self.edges = self.edges[np.argsort(self.edges[:, 5])[-self.max_edges:]]
+
+    def _forget_behind(self) -> None:
+        """
+        Forgets the edges entirely below the ball.
+        """
+        edges = self.edges
+        # Lowest world y of each edge, at one end of its extent
+        lowest = np.maximum(edges[:, 0] * TAN30 * edges[:, 2], edges[:, 0] * TAN30 * edges[:, 3]) + edges[:, 1]
+        self.edges = edges[lowest <= self.ball[1] + self.behind_margin * self.height]
+
+    def segments(self, world: bool = False) -> np.ndarray | None:
+        """
+        Gets the confirmed edges as line segments.
+
+        Parameters
+        ----------
+        `world` : `bool`, optional
+            Whether to return world coordinates instead of the current screen coordinates, by default `False`
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The segments (x1, y1, x2, y2), with the HoughLinesP shape (N, 1, 4), or `None` if there is none.
+        """
+        edges = self.edges[self.edges[:, 4] >= self.min_hits]
+        if not len(edges):
+            return None
+        offset = 0 if world else self.scroll
+        y1 = edges[:, 0] * TAN30 * edges[:, 2] + edges[:, 1] + offset
+        y2 = edges[:, 0] * TAN30 * edges[:, 3] + edges[:, 1] + offset
+        segments = np.column_stack((edges[:, 2], y1, edges[:, 3], y2))
+        return np.around(segments).astype(np.int32).reshape(-1, 1, 4)
+
+    def screen_lines(self, lines: np.ndarray | None = None) -> np.ndarray | None:
+        """
+        Gets the confirmed edges in screen coordinates, with the lines detected on the current frame.
+
+        Parameters
+        ----------
+        `lines` : `np.ndarray | None`, optional
+            The lines detected on the current frame, coming from HoughLinesP, by default `None`
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The lines with the HoughLinesP shape (N, 1, 4), or `None` if there is none.
+        """
+        segments = self.segments()
+        if lines is None or not len(lines):
+            return segments
+        lines = np.asarray(lines, dtype=np.int32).reshape(-1, 1, 4)
+        return lines if segments is None else np.concatenate((lines, segments))
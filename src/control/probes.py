@@ -0,0 +1,118 @@
+from functools import lru_cache
+import numpy as np
+
+from ..config import PROBE_LOOKAHEAD
+from ..constants import ColorClass, Direction
+from ..detection.colors import ColorClassifier
+from ..utils import isometric_front_point
+
+
+class ProbeGeometry:
+    """
+    Offsets of the action probes relative to the ball, for a frame size and a direction.
+
+    Two probes are placed in front of the ball: the horizontal front point and the isometric front point.
+    Each one has a line region, where a path edge line triggers a click, and a smaller white window,
+    where the white background triggers a click.
+    """
+    __slots__ = ("front_dx", "iso_dx", "iso_dy", "box_offsets", "white_size")
+
+    def __init__(self, height: int, direction: Direction, lookahead: float = PROBE_LOOKAHEAD,
+                 region_size: int = 7, white_size: int = 3, extra_distance: int = 0) -> None:
+        """
+        Parameters
+        ----------
+        `height` : `int`
+            The height of the frame.
+        `direction` : `Direction`
+            The ball direction.
+        `lookahead` : `float`, optional
+            The horizontal distance between the ball and the front point, relative to the frame height, by default `PROBE_LOOKAHEAD`
+        `region_size` : `int`, optional
+            The half size of the line regions, in pixels, by default `7`
+        `white_size` : `int`, optional
+            The half size of the white windows, in pixels, by default `3`
+        `extra_distance` : `int`, optional
+            Distance added to the lookahead, in pixels, by default `0`
+
+        Raises
+        ------
+        `ValueError`
+            If the direction is invalid.
+        """
+        horizontal_distance = int(height * lookahead) + extra_distance
+        # Offsets of the isometric point, from a far origin so they are rounded the same way as isometric_front_point
+        origin = 10 * height
+        iso_x, iso_y = isometric_front_point((origin, origin), horizontal_distance, direction)
+        self.iso_dx, self.iso_dy = iso_x - origin, iso_y - origin
+
+        if direction == Direction.LEFT:
+            self.front_dx = -horizontal_distance
+            front_x_low, front_x_high = self.front_dx, self.front_dx + region_size * 2
+        elif direction == Direction.RIGHT:
+            self.front_dx = horizontal_distance
+            front_x_low, front_x_high = self.front_dx - region_size * 2, self.front_dx
+        else:
+            raise ValueError(f"Invalid direction: {direction}. Expected LEFT or RIGHT.")
+
+        # Line regions (x_min, y_min, x_max, y_max) relative to the ball, inclusive pixel coordinates
+        self.box_offsets = np.array([
+            [front_x_low, -region_size, front_x_high - 1, region_size - 1],
+            [self.iso_dx - region_size, self.iso_dy - region_size, self.iso_dx + region_size - 1, self.iso_dy + region_size - 1],
+        ])
+        self.box_offsets.flags.writeable = False
+        self.white_size = white_size
+
+
+@lru_cache(maxsize=128)
+def get_probe_geometry(height: int, direction: Direction, extra_distance: int = 0,
+                       lookahead: float = PROBE_LOOKAHEAD) -> ProbeGeometry:
+    """
+    Gets the cached probe geometry of a frame height, a direction, a lookahead compensation and a lookahead.
+
+    Parameters
+    ----------
+    `height` : `int`
+        The height of the frame.
+    `direction` : `Direction`
+        The ball direction.
+    `extra_distance` : `int`, optional
+        Distance added to the lookahead, in pixels, by default `0`
+    `lookahead` : `float`, optional
+        The horizontal distance between the ball and the front point, relative to the frame height, by default `PROBE_LOOKAHEAD`
+
+    Returns
+    -------
+    `ProbeGeometry`
+        The probe geometry.
+    """
+    return ProbeGeometry(height, direction, lookahead, extra_distance=extra_distance)
+
+
+def is_white(frame: np.ndarray, x: int, y: int, size: int, colors: ColorClassifier) -> bool:
+    """
+    Checks if the window of a point contains white background pixels, classifying the frame window in place.
+
+    The window is clamped to the frame; a window entirely out of the frame is not white.
+
+    Parameters
+    ----------
+    `frame` : `np.ndarray`
+        The BGR frame.
+    `x` : `int`
+        The x-coordinate of the point.
+    `y` : `int`
+        The y-coordinate of the point.
+    `size` : `int`
+        The half size of the window, in pixels.
+    `colors` : `ColorClassifier`
+        The color lookup table labeling the white background.
+
+    Returns
+    -------
+    `bool`
+        `True` if a pixel of the window is classified as white background; otherwise, `False`.
+    """
+    height, width = frame.shape[:2]
+    patch = frame[max(0, y - size):min(height, y + size), max(0, x - size):min(width, x + size)]
+    return patch.size > 0 and colors.contains(patch, ColorClass.WHITE)
@@ -0,0 +1,125 @@
+import numpy as np
+
+from ..config import CLICK_MAX_EXTRA_LOOKAHEAD, METRICS_WINDOW
+
+
+class ClickTiming:
+    """
+    Estimates the horizontal ball speed and the capture-to-click latency, to compensate the click timing.
+
+    The ball keeps moving between the capture of a frame and the delivery of the click, so the probes are pushed
+    further by the distance the ball travels during that latency. The speed is estimated from consecutive detections,
+    and the latency is measured on every click. The timing errors of the last clicks are kept for their percentiles.
+    """
+
+    def __init__(self, smoothing: float = 0.2, max_extra_ratio: float = CLICK_MAX_EXTRA_LOOKAHEAD,
+                 max_gap: float = 0.5, window: int = METRICS_WINDOW) -> None:
+        """
+        Parameters
+        ----------
+        `smoothing` : `float`, optional
+            Weight of the new measure in the speed and latency estimates, between 0 and 1, by default `0.2`
+        `max_extra_ratio` : `float`, optional
+            Maximum extra lookahead distance, relative to the frame height, by default `CLICK_MAX_EXTRA_LOOKAHEAD`
+        `max_gap` : `float`, optional
+            Maximum time between two detections for the speed to be measured, in seconds, by default `0.5`
+        `window` : `int`, optional
+            Number of clicks whose timing error is kept for the percentiles, by default `METRICS_WINDOW`
+        """
+        self.smoothing = smoothing
+        self.max_extra_ratio = max_extra_ratio
+        self.max_gap = max_gap
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets the estimates.
+        """
+        self.speed = 0.0  # Horizontal ball speed, in full resolution pixels per second
+        self.latency = 0.0  # Capture-to-click latency, in seconds
+        self.timing_error = 0.0  # Delay of the last click relative to its predicted time, in seconds (positive if late)
+        self.clicks = 0
+        self._errors = np.zeros(self.window)  # Timing errors of the last clicks, in seconds
+        self._last = None  # Last (x, timestamp) detection
+
+    def observe(self, ball_x: int, timestamp: float) -> None:
+        """
+        Updates the speed estimate with a new ball detection.
+
+        Parameters
+        ----------
+        `ball_x` : `int`
+            The x-coordinate of the ball, in full resolution frame coordinates.
+        `timestamp` : `float`
+            The capture time of the frame, in seconds.
+        """
+        if self._last is not None:
+            last_x, last_timestamp = self._last
+            dt = timestamp - last_timestamp
+            if dt <= 0:
+                return
+            if dt <= self.max_gap:
+                measured = abs(ball_x - last_x) / dt
+                self.speed = measured if self.speed == 0 else self.speed + self.smoothing * (measured - self.speed)
+        self._last = ball_x, timestamp
+
+    def extra_distance(self, height: int) -> int:
+        """
+        Gets the distance the ball travels during the estimated latency, added to the probes lookahead.
+
+        Parameters
+        ----------
+        `height` : `int`
+            The height of the frame.
+
+        Returns
+        -------
+        `int`
+            The extra lookahead distance, in pixels, rounded down to an even number to bound the cached probe geometries.
+        """
+        distance = min(self.speed * self.latency, self.max_extra_ratio * height)
+        return 2 * int(distance / 2)
+
+    def record_click(self, timestamp: float, extra_distance: int, clicked_at: float) -> None:
+        """
+        Updates the latency estimate and the timing error with a delivered click.
+
+        Parameters
+        ----------
+        `timestamp` : `float`
+            The capture time of the frame on which the click was decided, in seconds.
+        `extra_distance` : `int`
+            The extra lookahead distance used for the decision, in pixels.
+        `clicked_at` : `float`
+            The time at which the click was delivered, in seconds.
+        """
+        latency = clicked_at - timestamp
+        self.latency = latency if self.clicks == 0 else self.latency + self.smoothing * (latency - self.latency)
+        # The click was meant to be delivered when the ball had travelled the extra distance
+        predicted_delay = extra_distance / self.speed if self.speed > 0 else 0.0
+        self.timing_error = latency - predicted_delay
+        self._errors[self.clicks % len(self._errors)] = self.timing_error
+        self.clicks += 1
+
+    def metrics(self) -> dict[str, float]:
+        """
+        Gets the current estimates and the distribution of the timing error over the last clicks.
+
+        Returns
+        -------
+        `dict[str, float]`
+            The ball speed (px/s), latency (ms), last click timing error (ms), p5, p50 & p95 timing errors (ms)
+            and number of clicks.
+        """
+        errors = self._errors[:min(self.clicks, len(self._errors))] * 1000
+        p5, p50, p95 = np.percentile(errors, (5, 50, 95)) if len(errors) else (0.0, 0.0, 0.0)
+        return {
+            "speed_px_s": self.speed,
+            "latency_ms": self.latency * 1000,
+            "timing_error_ms": self.timing_error * 1000,
+            "timing_error_p5_ms": float(p5),
+            "timing_error_p50_ms": float(p50),
+            "timing_error_p95_ms": float(p95),
+            "clicks": self.clicks,
+        }
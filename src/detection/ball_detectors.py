@@ -0,0 +1,157 @@
+from functools import lru_cache
+from typing import Callable
+import cv2
+import numpy as np
+
+from ..config import BALL_DETECTOR, BALL_MAX_GRAY, BALL_TEMPLATE_THRESHOLD
+
+from .detector import Detector
+
+BallDetector = Callable[[np.ndarray, int], tuple[int, int, int]]
+
+BALL_DETECTORS: dict[str, BallDetector] = {}
+
+
+def register_ball_detector(name: str) -> Callable[[BallDetector], BallDetector]:
+    """
+    Decorator registering a ball detector under the specified name.
+
+    A ball detector takes a grayscale region of the detection band and the height of the whole band,
+    and returns the (x, y) coordinates of the ball in the region and its radius, or (0, 0, 0) if not found.
+
+    Parameters
+    ----------
+    `name` : `str`
+        The name of the detector, used to select it in the configuration.
+    """
+    def register(detector: BallDetector) -> BallDetector:
+        BALL_DETECTORS[name] = detector
+        return detector
+    return register
+
+
+def get_ball_detector(name: str = BALL_DETECTOR) -> BallDetector:
+    """
+    Gets a registered ball detector.
+
+    Parameters
+    ----------
+    `name` : `str`, optional
+        The name of the detector, by default `BALL_DETECTOR`
+
+    Returns
+    -------
+    `BallDetector`
+        The ball detector.
+
+    Raises
+    ------
+    `ValueError`
+        If no detector is registered under this name.
+    """
+    if name not in BALL_DETECTORS:
+        raise ValueError(f"Invalid ball detector: {name} (expected: {', '.join(BALL_DETECTORS)})")
+    return BALL_DETECTORS[name]
+
+
+def ball_radius_range(band_height: int) -> tuple[int, int]:
+    """
+    Gets the expected ball radius range for a detection band height, from the `Detector` parameters.
+
+    Parameters
+    ----------
+    `band_height` : `int`
+        The height of the detection band.
+
+    Returns
+    -------
+    `tuple[int, int]`
+        The minimum and maximum ball radius, in band pixels.
+    """
+    return max(1, int(band_height * Detector.ball_min_radius)), max(1, int(band_height * Detector.ball_max_radius))
+
+
+register_ball_detector("hough")(Detector.find_ball_circle)
+
+
+@lru_cache(maxsize=8)
+def _ball_template(radius: int) -> np.ndarray:
+    """
+    Generates the template of a dark ball of the specified radius on a light background.
+    """
+    size = 2 * radius + 5
+    template = np.full((size, size), 255, dtype=np.uint8)
+    cv2.circle(template, (size // 2, size // 2), radius, 0, thickness=-1, lineType=cv2.LINE_AA)
+    return template
+
+
+@register_ball_detector("template")
+def template_ball(gray: np.ndarray, band_height: int) -> tuple[int, int, int]:
+    """
+    Finds the ball with a normalized cross-correlation against a synthetic ball template.
+
+    Parameters
+    ----------
+    `gray` : `np.ndarray`
+        The grayscale region to search.
+    `band_height` : `int`
+        The height of the whole band, from which the ball size is derived.
+
+    Returns
+    -------
+    `tuple[int, int, int]`
+        The (x, y) coordinates of the ball in the region and its radius, or (0, 0, 0) if not found.
+    """
+    min_radius, max_radius = ball_radius_range(band_height)
+    radius = (min_radius + max_radius) // 2
+    template = _ball_template(radius)
+    if gray.shape[0] < template.shape[0] or gray.shape[1] < template.shape[1]:
+        return 0, 0, 0
+
+    scores = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (x, y) = cv2.minMaxLoc(scores)
+    if score < BALL_TEMPLATE_THRESHOLD:
+        return 0, 0, 0
+    return x + template.shape[1] // 2, y + template.shape[0] // 2, radius
+
+
+@register_ball_detector("contour")
+def contour_ball(gray: np.ndarray, band_height: int) -> tuple[int, int, int]:
+    """
+    Finds the ball as the most circular dark blob of the expected size, using a threshold and contour moments.
+
+    Parameters
+    ----------
+    `gray` : `np.ndarray`
+        The grayscale region to search.
+    `band_height` : `int`
+        The height of the whole band, from which the ball size is derived.
+
+    Returns
+    -------
+    `tuple[int, int, int]`
+        The (x, y) coordinates of the ball in the region and its radius, or (0, 0, 0) if not found.
+    """
+    min_radius, max_radius = ball_radius_range(band_height)
+    # Dark highlights-free core of the ball may be a bit smaller than the circle found by HoughCircles
+    min_area, max_area = np.pi * (min_radius * 0.6) ** 2, np.pi * (max_radius * 1.4) ** 2
+
+    _, mask = cv2.threshold(gray, BALL_MAX_GRAY, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    best, best_circularity = None, 0.6
+    for contour in contours:
+        moments = cv2.moments(contour)
+        area = moments["m00"]
+        if not min_area <= area <= max_area:
+            continue
+        perimeter = cv2.arcLength(contour, True)
+        circularity = 4 * np.pi * area / (perimeter * perimeter) if perimeter else 0
+        if circularity > best_circularity:
+            best, best_circularity = moments, circularity
+
+    if best is None:
+        return 0, 0, 0
+    x, y = best["m10"] / best["m00"], best["m01"] / best["m00"]
+    r = max(min_radius, min(max_radius, round(np.sqrt(best["m00"] / np.pi))))
+    return round(x), round(y), r
@@ -0,0 +1,192 @@
+from time import perf_counter
+import numpy as np
+
+from ..config import BALL_DETECTOR, TRACKER_WINDOW_RATIO, TRACKER_LOST_FRAMES
+from ..constants import Direction, TrackState
+
+from .ball_detectors import get_ball_detector
+from .detector import Detector
+from .preprocessor import FrameBand
+
+
+class BallTracker:
+    """
+    Predictive ball tracker with a constant velocity model.
+
+    The ball moves along a diagonal whose horizontal direction only changes on a click, so its next position
+    is predicted from the previous detections and the current `Direction`. The ball detector is then only run on a small
+    window around the prediction, and on the whole band when the ball is not found there.
+    """
+
+    def __init__(self, window_ratio: float = TRACKER_WINDOW_RATIO, lost_frames: int = TRACKER_LOST_FRAMES,
+                 smoothing: float = 0.5, method: str = BALL_DETECTOR) -> None:
+        """
+        Parameters
+        ----------
+        `window_ratio` : `float`, optional
+            Half size of the search window, in ball radii, by default `TRACKER_WINDOW_RATIO`
+        `lost_frames` : `int`, optional
+            Number of consecutive frames without ball before the track is lost, by default `TRACKER_LOST_FRAMES`
+        `smoothing` : `float`, optional
+            Weight of the new measure in the velocity estimate, between 0 and 1, by default `0.5`
+        `method` : `str`, optional
+            The name of the registered ball detector to use, by default `BALL_DETECTOR`
+        """
+        self.find_ball = get_ball_detector(method)
+        self.window_ratio = window_ratio
+        self.lost_frames = lost_frames
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets the current track.
+        """
+        self.state = TrackState.SEARCHING
+        self.position = None  # Last (x, y, r) in full resolution frame coordinates
+        self.velocity = np.zeros(2)  # Velocity (vx, vy) in full resolution pixels per second
+        self.misses = 0
+        self.window_hits = 0
+        self.full_searches = 0
+        self._timestamp = None
+        self._direction = None
+
+    @property
+    def ball_detected(self) -> bool:
+        """
+        `True` while the track is not lost.
+        """
+        return self.state != TrackState.LOST
+
+    def predict(self, direction: Direction, timestamp: float) -> tuple[float, float] | None:
+        """
+        Predicts the position of the ball at the specified time.
+
+        Parameters
+        ----------
+        `direction` : `Direction`
+            The current ball direction.
+        `timestamp` : `float`
+            The capture time of the frame, in seconds.
+
+        Returns
+        -------
+        `tuple[float, float] | None`
+            The predicted (x, y) position in full resolution frame coordinates, or `None` without track.
+        """
+        if self.position is None:
+            return None
+        vx, vy = self.velocity
+        # The horizontal velocity follows the direction, which only changes when clicking
+        vx = abs(vx) if direction == Direction.RIGHT else -abs(vx)
+        dt = timestamp - self._timestamp
+        return self.position[0] + vx * dt, self.position[1] + vy * dt
+
+    def update(self, band: FrameBand, direction: Direction, timestamp: float | None = None) -> tuple[int, int, int]:
+        """
+        Tracks the ball in the detection band of a new frame.
+
+        Parameters
+        ----------
+        `band` : `FrameBand`
+            The preprocessed detection band of the frame.
+        `direction` : `Direction`
+            The current ball direction.
+        `timestamp` : `float | None`, optional
+            The capture time of the frame, in seconds. If `None`, the current time is used, by default `None`
+
+        Returns
+        -------
+        `tuple[int, int, int]`
+            The (x, y) coordinates of the ball in the frame and its radius, or (0, 0, 0) if not found.
+        """
+        timestamp = perf_counter() if timestamp is None else timestamp
+        factor = band.resize_factor
+
+        ball = None
+        prediction = self.predict(direction, timestamp) if self.state == TrackState.TRACKING else None
+        if prediction is not None:
+            ball = self._search_window(band, prediction)
+            if ball is not None:
+                self.window_hits += 1
+        if ball is None:
+            self.full_searches += 1
+            x, y, r = self.find_ball(band.gray, band.height)
+            if r:
+                ball = int(x) * factor, (int(y) + band.crop_y1) * factor, int(r) * factor
+
+        if ball is None:
+            self.misses += 1
+            if self.misses >= self.lost_frames:
+                self.state = TrackState.LOST
+                self.position = None
+            elif self.state == TrackState.TRACKING:
+                self.state = TrackState.SEARCHING
+            return 0, 0, 0
+
+        self._update_velocity(ball, direction, timestamp)
+        self.position = ball
+        self.misses = 0
+        self.state = TrackState.TRACKING
+        return ball
+
+    def _search_window(self, band: FrameBand, prediction: tuple[float, float]) -> tuple[int, int, int] | None:
+        """
+        Searches the ball in a window of the band around the predicted position.
+
+        Returns
+        -------
+        `tuple[int, int, int] | None`
+            The (x, y, r) of the ball in full resolution frame coordinates, or `None` if not found.
+        """
+        factor = band.resize_factor
+        half = int(self.window_ratio * self.position[2] / factor) + 1
+        cx = int(prediction[0] / factor)
+        cy = int(prediction[1] / factor) - band.crop_y1
+        x1, x2 = max(0, cx - half), min(band.bgr.shape[1], cx + half)
+        y1, y2 = max(0, cy - half), min(band.height, cy + half)
+        if x2 - x1 < half or y2 - y1 < half // 2:
+            return None
+
+        x, y, r = self.find_ball(band.gray[y1:y2, x1:x2], band.height)
+        if not r:
+            return None
+        return (int(x) + x1) * factor, (int(y) + y1 + band.crop_y1) * factor, int(r) * factor
+
+    def _update_velocity(self, ball: tuple[int, int, int], direction: Direction, timestamp: float) -> None:
+        """
+        Updates the velocity estimate with a new detection.
+        """
+        if self.position is not None and self._timestamp is not None and timestamp > self._timestamp:
+            dt = timestamp - self._timestamp
+            measured = np.array([(ball[0] - self.position[0]) / dt, (ball[1] - self.position[1]) / dt])
+            if direction != self._direction:
+                # The previous horizontal speed is still valid, only its sign changed
+                self.velocity[0] = abs(self.velocity[0]) if direction == Direction.RIGHT else -abs(self.velocity[0])
+            self.velocity += self.smoothing * (measured - self.velocity)
+        self._timestamp = timestamp
+        self._direction = direction
+
+
+if __name__ == "__main__":
+    import cv2
+
+    # Track the ball of a sample frame scrolled horizontally, as if it was moving right
+    frame = cv2.imread("images/game_sample_1.jpg")
+    bands = [Detector.preprocessor.process(np.roll(frame, 2 * i, axis=1)) for i in range(100)]
+    for band in bands:
+        band.gray
+
+    tracker = BallTracker()
+    start = perf_counter()
+    for i, band in enumerate(bands):
+        tracker.update(band, Direction.RIGHT, i / 60)
+    tracking_ms = (perf_counter() - start) * 1000 / len(bands)
+
+    start = perf_counter()
+    for band in bands:
+        Detector.find_ball_circle(band.gray, band.height)
+    full_ms = (perf_counter() - start) * 1000 / len(bands)
+
+    print(f"Window hits: {tracker.window_hits}, full searches: {tracker.full_searches}, state: {tracker.state.name}")
+    print(f"Tracking: {tracking_ms:.3f} ms/frame, full search: {full_ms:.3f} ms/frame")
@@ -0,0 +1,306 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+import numpy as np
+
+from ..config import BALL_DETECTOR, BALL_MAX_GRAY, EDGE_DETECTOR
+from ..capture.replay_source import ReplayFrameSource
+
+from .detector import Detector
+from .preprocessor import FrameBand, FramePreprocessor
+
+# Ball of each frame, with a null radius when it is not found
+BALL_DTYPE = np.dtype([
+    ("index", np.int64),
+    ("x", np.int32),
+    ("y", np.int32),
+    ("r", np.int32),
+    ("confidence", np.float32),
+])
+
+
+class BatchDetections:
+    """
+    Detections of a sequence of frames, stored as flat arrays.
+
+    The balls are a structured array with one row per frame. The path edges lines of all the frames are concatenated
+    in a single (M, 4) array, the lines of the i-th frame being `segments[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, balls: np.ndarray, segments: np.ndarray, offsets: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        `balls` : `np.ndarray`
+            The balls of the frames, with the `BALL_DTYPE` type.
+        `segments` : `np.ndarray`
+            The path edges lines (x1, y1, x2, y2) of all the frames, in frame coordinates.
+        `offsets` : `np.ndarray`
+            The index of the first line of each frame in `segments`, followed by the number of lines.
+        """
+        self.balls = balls
+        self.segments = segments
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.balls)
+
+    def lines(self, i: int) -> np.ndarray | None:
+        """
+        Gets the path edges lines of a frame, as `Detector.detect_path_edges` returns them.
+
+        Parameters
+        ----------
+        `i` : `int`
+            The position of the frame in the detections.
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The lines with the HoughLinesP shape (N, 1, 4), or `None` if not found.
+        """
+        lines = self.segments[self.offsets[i]:self.offsets[i + 1]]
+        return lines.reshape(-1, 1, 4) if len(lines) else None
+
+    @classmethod
+    def concatenate(cls, detections: list["BatchDetections"]) -> "BatchDetections":
+        """
+        Joins the detections of consecutive batches.
+
+        Parameters
+        ----------
+        `detections` : `list[BatchDetections]`
+            The detections of each batch, in order.
+
+        Returns
+        -------
+        `BatchDetections`
+            The detections of all the frames.
+        """
+        if not detections:
+            return cls(np.empty(0, dtype=BALL_DTYPE), np.empty((0, 4), dtype=np.int32), np.zeros(1, dtype=np.int64))
+        counts = np.concatenate([np.diff(d.offsets) for d in detections])
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(np.concatenate([d.balls for d in detections]),
+                   np.concatenate([d.segments for d in detections]), offsets)
+
+    def save(self, path: str) -> None:
+        """
+        Saves the detections to a NumPy `.npz` file.
+
+        Parameters
+        ----------
+        `path` : `str`
+            The path of the file.
+        """
+        np.savez_compressed(path, balls=self.balls, segments=self.segments, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: str) -> "BatchDetections":
+        """
+        Loads detections saved with `save`.
+
+        Parameters
+        ----------
+        `path` : `str`
+            The path of the file.
+
+        Returns
+        -------
+        `BatchDetections`
+            The loaded detections.
+        """
+        with np.load(path) as data:
+            return cls(data["balls"], data["segments"], data["offsets"])
+
+
+def ball_confidence(gray: np.ndarray, x: int, y: int, r: int) -> float:
+    """
+    Gets the rate of dark pixels within a ball circle, as the ball is the darkest element of the band.
+
+    Parameters
+    ----------
+    `gray` : `np.ndarray`
+        The grayscale band.
+    `x`, `y`, `r` : `int`
+        The ball circle in band coordinates.
+
+    Returns
+    -------
+    `float`
+        The rate of the pixels of the circle darker than `BALL_MAX_GRAY`, 0 for an empty circle.
+    """
+    if r <= 0:
+        return 0.0
+    x1, y1 = max(0, x - r), max(0, y - r)
+    region = gray[y1:y + r + 1, x1:x + r + 1]
+    ys, xs = np.ogrid[y1:y1 + region.shape[0], x1:x1 + region.shape[1]]
+    inside = (xs - x) ** 2 + (ys - y) ** 2 <= r * r
+    count = np.count_nonzero(inside)
+    return float(np.count_nonzero(region[inside] <= BALL_MAX_GRAY) / count) if count else 0.0
+
+
+def _detect_bands(bands: list[FrameBand], method: str,
+                  edge_method: str) -> list[tuple[tuple[int, int, int, float], np.ndarray]]:
+    """
+    Detects the ball and the path edges of consecutive bands, in frame coordinates.
+    """
+    from .ball_detectors import get_ball_detector
+    from .edge_detectors import get_edge_detector
+
+    find_ball = get_ball_detector(method)
+    find_edge_lines = get_edge_detector(edge_method)
+    results = []
+    for band in bands:
+        factor, crop_y1 = band.resize_factor, band.crop_y1
+        x, y, r = (int(v) for v in find_ball(band.gray, band.height))
+        confidence = ball_confidence(band.gray, x, y, r)
+        lines = find_edge_lines(band.bgr, band.height)
+        lines = np.empty((0, 4), dtype=np.int32) if lines is None else lines.reshape(-1, 4).astype(np.int32)
+        lines[:, [0, 2]] *= factor
+        lines[:, [1, 3]] = (lines[:, [1, 3]] + crop_y1) * factor
+        results.append(((x * factor, (y + crop_y1) * factor, r * factor, confidence), lines))
+    return results
+
+
+def detect_batch(frames: np.ndarray, workers: int | None = None, method: str = BALL_DETECTOR,
+                 preprocessor: FramePreprocessor | None = None, first_index: int = 0,
+                 height: int | None = None, executor: ThreadPoolExecutor | None = None,
+                 edge_method: str = EDGE_DETECTOR) -> BatchDetections:
+    """
+    Detects the ball and the path edges of a stack of frames.
+
+    The bands of the whole stack are cropped, downscaled and converted at once by `FramePreprocessor.process_batch`,
+    then the ball & path edges detections of the frames are spread over a thread pool, OpenCV releasing the GIL.
+    The results are the same as `Detector.detect_ball` & `Detector.detect_path_edges` on each frame.
+
+    Parameters
+    ----------
+    `frames` : `np.ndarray`
+        The stacked frames (N, H, W, 3), all of the same size.
+    `workers` : `int | None`, optional
+        The number of threads. If `None`, the number of CPUs is used, by default `None`
+    `method` : `str`, optional
+        The name of the registered ball detector to use, by default `BALL_DETECTOR`
+    `preprocessor` : `FramePreprocessor | None`, optional
+        The preprocessor of the bands. If `None`, the one of the `Detector` is used, by default `None`
+    `first_index` : `int`, optional
+        The index of the first frame, stored with the balls, by default `0`
+    `height` : `int | None`, optional
+        If specified, the frames are already cropped to the band rows of frames of this height, by default `None`
+    `executor` : `ThreadPoolExecutor | None`, optional
+        A thread pool to reuse across batches. If `None`, one is created for this batch, by default `None`
+    `edge_method` : `str`, optional
+        The name of the registered edge detector to use, by default `EDGE_DETECTOR`
+
+    Returns
+    -------
+    `BatchDetections`
+        The detections of the frames.
+    """
+    if executor is None:
+        with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+            return detect_batch(frames, workers, method, preprocessor, first_index, height, executor, edge_method)
+
+    preprocessor = Detector.preprocessor if preprocessor is None else preprocessor
+    bands = preprocessor.process_batch(frames, height)
+
+    # Contiguous chunks of frames, a few per thread to balance the load
+    chunk_size = max(1, -(-len(bands) // ((workers or os.cpu_count()) * 4)))
+    chunks = [bands[i:i + chunk_size] for i in range(0, len(bands), chunk_size)]
+    results = [result for chunk in executor.map(_detect_bands, chunks, [method] * len(chunks), [edge_method] * len(chunks)) for result in chunk]
+
+    balls = np.array([(first_index + i, *ball) for i, (ball, _) in enumerate(results)], dtype=BALL_DTYPE)
+    counts = [len(lines) for _, lines in results]
+    offsets = np.zeros(len(results) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    segments = np.concatenate([lines for _, lines in results]) if results else np.empty((0, 4), dtype=np.int32)
+    return BatchDetections(balls, segments, offsets)
+
+
+def detect_session(path: str, batch_size: int = 256, workers: int | None = None, method: str = BALL_DETECTOR,
+                   preprocessor: FramePreprocessor | None = None, edge_method: str = EDGE_DETECTOR) -> BatchDetections:
+    """
+    Detects the ball and the path edges of every frame of a recorded session.
+
+    Only the band rows of the decoded frames are kept, and they are detected by batches of consecutive frames
+    of the same size.
+
+    Parameters
+    ----------
+    `path` : `str`
+        A video file, a folder of frames (such as a recording folder) or a single image.
+    `batch_size` : `int`, optional
+        The maximum number of frames detected at once, by default `256`
+    `workers` : `int | None`, optional
+        The number of threads. If `None`, the number of CPUs is used, by default `None`
+    `method` : `str`, optional
+        The name of the registered ball detector to use, by default `BALL_DETECTOR`
+    `preprocessor` : `FramePreprocessor | None`, optional
+        The preprocessor of the bands. If `None`, the one of the `Detector` is used, by default `None`
+    `edge_method` : `str`, optional
+        The name of the registered edge detector to use, by default `EDGE_DETECTOR`
+
+    Returns
+    -------
+    `BatchDetections`
+        The detections of all the frames, in order.
+    """
+    preprocessor = Detector.preprocessor if preprocessor is None else preprocessor
+    detections = []
+    batch, shape, index = None, None, 0
+
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor, \
+            ReplayFrameSource(path, roi=preprocessor.source_rows) as source:
+        def flush(count: int) -> None:
+            detections.append(detect_batch(batch[:count], workers, method, preprocessor,
+                                           first_index=index - count, height=shape[0], executor=executor,
+                                           edge_method=edge_method))
+
+        count = 0
+        for frame in source:
+            if frame.shape != shape:
+                if count:
+                    flush(count)
+                shape, count = frame.shape, 0
+                y1, y2 = preprocessor.source_rows(shape[0])
+                batch = np.empty((batch_size, y2 - y1, *shape[1:]), dtype=np.uint8)
+            batch[count] = frame[y1:y2]
+            count += 1
+            index += 1
+            if count == batch_size:
+                flush(count)
+                count = 0
+        if count:
+            flush(count)
+
+    return BatchDetections.concatenate(detections)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Detect the ball & the path edges of recorded frames by batches.")
+    parser.add_argument("path", help="Video file, folder of frames or image")
+    parser.add_argument("--batch-size", type=int, default=256, help="Frames detected at once")
+    parser.add_argument("--workers", type=int, default=None, help="Detection threads (default: CPU count)")
+    parser.add_argument("--method", default=BALL_DETECTOR, help="Registered ball detector")
+    parser.add_argument("--edge-method", default=EDGE_DETECTOR, help="Registered edge detector")
+    parser.add_argument("--output", help="Save the detections to this .npz file")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    detections = detect_session(args.path, args.batch_size, args.workers, args.method, edge_method=args.edge_method)
+    elapsed = perf_counter() - start
+
+    found = detections.balls["r"] > 0
+    print(f"{len(detections)} frames in {elapsed:.2f} s ({len(detections) / elapsed:.1f} frames/s)")
+    print(f"Ball found in {found.sum()} frames, mean confidence {detections.balls['confidence'][found].mean() if found.any() else 0:.2f}")
+    print(f"{len(detections.segments)} path edges lines")
+    if args.output:
+        detections.save(args.output)
+        print(f"Detections saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
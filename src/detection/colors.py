@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+from time import perf_counter
+import cv2
+import numpy as np
+
+from ..config import COLOR_RANGES, COLOR_RANGES_PATH, COLOR_RELOAD_INTERVAL
+from ..constants import ColorClass
+
+# Offsets (B, G, R, A) of the 256 colors of a BGR565 color bin from its lowest color, each one packed in a uint32
+_BIN_OFFSETS = np.array([(b, g, r, 0) for b in range(8) for g in range(4) for r in range(8)],
+                        dtype=np.uint8).reshape(1, 256, 4).view(np.uint32)
+
+
+def parse_ranges(ranges: dict) -> dict[ColorClass, tuple[np.ndarray, np.ndarray]]:
+    """
+    Checks the HSV ranges of the pixel classes.
+
+    Parameters
+    ----------
+    `ranges` : `dict`
+        The (low, high) HSV bounds of each class, by class name.
+
+    Returns
+    -------
+    `dict[ColorClass, tuple[np.ndarray, np.ndarray]]`
+        The bounds of each class, as arrays for `cv2.inRange`.
+
+    Raises
+    ------
+    `ValueError`
+        If a class name or a range is invalid.
+    """
+    classes = [color_class.name for color_class in ColorClass if color_class != ColorClass.OTHER]
+    parsed = {}
+    for name, bounds in ranges.items():
+        if name not in classes:
+            raise ValueError(f"Invalid color class: {name} (expected: {', '.join(classes)})")
+        try:
+            low, high = (np.array(bound, dtype=np.int64) for bound in bounds)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid color range of {name}: {bounds} (expected: (low, high) HSV triplets)") from None
+        if low.shape != (3,) or high.shape != (3,) or (low < 0).any() or (high > (180, 255, 255)).any():
+            raise ValueError(f"Invalid color range of {name}: {bounds} (expected: (low, high) HSV triplets, "
+                             "the hue in [0, 180] and the other channels in [0, 255])")
+        parsed[ColorClass[name]] = low.astype(np.uint8), high.astype(np.uint8)
+    return parsed
+
+
+def save_ranges(path: str, ranges: dict) -> None:
+    """
+    Writes ranges to a JSON file at once, so a classifier watching it never reads a partial file.
+
+    Parameters
+    ----------
+    `path` : `str`
+        The path of the file.
+    `ranges` : `dict`
+        The (low, high) HSV bounds of pixel classes, by class name.
+
+    Raises
+    ------
+    `ValueError`
+        If a class name or a range is invalid.
+    """
+    parse_ranges(ranges)
+    temporary = f"{path}.tmp"
+    lines = [f"  {json.dumps(name)}: {json.dumps([list(map(int, low)), list(map(int, high))])}"
+             for name, (low, high) in ranges.items()]
+    with open(temporary, "w") as file:
+        file.write("{\n" + ",\n".join(lines) + "\n}\n")
+    os.replace(temporary, path)
+
+
+class ColorClassifier:
+    """
+    Classifies the pixels of BGR images with a precomputed color lookup table, without any HSV conversion.
+
+    The table is a quantized 3D LUT indexed by the BGR565 code of a pixel (5 bits of blue & red, 6 bits of green),
+    so labeling an image is a single `cv2.cvtColor` to BGR565 followed by a lookup in a 64 KB table.
+    The table is built from HSV ranges: each of the 256 colors of a bin gets the class of highest priority whose range
+    contains it, and the bin takes the class of most of its colors. A bin across the bound of a range is thus classified
+    approximately, on the side of most of its colors. The ranges are reloaded from a JSON file when it changes,
+    such as the tuned colors written by `python -m src.detection.tuner`.
+    """
+
+    def __init__(self, ranges: dict = COLOR_RANGES, path: str | None = COLOR_RANGES_PATH,
+                 reload_interval: float = COLOR_RELOAD_INTERVAL / 1000) -> None:
+        """
+        Parameters
+        ----------
+        `ranges` : `dict`, optional
+            The (low, high) HSV bounds of each pixel class, by class name, by default `COLOR_RANGES`
+        `path` : `str | None`, optional
+            The JSON file of ranges overriding `ranges`, checked for changes while classifying.
+            If `None`, the ranges are never reloaded, by default `COLOR_RANGES_PATH`
+        `reload_interval` : `float`, optional
+            The time between two checks of the file, in seconds, by default `COLOR_RELOAD_INTERVAL / 1000`
+
+        Raises
+        ------
+        `ValueError`
+            If a class name or a range is invalid.
+        """
+        self.defaults = parse_ranges(ranges)
+        self.path = path
+        self.reload_interval = reload_interval
+        self.reloads = 0  # Number of tables loaded from the file
+        self._mtime = None
+        self._next_check = 0.0
+        self.load(ranges)
+        self.poll(wait=True)
+
+    def load(self, ranges: dict) -> None:
+        """
+        Builds the lookup table of new ranges, the classes not specified keeping their default range.
+
+        The table is replaced at once, so it can be loaded while another thread classifies. It takes about 0.3 s.
+
+        Parameters
+        ----------
+        `ranges` : `dict`
+            The (low, high) HSV bounds of pixel classes, by class name.
+
+        Raises
+        ------
+        `ValueError`
+            If a class name or a range is invalid.
+        """
+        ranges = {**self.defaults, **parse_ranges(ranges)}
+
+        # Lowest color of each bin, then all its colors, added as packed BGRA without carry
+        codes = np.arange(1 << 16, dtype=np.uint16).view(np.uint8).reshape(-1, 1, 2)
+        colors = (cv2.cvtColor(codes, cv2.COLOR_BGR5652BGRA).view(np.uint32) + _BIN_OFFSETS).view(np.uint8)
+        hsv = cv2.cvtColor(colors, cv2.COLOR_BGR2HSV)
+
+        # Class of each color, the classes of higher priority having higher values
+        labels = np.zeros(hsv.shape[:2], dtype=np.uint8)
+        for color_class, (low, high) in ranges.items():
+            cv2.max(labels, cv2.min(cv2.inRange(hsv, low, high), color_class.value), dst=labels)
+        # Class of most of the colors of each bin
+        counts = np.stack([cv2.reduce((labels == color_class.value).view(np.uint8), 1, cv2.REDUCE_SUM,
+                                      dtype=cv2.CV_32S).ravel() for color_class in ColorClass], axis=1)
+        values = np.array([color_class.value for color_class in ColorClass], dtype=np.uint8)
+        table = values[counts.argmax(axis=1)]
+        # Mask of each class, looked up directly
+        masks = {color_class: np.where(table == color_class.value, 255, 0).astype(np.uint8) for color_class in ColorClass}
+        self.ranges = ranges
+        self._tables = table, masks
+
+    @property
+    def table(self) -> np.ndarray:
+        """
+        The `ColorClass` value of each BGR565 code.
+        """
+        return self._tables[0]
+
+    def poll(self, wait: bool = False) -> bool:
+        """
+        Reloads the ranges file if it changed since the last check, at most every `reload_interval`.
+
+        The new table is built on a background thread, so the classification does not wait on it.
+        An invalid file is reported and the current table is kept.
+
+        Parameters
+        ----------
+        `wait` : `bool`, optional
+            Build the new table on the calling thread, by default `False`
+
+        Returns
+        -------
+        `bool`
+            `True` if a new table is loaded (or being loaded without `wait`); otherwise, `False`.
+        """
+        now = perf_counter()
+        if self.path is None or now < self._next_check:
+            return False
+        self._next_check = now + self.reload_interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        if wait:
+            return self._reload()
+        threading.Thread(target=self._reload, name="colors", daemon=True).start()
+        return True
+
+    def _reload(self) -> bool:
+        """
+        Loads the ranges file, reporting an invalid one.
+        """
+        try:
+            with open(self.path) as file:
+                self.load(json.load(file))
+        except (OSError, ValueError) as error:
+            print(f"Color ranges of '{self.path}' not loaded: {error}")
+            return False
+        self.reloads += 1
+        return True
+
+    def classify(self, bgr: np.ndarray) -> np.ndarray:
+        """
+        Labels the pixels of an image.
+
+        Parameters
+        ----------
+        `bgr` : `np.ndarray`
+            The BGR image, or a region of it.
+
+        Returns
+        -------
+        `np.ndarray`
+            The `ColorClass` value of each pixel, as uint8 of the image height & width.
+        """
+        return self._tables[0].take(self._codes(bgr))
+
+    def _codes(self, bgr: np.ndarray) -> np.ndarray:
+        """
+        Gets the BGR565 codes of the pixels of an image, as table indices.
+        """
+        self.poll()
+        if bgr.size == 0:
+            return np.zeros(bgr.shape[:2], dtype=np.intp)
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2BGR565).view(np.uint16)[..., 0].astype(np.intp)
+
+    def mask(self, bgr: np.ndarray, color_class: ColorClass) -> np.ndarray:
+        """
+        Creates the mask of the pixels of a class.
+
+        Parameters
+        ----------
+        `bgr` : `np.ndarray`
+            The BGR image.
+        `color_class` : `ColorClass`
+            The pixel class.
+
+        Returns
+        -------
+        `np.ndarray`
+            The mask, 255 on the pixels of the class and 0 elsewhere.
+        """
+        return self._tables[1][color_class].take(self._codes(bgr))
+
+    def contains(self, bgr: np.ndarray, color_class: ColorClass) -> bool:
+        """
+        Checks if an image has pixels of a class.
+
+        Parameters
+        ----------
+        `bgr` : `np.ndarray`
+            The BGR image, or a region of it.
+        `color_class` : `ColorClass`
+            The pixel class.
+
+        Returns
+        -------
+        `bool`
+            `True` if a pixel belongs to the class; otherwise, `False`.
+        """
+        return bool(self._tables[1][color_class].take(self._codes(bgr)).any())
@@ -1,41 +1,89 @@
 import cv2
 import numpy as np
 
-from ..utils import crop_centered
+from ..config import (BALL_CIRCLE_PARAM1, BALL_CIRCLE_PARAM2, BALL_DETECTOR, BALL_MAX_RADIUS, BALL_MIN_RADIUS,
+                      EDGE_CANNY_THRESHOLD1, EDGE_CANNY_THRESHOLD2, EDGE_DETECTOR, EDGE_HOUGH_THRESHOLD, EDGE_MAX_LINE_GAP,
+                      EDGE_MIN_LINE_RATIO)
+from ..constants import ColorClass
+
+from .colors import ColorClassifier
+from .preprocessor import FrameBand, FramePreprocessor
 
 
 class Detector:
+    preprocessor = FramePreprocessor()
+    colors = ColorClassifier()  # Pixel classes lookup table, shared with the ActionController
+    # Detection parameters, overridden by the parameter tuner
+    circle_param1 = BALL_CIRCLE_PARAM1
+    circle_param2 = BALL_CIRCLE_PARAM2
+    ball_min_radius = BALL_MIN_RADIUS
+    ball_max_radius = BALL_MAX_RADIUS
+    canny_threshold1 = EDGE_CANNY_THRESHOLD1
+    canny_threshold2 = EDGE_CANNY_THRESHOLD2
+    hough_threshold = EDGE_HOUGH_THRESHOLD
+    min_line_ratio = EDGE_MIN_LINE_RATIO
+    max_line_gap = EDGE_MAX_LINE_GAP
+
     @staticmethod
-    def detect_ball(frame: np.ndarray) -> tuple[int, int, int]:
+    def detect_ball(frame: np.ndarray, band: FrameBand | None = None, method: str = BALL_DETECTOR) -> tuple[int, int, int]:
         """
-        Detects the ball in the frame using HoughCircles.
+        Detects the ball in the frame using the selected ball detector (HoughCircles by default).
 
         Parameters
         ----------
         `frame` : `np.ndarray`
             The frame to detect the ball in.
+        `band` : `FrameBand | None`, optional
+            The preprocessed detection band of the frame. If `None`, it is computed from the frame, by default `None`
+        `method` : `str`, optional
+            The name of the registered ball detector to use, by default `BALL_DETECTOR`
 
         Returns
         -------
         `tuple[int, int, int]`
             The (x, y) coordinates of the ball in the frame and its radius.
         """
+        from .ball_detectors import get_ball_detector
+
         # Find the ball in a particular region of the frame
-        resize_factor = 2
-        frame = cv2.resize(frame, (0, 0), fx=1/resize_factor, fy=1/resize_factor)
-        cropped_frame, crop_y1, _ = crop_centered(frame, 0.47, 0.10)
-        gray = cv2.cvtColor(cropped_frame, cv2.COLOR_BGR2GRAY)
+        if band is None:
+            band = Detector.preprocessor.process(frame)
+        resize_factor, crop_y1 = band.resize_factor, band.crop_y1
+
+        x, y, r = get_ball_detector(method)(band.gray, band.height)
+
+        return x * resize_factor, (y + crop_y1) * resize_factor, r * resize_factor
 
-        height = gray.shape[0]
+    @staticmethod
+    def find_ball_circle(gray: np.ndarray, band_height: int) -> tuple[int, int, int]:
+        """
+        Finds the ball circle in a grayscale region of the detection band using HoughCircles.
+
+        Parameters
+        ----------
+        `gray` : `np.ndarray`
+            The grayscale region to search, the whole band or a part of it.
+        `band_height` : `int`
+            The height of the whole band, from which the circle sizes are derived.
+
+        Returns
+        -------
+        `tuple[int, int, int]`
+            The (x, y) coordinates of the ball in the region and its radius, or (0, 0, 0) if not found.
+        """
+        height = band_height
         min_dist = int(height * 30/100)
         min_dist = 1 if min_dist == 0 else min_dist
-        min_radius = int(height * 13/100)
+        min_radius = int(height * Detector.ball_min_radius)
         min_radius = 1 if min_radius == 0 else min_radius
-        max_radius = int(height * 15/100)
+        max_radius = int(height * Detector.ball_max_radius)
         max_radius = 1 if max_radius == 0 else max_radius
+        # The circle votes grow with the ball perimeter, so with the band height
+        votes = int(height * Detector.circle_param2)
+        votes = 1 if votes == 0 else votes
 
         circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, dp=1, minDist=min_dist,
-                                   param1=20, param2=15,
+                                   param1=Detector.circle_param1, param2=votes,
                                    minRadius=min_radius, maxRadius=max_radius)
 
         x, y, r = 0, 0, 0
@@ -43,39 +91,35 @@ class Detector:
             circles = np.around(circles).astype(np.uint16)
             x, y, r = circles[0, 0, :]
 
-        return x * resize_factor, (y + crop_y1) * resize_factor, r * resize_factor
+        return x, y, r
 
     @staticmethod
-    def detect_path_edges(frame: np.ndarray) -> np.ndarray:
+    def detect_path_edges(frame: np.ndarray, band: FrameBand | None = None, method: str = EDGE_DETECTOR) -> np.ndarray:
         """
-        Detects the path edges in the frame using HoughLinesP.
+        Detects the path edges in the frame using the selected edge detector (HoughLinesP by default).
 
         Parameters
         ----------
         `frame` : `np.ndarray`
             The frame to detect the path edges in.
+        `band` : `FrameBand | None`, optional
+            The preprocessed detection band of the frame. If `None`, it is computed from the frame, by default `None`
+        `method` : `str`, optional
+            The name of the registered edge detector to use, by default `EDGE_DETECTOR`
 
         Returns
         -------
         `np.ndarray`
             A list of path edges detected in the frame.
         """
-        # Find edges lines in a particular region of the frame
-        resize_factor = 2
-        frame = cv2.resize(frame, (0, 0), fx=1/resize_factor, fy=1/resize_factor)
-        cropped_frame, crop_y1, _ = crop_centered(frame, 0.47, 0.10)
-        hsv = cv2.cvtColor(cropped_frame, cv2.COLOR_BGR2HSV)
-
-        mask = Detector.diamond_mask(hsv)
+        from .edge_detectors import get_edge_detector
 
-        edges = cv2.Canny(cropped_frame, threshold1=190, threshold2=135)
-        edges = cv2.bitwise_and(edges, edges, mask=cv2.bitwise_not(mask))
-
-        height = hsv.shape[0]
-        min_line_length = int(height * 15/100)
-        min_line_length = 1 if min_line_length == 0 else min_line_length
+        # Find edges lines in a particular region of the frame
+        if band is None:
+            band = Detector.preprocessor.process(frame)
+        resize_factor, crop_y1 = band.resize_factor, band.crop_y1
 
-        lines = cv2.HoughLinesP(edges, rho=1, theta=np.pi/180, threshold=19, minLineLength=min_line_length, maxLineGap=1)
+        lines = get_edge_detector(method)(band.bgr, band.height)
 
         if lines is not None:
             # Convert lines to initial frame coordinates using matrix operations
@@ -86,22 +130,55 @@ class Detector:
 
         return lines
 
+    @staticmethod
+    def find_edge_lines(bgr: np.ndarray, band_height: int) -> np.ndarray | None:
+        """
+        Finds the path edges lines in a region of the detection band using Canny and HoughLinesP.
+
+        Parameters
+        ----------
+        `bgr` : `np.ndarray`
+            The BGR region to search, the whole band or some of its rows.
+        `band_height` : `int`
+            The height of the whole band, from which the line votes, length & gap are derived.
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The lines (x1, y1, x2, y2) in region coordinates, with the HoughLinesP shape (N, 1, 4), or `None` if not found.
+        """
+        mask = Detector.diamond_mask(bgr)
+
+        edges = cv2.Canny(bgr, threshold1=Detector.canny_threshold1, threshold2=Detector.canny_threshold2)
+        edges = cv2.bitwise_and(edges, edges, mask=cv2.bitwise_not(mask))
+
+        min_line_length = int(band_height * Detector.min_line_ratio)
+        min_line_length = 1 if min_line_length == 0 else min_line_length
+        # The line votes & gaps are in band pixels, so they follow the band height (the downscale factor)
+        threshold = int(band_height * Detector.hough_threshold)
+        threshold = 1 if threshold == 0 else threshold
+        max_line_gap = int(band_height * Detector.max_line_gap)
+        max_line_gap = 1 if max_line_gap == 0 else max_line_gap
+
+        return cv2.HoughLinesP(edges, rho=1, theta=np.pi/180, threshold=threshold,
+                               minLineLength=min_line_length, maxLineGap=max_line_gap)
+
     @staticmethod
     def diamond_mask(frame: np.ndarray) -> np.ndarray:
         """
-        Creates a mask for the pink diamonds in the frame.
+        Creates a mask for the pink diamonds in the frame, from the color lookup table.
 
         Parameters
         ----------
         `frame` : `np.ndarray`
-            The frame to create the mask for.
+            The BGR frame to create the mask for.
 
         Returns
         -------
         `np.ndarray`
             The mask for the pink diamonds in the frame.
         """
-        mask = cv2.inRange(frame, np.array([153, 96, 175]), np.array([156, 255, 255]))
+        mask = Detector.colors.mask(frame, ColorClass.DIAMOND)
         mask = cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=1)
         return mask
 
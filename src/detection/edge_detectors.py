@@ -0,0 +1,183 @@
+import math
+from typing import Callable
+import cv2
+import numpy as np
+
+from ..config import EDGE_DETECTOR, EDGE_ISO_ANGLES
+
+from .detector import Detector
+
+EdgeDetector = Callable[[np.ndarray, int], np.ndarray | None]
+
+EDGE_DETECTORS: dict[str, EdgeDetector] = {}
+
+
+def register_edge_detector(name: str) -> Callable[[EdgeDetector], EdgeDetector]:
+    """
+    Decorator registering a path edges detector under the specified name.
+
+    An edge detector takes a BGR region of the detection band and the height of the whole band,
+    and returns the lines (x1, y1, x2, y2) in region coordinates with the HoughLinesP shape (N, 1, 4), or `None` if not found.
+
+    Parameters
+    ----------
+    `name` : `str`
+        The name of the detector, used to select it in the configuration.
+    """
+    def register(detector: EdgeDetector) -> EdgeDetector:
+        EDGE_DETECTORS[name] = detector
+        return detector
+    return register
+
+
+def get_edge_detector(name: str = EDGE_DETECTOR) -> EdgeDetector:
+    """
+    Gets a registered path edges detector.
+
+    Parameters
+    ----------
+    `name` : `str`, optional
+        The name of the detector, by default `EDGE_DETECTOR`
+
+    Returns
+    -------
+    `EdgeDetector`
+        The edge detector.
+
+    Raises
+    ------
+    `ValueError`
+        If no detector is registered under this name.
+    """
+    if name not in EDGE_DETECTORS:
+        raise ValueError(f"Invalid edge detector: {name} (expected: {', '.join(EDGE_DETECTORS)})")
+    return EDGE_DETECTORS[name]
+
+
+register_edge_detector("hough")(Detector.find_edge_lines)
+
+
+def _line_families(angles: tuple[float, float], tolerance: float = 20) -> np.ndarray:
+    """
+    Gets the family of the lines normal to each gradient orientation, in degrees from -90 (index 0) to 91:
+    0 for the vertical sides of the tiles, 1 & 2 for the isometric edges going down & up to the right, -1 for none.
+    """
+    degrees = np.arange(182) - 90
+    middle = sum(angles) / 2
+    families = np.full(len(degrees), -1, dtype=np.intp)
+    families[np.abs(degrees) <= tolerance] = 0
+    families[np.abs(degrees + 90 - middle) <= tolerance] = 1
+    families[np.abs(degrees - 90 + middle) <= tolerance] = 2
+    return families
+
+
+_FAMILIES = _line_families(EDGE_ISO_ANGLES)
+
+
+@register_edge_detector("isometric")
+def find_isometric_lines(bgr: np.ndarray, band_height: int, threshold: int = 100, min_votes: int = 10,
+                         max_gap: int = 2) -> np.ndarray | None:
+    """
+    Finds the path edges lines along the isometric directions of the game, with projections instead of a Hough transform.
+
+    The path edges only have 3 directions: the vertical sides of the tiles and the two isometric directions,
+    whose angle to the horizontal is within `EDGE_ISO_ANGLES`. Each edge pixel of the Sobel gradients is assigned
+    to the direction normal to its gradient, and the exact isometric angles are estimated from the mean gradient
+    of each direction. The pixels are then projected across their direction: the peaks of the projection histogram
+    are the lines, which are split into segments at the gaps along them.
+
+    Parameters
+    ----------
+    `bgr` : `np.ndarray`
+        The BGR region to search, the whole band or some of its rows.
+    `band_height` : `int`
+        The height of the whole band, from which the minimum line length is derived.
+    `threshold` : `int`, optional
+        The minimum gradient strength |dx| + |dy| of an edge pixel, in the strongest channel, by default `100`
+    `min_votes` : `int`, optional
+        The minimum number of pixels of a line, by default `10`
+    `max_gap` : `int`, optional
+        The maximum gap between two pixels of a segment along its line, by default `2`
+
+    Returns
+    -------
+    `np.ndarray | None`
+        The lines (x1, y1, x2, y2) in region coordinates, with the HoughLinesP shape (N, 1, 4), or `None` if not found.
+    """
+    height, width = bgr.shape[:2]
+    dx = cv2.Sobel(bgr, cv2.CV_16S, 1, 0)
+    dy = cv2.Sobel(bgr, cv2.CV_16S, 0, 1)
+    # Strength of the strongest channel, as Canny on a color image
+    blue, green, red = cv2.split(cv2.add(cv2.convertScaleAbs(dx), cv2.convertScaleAbs(dy)))
+    strength = cv2.max(cv2.max(blue, green), red)
+    edges = cv2.threshold(strength, threshold - 1, 255, cv2.THRESH_BINARY)[1]
+    points = cv2.findNonZero(cv2.subtract(edges, Detector.diamond_mask(bgr)))
+    if points is None or len(points) < min_votes:
+        return None
+
+    # Orientation of the gradients of the 3 channels together (Di Zenzo), within [-90, 90] degrees
+    xs, ys = points.reshape(-1, 2).T
+    index = ys * width + xs
+    dxs = dx.reshape(-1, 3).take(index, axis=0).astype(np.float32)
+    dys = dy.reshape(-1, 3).take(index, axis=0).astype(np.float32)
+    normal = 0.5 * np.arctan2(2 * np.einsum("ij,ij->i", dxs, dys),
+                              np.einsum("ij,ij->i", dxs, dxs) - np.einsum("ij,ij->i", dys, dys))
+    family = _FAMILIES[(normal * (180 / math.pi) + 90.5).astype(np.intp)]
+    keep = family >= 0
+    family, xs, ys, normal = family[keep], xs[keep], ys[keep], normal[keep]
+
+    # Angle of each line direction to the horizontal, the isometric ones from their mean gradient
+    counts = np.bincount(family, minlength=3)
+    sums = np.bincount(family, weights=normal, minlength=3)
+    low, high = (math.radians(angle) for angle in EDGE_ISO_ANGLES)
+    middle = (low + high) / 2
+    angles = np.divide(sums, counts, out=np.array([0.0, middle - math.pi / 2, math.pi / 2 - middle]),
+                       where=counts > 0) + (0.0, math.pi / 2, -math.pi / 2)
+    angles[0] = math.pi / 2
+    angles[1] = min(max(angles[1], low), high)
+    angles[2] = min(max(angles[2], -high), -low)
+    cos, sin = np.cos(angles), np.sin(angles)
+
+    # Projection of the pixels across their direction (rho), whose peaks are the lines, and position along it (t)
+    c, s = cos[family], sin[family]
+    rho = ys * c - xs * s
+    t = xs * c + ys * s
+    size = height + 2 * width + 3
+    bins = (rho + (width + 1.5)).astype(np.intp) + family * size
+    votes = np.bincount(bins, minlength=3 * size).astype(np.float32)
+    maxima = cv2.dilate(votes[None], np.ones((1, 7), np.uint8))[0]
+    peaks = np.flatnonzero((votes == maxima) & (votes >= min_votes))
+    if not len(peaks):
+        return None
+    # Flat peaks count once
+    peaks = peaks[np.concatenate(([True], np.diff(peaks) > 3))]
+
+    # Pixels within a bin of each peak
+    owner = np.full(len(votes) + 1, -1)
+    ids = np.arange(len(peaks))
+    owner[peaks - 1] = ids
+    owner[peaks + 1] = ids
+    owner[peaks] = ids
+    line = owner[bins]
+    on_line = line >= 0
+    line, t, rho = line[on_line], t[on_line], rho[on_line]
+
+    # Occupied positions along each line, with an empty position at both ends, split into segments at the gaps
+    length = width + 2 * height + 3
+    occupied = np.zeros((len(peaks), length), dtype=np.uint8)
+    occupied.ravel()[line * length + (t + (height + 1.5)).astype(np.intp)] = 1
+    occupied = cv2.morphologyEx(occupied, cv2.MORPH_CLOSE, np.ones((1, max_gap + 1), np.uint8))
+    changes = np.flatnonzero(np.diff(occupied.ravel()))
+    starts, ends = changes[0::2] + 1, changes[1::2]
+    # At least as long as the HoughLinesP minLineLength
+    long = (ends - starts) >= max(1, int(band_height * Detector.min_line_ratio))
+    if not long.any():
+        return None
+    starts, ends = starts[long], ends[long]
+    ids = starts // length
+    r = (np.bincount(line, weights=rho) / np.bincount(line))[ids]
+    t1, t2 = starts - ids * length - (height + 1), ends - ids * length - (height + 1)
+    direction = peaks[ids] // size
+    c, s = cos[direction], sin[direction]
+    lines = np.stack((t1 * c - r * s, t1 * s + r * c, t2 * c - r * s, t2 * s + r * c), axis=1)
+    return np.rint(lines).astype(np.int32).reshape(-1, 1, 4)
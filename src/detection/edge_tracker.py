@@ -0,0 +1,164 @@
+import math
+import cv2
+import numpy as np
+
+from ..config import EDGE_DETECTOR, EDGES_REFRESH_INTERVAL
+
+from .detector import Detector
+from .edge_detectors import get_edge_detector
+from .preprocessor import FrameBand
+
+
+class IncrementalEdgeDetector:
+    """
+    Path edges detector reusing the lines of the previous frame.
+
+    The camera scrolls the path down smoothly, so the band of a frame is mostly the band of the previous frame shifted
+    by a few rows. The shift is estimated by phase correlation on the downsampled gray band, the previous lines are
+    translated by it, and the edge detector is only run on the newly exposed rows at the top of the band.
+    The whole band is detected again periodically, to bound the drift, and whenever the shift is not reliable.
+    """
+
+    def __init__(self, refresh_interval: int = EDGES_REFRESH_INTERVAL, overlap: float = 0.2, scale: int = 4,
+                 min_response: float = 0.2, max_shift: float = 0.3, method: str = EDGE_DETECTOR) -> None:
+        """
+        Parameters
+        ----------
+        `refresh_interval` : `int`, optional
+            The maximum number of frames between two detections on the whole band, by default `EDGES_REFRESH_INTERVAL`
+        `overlap` : `float`, optional
+            Height of the previously seen rows detected again below the exposed rows, relative to the band height.
+            The lines crossing them must be long enough for the edge detector, by default `0.2`
+        `scale` : `int`, optional
+            The step between the columns of the gray band used for the phase correlation, by default `4`
+        `min_response` : `float`, optional
+            The minimum phase correlation peak for the shift to be trusted, by default `0.2`
+        `max_shift` : `float`, optional
+            The maximum shift, relative to the band height, by default `0.3`
+        `method` : `str`, optional
+            The name of the registered edge detector to use, by default `EDGE_DETECTOR`
+
+        Raises
+        ------
+        `ValueError`
+            If no edge detector is registered under this name.
+        """
+        self.refresh_interval = refresh_interval
+        self.overlap = overlap
+        self.scale = scale
+        self.min_response = min_response
+        self.max_shift = max_shift
+        self.find_edge_lines = get_edge_detector(method)
+        self.full_detections = 0
+        self.partial_detections = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets the previous frame, so the next one is detected on the whole band.
+        """
+        self.shift = 0.0  # Last estimated shift, in band rows
+        self.response = 0.0  # Last phase correlation peak
+        self._spectrum = None
+        self._lines = None  # Lines of the previous band (x1, y1, x2, y2), in band coordinates
+        self._key = None
+        self._frames = 0
+        self._window = None
+        self._buffer = None
+
+    def estimate_shift(self, gray: np.ndarray) -> tuple[float, float] | None:
+        """
+        Estimates the downward shift of the band content since the previous frame.
+
+        The camera does not move horizontally, so the phase correlation is only done along the columns:
+        the cross-power spectra of the columns are summed before being normalized, which also keeps
+        the isometric lines from matching with a horizontal shift.
+
+        Parameters
+        ----------
+        `gray` : `np.ndarray`
+            The grayscale band.
+
+        Returns
+        -------
+        `tuple[float, float] | None`
+            The vertical shift in band rows and the correlation peak (1 for a perfect match),
+            or `None` without previous frame.
+        """
+        height = gray.shape[0]
+        columns = gray[:, ::self.scale]
+        if self._buffer is None or self._buffer.shape[0] != columns.shape[1] or self._window.shape[1] != height:
+            # Columns as zero padded rows, for the row-wise DFT
+            self._buffer = np.zeros((columns.shape[1], cv2.getOptimalDFTSize(height)), dtype=np.float32)
+            self._window = np.hanning(height).astype(np.float32)[None]
+            self._spectrum = None
+        np.multiply(columns.T, self._window, out=self._buffer[:, :height], casting="unsafe")
+        spectrum = cv2.dft(self._buffer, flags=cv2.DFT_ROWS | cv2.DFT_COMPLEX_OUTPUT)
+        previous, self._spectrum = self._spectrum, spectrum
+        if previous is None:
+            return None
+
+        cross = cv2.mulSpectrums(spectrum, previous, cv2.DFT_ROWS, conjB=True).sum(axis=0)
+        cross = cross[:, 0] + 1j * cross[:, 1]
+        cross /= np.abs(cross) + 1e-9
+        correlation = np.fft.ifft(cross).real
+        n = len(correlation)
+        k = int(np.argmax(correlation))
+        # Subpixel peak from a parabola through its neighbors
+        y0, y1, y2 = correlation[k - 1], correlation[k], correlation[(k + 1) % n]
+        curvature = y0 - 2 * y1 + y2
+        shift = k + (0.5 * (y0 - y2) / curvature if curvature else 0.0)
+        return (shift - n if shift > n / 2 else shift), float(y1)
+
+    def detect(self, frame: np.ndarray, band: FrameBand | None = None) -> np.ndarray | None:
+        """
+        Detects the path edges of a frame, from the previous lines when possible.
+
+        Parameters
+        ----------
+        `frame` : `np.ndarray`
+            The frame to detect the path edges in.
+        `band` : `FrameBand | None`, optional
+            The preprocessed detection band of the frame. If `None`, it is computed from the frame, by default `None`
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The path edges lines in frame coordinates, with the HoughLinesP shape (N, 1, 4), or `None` if not found.
+        """
+        if band is None:
+            band = Detector.preprocessor.process(frame)
+        key = (band.bgr.shape, band.resize_factor, band.crop_y1)
+        estimate = self.estimate_shift(band.gray)
+        self._frames += 1
+        full = (key != self._key or estimate is None or self._frames >= self.refresh_interval
+                or estimate[1] < self.min_response or not -1 <= estimate[0] <= self.max_shift * band.height)
+        self._key = key
+
+        if full:
+            self.shift, self.response = estimate if estimate is not None else (0.0, 0.0)
+            lines = self.find_edge_lines(band.bgr, band.height)
+            self._lines = np.empty((0, 4)) if lines is None else lines.reshape(-1, 4).astype(np.float64)
+            self._frames = 0
+            self.full_detections += 1
+        else:
+            self.shift, self.response = estimate
+            lines = self._lines
+            lines[:, [1, 3]] += max(0.0, self.shift)
+            # Forget the lines which left the band
+            lines = lines[np.minimum(lines[:, 1], lines[:, 3]) < band.height]
+            rows = min(band.height, max(0, math.ceil(self.shift)) + math.ceil(self.overlap * band.height))
+            # The lines within the detected rows are found again
+            lines = lines[np.maximum(lines[:, 1], lines[:, 3]) >= rows]
+            strip_lines = self.find_edge_lines(band.bgr[:rows], band.height)
+            if strip_lines is not None:
+                lines = np.vstack((lines, strip_lines.reshape(-1, 4)))
+            self._lines = lines
+            self.partial_detections += 1
+
+        if not len(self._lines):
+            return None
+        lines = np.around(self._lines).astype(np.int32)
+        lines[:, [0, 2]] *= band.resize_factor
+        lines[:, [1, 3]] = (lines[:, [1, 3]] + band.crop_y1) * band.resize_factor
+        return lines.reshape(-1, 1, 4)
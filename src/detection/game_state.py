@@ -0,0 +1,235 @@
+import cv2
+import numpy as np
+
+from ..config import (GAME_STATE_REFERENCES, GAME_STATE_THRESHOLD, GAME_STATE_MOTION, GAME_STATE_STILL_FRAMES,
+                      GAME_STATE_CLICK_INTERVAL)
+from ..constants import GameState
+
+from .detector import Detector
+
+# Size (width, height) of the screen fingerprints
+FINGERPRINT_SIZE = (24, 8)
+
+
+def screen_fingerprint(frame: np.ndarray) -> np.ndarray:
+    """
+    Downsamples the captured rows of a frame to a tiny BGR image.
+
+    Only the rows copied by the capture backends (`FramePreprocessor.capture_rows`) are used,
+    so the fingerprint is the same whether the whole frame is captured or not.
+
+    Parameters
+    ----------
+    `frame` : `np.ndarray`
+        The frame.
+
+    Returns
+    -------
+    `np.ndarray`
+        The fingerprint, of size `FINGERPRINT_SIZE`, as float32.
+    """
+    y1, y2 = Detector.preprocessor.capture_rows(frame.shape[0])
+    # Subsampled before the area interpolation, which averages the remaining pixels
+    rows = frame[y1:y2:4, ::4]
+    return cv2.resize(rows, FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def _normalize(fingerprint: np.ndarray) -> np.ndarray:
+    """
+    Centers a fingerprint and scales it to a unit norm, so the dot product of two of them is their correlation.
+    """
+    vector = fingerprint.ravel() - fingerprint.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ScreenReference:
+    """
+    Reference menu screen, with the point to click on it.
+    """
+    __slots__ = ("name", "click", "fingerprint")
+
+    def __init__(self, name: str, frame: np.ndarray, click: tuple[float, float]) -> None:
+        """
+        Parameters
+        ----------
+        `name` : `str`
+            The name of the screen.
+        `frame` : `np.ndarray`
+            A frame of the screen, of any size.
+        `click` : `tuple[float, float]`
+            The (x, y) point to click on the screen, relative to the frame width & height.
+        """
+        self.name = name
+        self.click = click
+        self.fingerprint = _normalize(screen_fingerprint(frame))
+
+
+def load_references(references: dict[str, tuple[float, float]] = GAME_STATE_REFERENCES) -> list[ScreenReference]:
+    """
+    Loads the reference screens.
+
+    Parameters
+    ----------
+    `references` : `dict[str, tuple[float, float]]`, optional
+        The image paths of the screens and the relative point clicked on each, by default `GAME_STATE_REFERENCES`
+
+    Returns
+    -------
+    `list[ScreenReference]`
+        The loaded screens, named after their files.
+
+    Raises
+    ------
+    `ValueError`
+        If an image cannot be read.
+    """
+    screens = []
+    for path, click in references.items():
+        frame = cv2.imread(path)
+        if frame is None:
+            raise ValueError(f"Reference screen '{path}' not found")
+        name = path.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        screens.append(ScreenReference(name, frame, click))
+    return screens
+
+
+class GameStateDetector:
+    """
+    Follows the state of the game, to only detect the ball & path edges during the rounds and to restart them quickly.
+
+    While playing, the state only depends on the ball tracking: a lost ball means the round is over, and a ball
+    that stays still is waiting on a start screen. Outside the rounds, the frames are only reduced to a tiny fingerprint
+    of their captured rows, matched against the reference menu screens by correlation. A matched screen is clicked
+    at its point, and any other still screen at its center, as often as `click_interval` allows until
+    the screen moves again, when a new round is played. A screen already moving when the bot starts is a round too.
+    """
+
+    def __init__(self, references: list[ScreenReference] | None = None, threshold: float = GAME_STATE_THRESHOLD,
+                 motion: float = GAME_STATE_MOTION, still_frames: int = GAME_STATE_STILL_FRAMES,
+                 click_interval: float = GAME_STATE_CLICK_INTERVAL / 1000, moving_frames: int = 3) -> None:
+        """
+        Parameters
+        ----------
+        `references` : `list[ScreenReference] | None`, optional
+            The reference menu screens. If `None`, they are loaded from `GAME_STATE_REFERENCES`, by default `None`
+        `threshold` : `float`, optional
+            The minimum correlation of a frame with a reference screen, by default `GAME_STATE_THRESHOLD`
+        `motion` : `float`, optional
+            The mean change of the fingerprint between two frames above which the screen moves, by default `GAME_STATE_MOTION`
+        `still_frames` : `int`, optional
+            The number of frames without motion, or with a still ball, after which the screen is taken for a menu,
+            by default `GAME_STATE_STILL_FRAMES`
+        `click_interval` : `float`, optional
+            The time between two clicks on a menu screen, in seconds, by default `GAME_STATE_CLICK_INTERVAL / 1000`
+        `moving_frames` : `int`, optional
+            The number of consecutive moving frames after a menu for a round to be played, by default `3`
+        """
+        self.references = load_references() if references is None else references
+        self.threshold = threshold
+        self.motion = motion
+        self.still_frames = still_frames
+        self.click_interval = click_interval
+        self.moving_frames = moving_frames
+        self._matrix = np.array([reference.fingerprint for reference in self.references]).reshape(len(self.references), -1)
+        self.rounds = 0  # Number of rounds started
+        self.clicks = 0  # Number of clicks on the menu screens
+        # The state is unknown when the bot starts: the frames are classified until a round is played
+        self.state = GameState.UNKNOWN
+        self.screen: ScreenReference | None = None
+        self._reset_counters()
+        self._last_click = -np.inf
+
+    def _reset_counters(self) -> None:
+        self._still = 0
+        self._moving = 0
+        self._previous = None
+        self._ball_x = None
+
+    def classify(self, frame: np.ndarray) -> tuple[ScreenReference | None, float, float]:
+        """
+        Matches a frame with the reference screens.
+
+        Parameters
+        ----------
+        `frame` : `np.ndarray`
+            The frame.
+
+        Returns
+        -------
+        `tuple[ScreenReference | None, float, float]`
+            The matched screen (`None` if no correlation reaches the threshold), the best correlation,
+            and the change of the fingerprint since the previous classified frame (0 for the first one).
+        """
+        fingerprint = screen_fingerprint(frame)
+        change = 0.0 if self._previous is None else float(np.abs(fingerprint - self._previous).mean())
+        self._previous = fingerprint
+        if not len(self.references):
+            return None, 0.0, change
+        scores = self._matrix @ _normalize(fingerprint)
+        best = int(np.argmax(scores))
+        screen = self.references[best] if scores[best] >= self.threshold else None
+        return screen, float(scores[best]), change
+
+    def update(self, frame: np.ndarray, ball: tuple[int, int, int] | None, ball_lost: bool,
+               now: float) -> tuple[GameState, tuple[int, int] | None]:
+        """
+        Updates the game state with a new frame.
+
+        Parameters
+        ----------
+        `frame` : `np.ndarray`
+            The frame.
+        `ball` : `tuple[int, int, int] | None`
+            The ball (x, y, r) tracked on the previous frame while playing, or `None` if not found.
+        `ball_lost` : `bool`
+            Whether the ball tracking is lost.
+        `now` : `float`
+            The current time, in seconds.
+
+        Returns
+        -------
+        `tuple[GameState, tuple[int, int] | None]`
+            The game state for this frame, and the frame point to click, if any.
+        """
+        if self.state == GameState.PLAYING:
+            if ball_lost:
+                self.state = GameState.DEAD
+                self._reset_counters()
+            else:
+                # A still ball waits for the tap of a start screen
+                if ball is not None and ball[2] and self._ball_x is not None and abs(ball[0] - self._ball_x) <= 1:
+                    self._still += 1
+                else:
+                    self._still = 0
+                self._ball_x = ball[0] if ball is not None and ball[2] else None
+                if self._still < self.still_frames:
+                    return self.state, None
+                self.state, self.screen = GameState.MENU, None
+                self._reset_counters()
+
+        screen, _, change = self.classify(frame)
+        moving = change > self.motion
+        self._still = 0 if moving else self._still + 1
+        self._moving = self._moving + 1 if moving else 0
+        if screen is not None:
+            self.state, self.screen = GameState.MENU, screen
+        elif self.state in (GameState.MENU, GameState.UNKNOWN) and self._moving >= self.moving_frames:
+            # The screen scrolls: the round started, or was already started when the bot started.
+            # After a lost ball, the fall moves the screen too, so a menu must be seen first
+            self.state, self.screen = GameState.PLAYING, None
+            self.rounds += 1
+            self._reset_counters()
+            return self.state, None
+        else:
+            self.screen = None
+            if self._still >= self.still_frames:
+                # Unknown still screen, such as the start screen
+                self.state = GameState.MENU
+
+        if self.state == GameState.MENU and now - self._last_click >= self.click_interval:
+            self._last_click = now
+            self.clicks += 1
+            rx, ry = self.screen.click if self.screen is not None else (0.5, 0.5)
+            return self.state, (round(rx * frame.shape[1]), round(ry * frame.shape[0]))
+        return self.state, None
@@ -0,0 +1,167 @@
+from functools import cached_property
+import cv2
+import numpy as np
+
+from ..config import DETECTION_CENTER_RATIO, DETECTION_CROP_RATIO, RESIZE_FACTOR, CAPTURE_ROI_MARGIN
+from ..utils import crop_rows
+
+
+class FrameBand:
+    """
+    Downscaled detection band of a frame, with its color conversions computed once and shared by the detectors.
+    """
+
+    def __init__(self, bgr: np.ndarray, crop_y1: int, resize_factor: int) -> None:
+        """
+        Parameters
+        ----------
+        `bgr` : `np.ndarray`
+            The downscaled BGR band.
+        `crop_y1` : `int`
+            The y-coordinate of the top of the band in the downscaled frame.
+        `resize_factor` : `int`
+            The downscale factor of the band.
+        """
+        self.bgr = bgr
+        self.crop_y1 = crop_y1
+        self.resize_factor = resize_factor
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        """
+        The grayscale band.
+        """
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def hsv(self) -> np.ndarray:
+        """
+        The HSV band.
+        """
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+
+    @property
+    def height(self) -> int:
+        """
+        The height of the downscaled band, in pixels.
+        """
+        return self.bgr.shape[0]
+
+
+class FramePreprocessor:
+    """
+    Shared preprocessing stage of the detectors.
+
+    The detection band is cropped in full resolution coordinates before being downscaled,
+    so only the band is resized. The result is the same as resizing the whole frame and then cropping it.
+    """
+
+    def __init__(self, center_ratio: float = DETECTION_CENTER_RATIO, crop_ratio: float = DETECTION_CROP_RATIO,
+                 resize_factor: int = RESIZE_FACTOR) -> None:
+        """
+        Parameters
+        ----------
+        `center_ratio` : `float`, optional
+            The ratio of the height of the frame defining the center of the band, by default `DETECTION_CENTER_RATIO`
+        `crop_ratio` : `float`, optional
+            The ratio of the height of the frame to keep, by default `DETECTION_CROP_RATIO`
+        `resize_factor` : `int`, optional
+            The downscale factor of the band, by default `RESIZE_FACTOR`
+        """
+        self.center_ratio = center_ratio
+        self.crop_ratio = crop_ratio
+        self.resize_factor = resize_factor
+
+    def source_rows(self, height: int) -> tuple[int, int]:
+        """
+        Gets the full resolution rows read by the preprocessing for a frame of the specified height.
+
+        Parameters
+        ----------
+        `height` : `int`
+            The height of the frame.
+
+        Returns
+        -------
+        `tuple[int, int]`
+            The y-coordinates of the top and bottom of the band in the frame.
+        """
+        return crop_rows(height, self.center_ratio, self.crop_ratio, self.resize_factor)
+
+    def capture_rows(self, height: int, margin: float = CAPTURE_ROI_MARGIN) -> tuple[int, int]:
+        """
+        Gets the rows a capture backend must copy for the detection and the action probes around the ball.
+
+        Parameters
+        ----------
+        `height` : `int`
+            The height of the frame.
+        `margin` : `float`, optional
+            Extra height kept above & below the band, relative to the frame height, by default `CAPTURE_ROI_MARGIN`
+
+        Returns
+        -------
+        `tuple[int, int]`
+            The y-coordinates of the top and bottom of the region to capture.
+        """
+        y1, y2 = self.source_rows(height)
+        margin_px = int(height * margin)
+        return max(0, y1 - margin_px), min(height, y2 + margin_px)
+
+    def process(self, frame: np.ndarray) -> FrameBand:
+        """
+        Crops and downscales the detection band of the frame.
+
+        Parameters
+        ----------
+        `frame` : `np.ndarray`
+            The full resolution frame.
+
+        Returns
+        -------
+        `FrameBand`
+            The downscaled detection band.
+        """
+        y1, y2 = self.source_rows(frame.shape[0])
+        band = frame[y1:y2]
+        if self.resize_factor != 1:
+            band = cv2.resize(band, (0, 0), fx=1/self.resize_factor, fy=1/self.resize_factor)
+        return FrameBand(band, y1 // self.resize_factor, self.resize_factor)
+
+    def process_batch(self, frames: np.ndarray, height: int | None = None) -> list[FrameBand]:
+        """
+        Crops and downscales the detection bands of a stack of frames, with one resize and one grayscale conversion
+        for the whole stack.
+
+        The bands are the same as those of `process`: the stacked bands are resized as a single image,
+        whose rows are downscaled by blocks of `resize_factor` rows, so no row mixes two frames.
+
+        Parameters
+        ----------
+        `frames` : `np.ndarray`
+            The stacked full resolution frames (N, H, W, 3).
+        `height` : `int | None`, optional
+            If specified, the frames are already cropped to the `source_rows` of frames of this height, by default `None`
+
+        Returns
+        -------
+        `list[FrameBand]`
+            The downscaled detection band of each frame, with their gray conversion already computed.
+        """
+        y1, y2 = self.source_rows(frames.shape[1] if height is None else height)
+        rows = frames if height is not None else frames[:, y1:y2]
+        n, band_height, width = rows.shape[:3]
+        stacked = np.ascontiguousarray(rows).reshape(n * band_height, width, 3)
+        if self.resize_factor != 1:
+            stacked = cv2.resize(stacked, (0, 0), fx=1/self.resize_factor, fy=1/self.resize_factor)
+        gray = cv2.cvtColor(stacked, cv2.COLOR_BGR2GRAY)
+
+        bands = []
+        band_height = stacked.shape[0] // n
+        for i in range(n):
+            band_rows = slice(i * band_height, (i + 1) * band_height)
+            band = FrameBand(stacked[band_rows], y1 // self.resize_factor, self.resize_factor)
+            # Fill the cached conversion
+            band.gray = gray[band_rows]
+            bands.append(band)
+        return bands
@@ -0,0 +1,188 @@
+from ..config import RESIZE_FACTORS, FRAME_BUDGET, MAX_BALL_STEP, MIN_BALL_HIT_RATE
+
+from .preprocessor import FramePreprocessor
+
+
+class ResolutionController:
+    """
+    Adapts the downscale factor of the detection band to the frame time budget and the ball detection confidence.
+
+    The processing time and the ball hit rate are smoothed over the last frames. The band is downscaled more when
+    the processing time exceeds the budget, and less when the time predicted at the finer factor fits well within it,
+    or as soon as the ball is missed too often. The gap between both thresholds and a cooldown after each change
+    prevent the factor from oscillating. A factor left for missing the ball is not used again for a while,
+    twice as long after each failure.
+
+    The detectors derive their sizes (ball radii, line lengths...) from the band height, so they follow the factor.
+    """
+
+    def __init__(self, preprocessor: FramePreprocessor, factors: tuple[int, ...] = RESIZE_FACTORS,
+                 budget: float = FRAME_BUDGET / 1000, max_ball_step: float = MAX_BALL_STEP,
+                 min_hit_rate: float = MIN_BALL_HIT_RATE, high: float = 0.9, low: float = 0.5, window: int = 30,
+                 cooldown: int = 60, min_samples: int = 8, retry: int = 600) -> None:
+        """
+        Parameters
+        ----------
+        `preprocessor` : `FramePreprocessor`
+            The preprocessor whose downscale factor is controlled.
+        `factors` : `tuple[int, ...]`, optional
+            The allowed downscale factors, by default `RESIZE_FACTORS`
+        `budget` : `float`, optional
+            The target processing time of a frame, in seconds, by default `FRAME_BUDGET / 1000`
+        `max_ball_step` : `float`, optional
+            The maximum ball travel between two processed frames, relative to the frame height.
+            It lowers the budget when the ball gets fast, by default `MAX_BALL_STEP`
+        `min_hit_rate` : `float`, optional
+            The minimum rate of frames where the tracked ball is found, by default `MIN_BALL_HIT_RATE`
+        `high` : `float`, optional
+            Ratio of the budget above which the band is downscaled more, by default `0.9`
+        `low` : `float`, optional
+            Ratio of the budget below which the predicted time at the finer factor must be, by default `0.5`
+        `window` : `int`, optional
+            The number of frames of the smoothing, by default `30`
+        `cooldown` : `int`, optional
+            The number of frames without change after a change, by default `60`
+        `min_samples` : `int`, optional
+            The number of frames with a tracked ball needed to check the hit rate, even during the cooldown, by default `8`
+        `retry` : `int`, optional
+            The number of frames before a factor left for missing the ball is first used again, by default `600`
+
+        Raises
+        ------
+        `ValueError`
+            If the factor of the preprocessor is not an allowed factor.
+        """
+        self.factors = tuple(sorted(factors))
+        if preprocessor.resize_factor not in self.factors:
+            raise ValueError(f"Invalid resize factor: {preprocessor.resize_factor} (expected: one of {self.factors})")
+        self.preprocessor = preprocessor
+        self.budget = budget
+        self.max_ball_step = max_ball_step
+        self.min_hit_rate = min_hit_rate
+        self.high = high
+        self.low = low
+        self.smoothing = 2 / (window + 1)
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.retry = retry
+        self.changes = 0
+        self._index = self.factors.index(preprocessor.resize_factor)
+        self._max_index = len(self.factors) - 1
+        self._blocked_frames = 0
+        self._failures = 0
+        self._reset_estimates()
+
+    def _reset_estimates(self) -> None:
+        """
+        Forgets the measures of the previous factor.
+        """
+        self.frame_time = None
+        self.hit_rate = None
+        self._frames = 0
+        self._samples = 0
+
+    @property
+    def factor(self) -> int:
+        """
+        The current downscale factor.
+        """
+        return self.factors[self._index]
+
+    def frame_budget(self, ball_speed: float = 0.0, height: int | None = None) -> float:
+        """
+        Gets the processing time budget of a frame, lowered so the ball does not travel more than `max_ball_step`.
+
+        Parameters
+        ----------
+        `ball_speed` : `float`, optional
+            The horizontal speed of the ball, in pixels per second, by default `0.0`
+        `height` : `int | None`, optional
+            The height of the frame. If `None`, the ball speed is ignored, by default `None`
+
+        Returns
+        -------
+        `float`
+            The budget, in seconds.
+        """
+        if ball_speed > 0 and height is not None:
+            return min(self.budget, self.max_ball_step * height / ball_speed)
+        return self.budget
+
+    def update(self, elapsed: float, ball_found: bool | None = None, ball_speed: float = 0.0,
+               height: int | None = None) -> int:
+        """
+        Measures a processed frame and changes the downscale factor of the preprocessor if needed.
+
+        Parameters
+        ----------
+        `elapsed` : `float`
+            The processing time of the frame, in seconds.
+        `ball_found` : `bool | None`, optional
+            Whether the tracked ball was found in the frame. If `None` (no ball to track), the hit rate is not updated,
+            by default `None`
+        `ball_speed` : `float`, optional
+            The horizontal speed of the ball, in pixels per second, by default `0.0`
+        `height` : `int | None`, optional
+            The height of the frame, by default `None`
+
+        Returns
+        -------
+        `int`
+            The downscale factor for the next frame.
+        """
+        alpha = self.smoothing
+        self.frame_time = elapsed if self.frame_time is None else self.frame_time + alpha * (elapsed - self.frame_time)
+        if ball_found is not None:
+            self._samples += 1
+            self.hit_rate = float(ball_found) if self.hit_rate is None else self.hit_rate + alpha * (ball_found - self.hit_rate)
+        if self._blocked_frames:
+            self._blocked_frames -= 1
+            if not self._blocked_frames:
+                self._max_index = len(self.factors) - 1
+
+        if self._samples >= self.min_samples and self.hit_rate < self.min_hit_rate and self._index > 0:
+            # The ball is missed too often at this factor
+            self._max_index = self._index - 1
+            self._blocked_frames = self.retry * 2 ** self._failures
+            self._failures += 1
+            self._set_index(self._index - 1)
+            return self.factor
+
+        self._frames += 1
+        if self._frames < self.cooldown:
+            return self.factor
+
+        budget = self.frame_budget(ball_speed, height)
+        if self.frame_time > self.high * budget and self._index < self._max_index:
+            self._set_index(self._index + 1)
+        elif self._index > 0:
+            # The processed area grows with the square of the factor ratio
+            ratio = self.factors[self._index] / self.factors[self._index - 1]
+            if self.frame_time * ratio ** 2 < self.low * budget:
+                self._set_index(self._index - 1)
+        return self.factor
+
+    def _set_index(self, index: int) -> None:
+        """
+        Applies a new downscale factor.
+        """
+        self._index = index
+        self.preprocessor.resize_factor = self.factors[index]
+        self.changes += 1
+        self._reset_estimates()
+
+    def metrics(self) -> dict:
+        """
+        Gets the state of the controller.
+
+        Returns
+        -------
+        `dict`
+            The current factor, the smoothed frame time (ms) and ball hit rate, and the number of changes.
+        """
+        return {
+            "resize_factor": self.factor,
+            "frame_time_ms": None if self.frame_time is None else self.frame_time * 1000,
+            "hit_rate": self.hit_rate,
+            "changes": self.changes,
+        }
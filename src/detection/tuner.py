@@ -0,0 +1,387 @@
+import argparse
+import itertools
+import json
+import os
+from multiprocessing import Pool, shared_memory
+from time import perf_counter
+import cv2
+import numpy as np
+
+from ..config import COLOR_RANGES, COLOR_RANGES_PATH
+from ..constants import Direction
+from ..control.action_controller import ActionController
+from ..control.actuator import ClickRecord, RecordingActuator
+from ..control.timing import ClickTiming
+
+from .ball_tracker import BallTracker
+from .colors import ColorClassifier, save_ranges
+from .detector import Detector
+from .preprocessor import FramePreprocessor
+
+# Values tried for each parameter of the detection & decision
+SEARCH_SPACE = {
+    "canny_threshold1": [135, 160, 190, 220],
+    "canny_threshold2": [100, 135, 170, 200],
+    "hough_threshold": [0.25, 0.32, 0.4, 0.5],
+    "min_line_ratio": [0.10, 0.15, 0.20, 0.25],
+    "max_line_gap": [0.02, 0.04, 0.07],
+    "diamond_hue_min": [145, 150, 153],
+    "diamond_hue_max": [156, 160],
+    "diamond_sat_min": [80, 96, 120],
+    "circle_param1": [15, 20, 30],
+    "circle_param2": [0.17, 0.26, 0.33],
+    "ball_min_radius": [0.11, 0.13],
+    "ball_max_radius": [0.15, 0.17],
+    "lookahead": [0.045, 0.05, 0.055, 0.06, 0.065],
+}
+
+# Parameters of the Detector overridden by the tuner
+DETECTOR_PARAMS = ("canny_threshold1", "canny_threshold2", "hough_threshold", "min_line_ratio", "max_line_gap",
+                   "circle_param1", "circle_param2", "ball_min_radius", "ball_max_radius")
+
+# Parameters currently used by the Detector & ActionController
+DEFAULT_PARAMS = {
+    **{name: getattr(Detector, name) for name in DETECTOR_PARAMS},
+    "diamond_hue_min": COLOR_RANGES["DIAMOND"][0][0],
+    "diamond_hue_max": COLOR_RANGES["DIAMOND"][1][0],
+    "diamond_sat_min": COLOR_RANGES["DIAMOND"][0][1],
+    "lookahead": ActionController.lookahead,
+}
+
+# State of the worker processes, set by _init_worker
+_frames = None
+_bands = None
+_labels = None
+_shm = None
+_classifiers = {}
+
+
+class ReplayActuator(RecordingActuator):
+    """
+    Records the clicks decided on replayed frames, as if delivered a fixed latency after the capture of the frame.
+    """
+
+    def __init__(self, latency: float) -> None:
+        """
+        Parameters
+        ----------
+        `latency` : `float`
+            The capture-to-click latency of the clicks, in seconds.
+        """
+        super().__init__()
+        self.latency = latency
+        self.timestamp = 0.0  # Capture time of the frame being decided, in seconds
+
+    def _complete(self, record: ClickRecord) -> None:
+        on_delivered, record.on_delivered = record.on_delivered, None
+        super()._complete(record)
+        # The recorded frames are not captured on the clock of the tuner
+        record.delivered_at = self.timestamp + self.latency
+        if on_delivered is not None:
+            on_delivered(record)
+
+
+def load_labeled_frames(paths: list[str], labels_path: str | None = None) -> tuple[list[np.ndarray], list[dict | None]]:
+    """
+    Loads frames with their labels.
+
+    The labels come from a JSON file mapping frame file names to `{"ball": [x, y, r] or null, "direction": "LEFT" or "RIGHT",
+    "click": bool}`, or from the `metadata.jsonl` file of the recorder folders. The ball coordinates are in frame pixels,
+    the recorder ones are scaled to the recorded frame size. The recorded labels also hold the capture time of the frame,
+    and every label the index of its path, so the frames of a folder are tracked as a sequence.
+
+    Parameters
+    ----------
+    `paths` : `list[str]`
+        Images or folders of frames.
+    `labels_path` : `str | None`, optional
+        The JSON labels file, by default `None`
+
+    Returns
+    -------
+    `tuple[list[np.ndarray], list[dict | None]]`
+        The frames and their labels, `None` for unlabeled frames.
+    """
+    labels_file = {}
+    if labels_path is not None:
+        with open(labels_path) as file:
+            labels_file = json.load(file)
+
+    frames, labels = [], []
+    for sequence, path in enumerate(paths):
+        if os.path.isdir(path):
+            files = sorted(name for name in os.listdir(path) if name.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))
+            metadata_path = os.path.join(path, "metadata.jsonl")
+            metadata = []
+            if os.path.exists(metadata_path):
+                with open(metadata_path) as file:
+                    metadata = [json.loads(line) for line in file]
+            for i, name in enumerate(files):
+                frame = cv2.imread(os.path.join(path, name))
+                label = labels_file.get(name)
+                if label is None and i < len(metadata):
+                    label = _recorded_label(metadata[i], frame.shape)
+                frames.append(frame)
+                labels.append(None if label is None else {**label, "sequence": sequence})
+        else:
+            label = labels_file.get(os.path.basename(path))
+            frames.append(cv2.imread(path))
+            labels.append(None if label is None else {**label, "sequence": sequence})
+    return frames, labels
+
+
+def _recorded_label(metadata: dict, shape: tuple[int, ...]) -> dict:
+    """
+    Converts the metadata of a recorded frame to a label in recorded frame coordinates.
+    """
+    scale = shape[1] / metadata["frame_size"][0]
+    ball = [round(v * scale) for v in metadata["ball"]] if metadata["ball_detected"] else None
+    return {"ball": ball, "direction": metadata["direction"], "click": metadata["clicked"], "timestamp": metadata["timestamp"]}
+
+
+def _init_worker(shm_name: str, shape: tuple[int, ...], sizes: list[tuple[int, int]], labels: list[dict | None],
+                 latency: float) -> None:
+    """
+    Attaches a worker to the shared frames, preprocesses them once, and replaces the clicks by replayed ones.
+    """
+    global _frames, _bands, _labels, _shm
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray(shape, dtype=np.uint8, buffer=_shm.buf)
+    _frames = [block[i, :height, :width] for i, (height, width) in enumerate(sizes)]
+    preprocessor = FramePreprocessor()
+    _bands = []
+    for frame in _frames:
+        band = preprocessor.process(frame)
+        band.gray
+        _bands.append(band)
+    _labels = labels
+    ActionController.actuator = ReplayActuator(latency)
+
+
+def diamond_range(params: dict) -> tuple[tuple[int, int, int], tuple[int, int, int]]:
+    """
+    Gets the HSV range of the diamonds of a set of parameters, as in `COLOR_RANGES`.
+    """
+    return (params["diamond_hue_min"], params["diamond_sat_min"], 175), (params["diamond_hue_max"], 255, 255)
+
+
+def get_classifier(params: dict) -> ColorClassifier:
+    """
+    Gets the color lookup table of a set of parameters, built once per diamond range.
+    """
+    key = diamond_range(params)
+    if key not in _classifiers:
+        _classifiers[key] = ColorClassifier({**COLOR_RANGES, "DIAMOND": key}, path=None)
+    return _classifiers[key]
+
+
+def apply_params(params: dict) -> None:
+    """
+    Sets a set of parameters on the `Detector` & `ActionController` of the process.
+    """
+    for name in DETECTOR_PARAMS:
+        setattr(Detector, name, params[name])
+    Detector.colors = ActionController.colors = get_classifier(params)
+    ActionController.lookahead = params["lookahead"]
+
+
+def evaluate(params: dict) -> dict:
+    """
+    Evaluates a set of parameters on the frames of the worker.
+
+    The frames go through the detection & decision of the bot with the parameters applied: the ball is tracked
+    by a `BallTracker` with `BALL_DETECTOR`, the path edges are detected with `EDGE_DETECTOR`, and the click is decided
+    by the `ActionController`, whose probes are pushed by the `ClickTiming` compensation on the recorded frames.
+    The tracker and the timing estimates are reset at the start of each sequence of frames.
+
+    Returns
+    -------
+    `dict`
+        The parameters, the ball accuracy (found within half a radius, or not found when there is no ball),
+        the click decision accuracy, their mean as score, and the mean detection latency per frame.
+    """
+    ball_hits = ball_total = click_hits = click_total = 0
+    elapsed = 0.0
+    # The color lookup table is built before the timings
+    apply_params(params)
+    actuator = ActionController.actuator
+    tracker = BallTracker()
+    ActionController.timing = ClickTiming()
+    sequence = direction = None
+    for frame, band, label in zip(_frames, _bands, _labels):
+        label = label or {}
+        timestamp = label.get("timestamp")
+        if timestamp is None or label.get("sequence") != sequence:
+            tracker.reset()
+            ActionController.timing.reset()
+            sequence = label.get("sequence")
+        direction = Direction[label["direction"]] if "direction" in label else direction or Direction.RIGHT
+
+        start = perf_counter()
+        ball = tracker.update(band, direction, timestamp)
+        lines = Detector.detect_path_edges(frame, band)
+        elapsed += perf_counter() - start
+
+        if "ball" in label:
+            ball_total += 1
+            expected = label["ball"]
+            if expected is None:
+                ball_hits += not ball[2]
+            elif ball[2]:
+                ball_hits += np.hypot(ball[0] - expected[0], ball[1] - expected[1]) <= max(expected[2], 2) / 2
+        position = expected_ball_position(label, ball)
+        if "click" in label and position is not None:
+            click_total += 1
+            actuator.timestamp = timestamp or 0.0
+            clicked = ActionController.decide_action(position[:2], lines, frame, direction, timestamp)
+            click_hits += clicked == label["click"]
+
+    ball_accuracy = ball_hits / ball_total if ball_total else None
+    click_accuracy = click_hits / click_total if click_total else None
+    accuracies = [accuracy for accuracy in (ball_accuracy, click_accuracy) if accuracy is not None]
+    return {
+        "params": params,
+        "ball_accuracy": ball_accuracy,
+        "click_accuracy": click_accuracy,
+        "score": float(np.mean(accuracies)) if accuracies else 0.0,
+        "latency_ms": elapsed * 1000 / max(1, len(_frames)),
+    }
+
+
+def expected_ball_position(label: dict, ball: tuple[int, int, int]) -> tuple[int, int, int] | None:
+    """
+    Gets the ball position used to evaluate the click decision: the labeled ball if any, else the detected one.
+    """
+    if label.get("ball") is not None:
+        return tuple(label["ball"])
+    return ball if ball[2] else None
+
+
+def sample_params(space: dict[str, list], samples: int | None, seed: int = 0) -> list[dict]:
+    """
+    Gets the parameter sets to evaluate: the whole grid, or a random sample of it, always with the default parameters.
+
+    Parameters
+    ----------
+    `space` : `dict[str, list]`
+        The values tried for each parameter.
+    `samples` : `int | None`
+        Number of random parameter sets. If `None`, the whole grid is used.
+    `seed` : `int`, optional
+        Seed of the random sample, by default `0`
+
+    Returns
+    -------
+    `list[dict]`
+        The parameter sets.
+    """
+    names = list(space)
+    if samples is None:
+        candidates = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    else:
+        rng = np.random.default_rng(seed)
+        candidates = [{name: space[name][rng.integers(len(space[name]))] for name in names} for _ in range(samples)]
+    candidates = [{**DEFAULT_PARAMS, **params} for params in candidates]
+    if DEFAULT_PARAMS not in candidates:
+        candidates.insert(0, dict(DEFAULT_PARAMS))
+    return [{name: value.item() if isinstance(value, np.generic) else value for name, value in params.items()}
+            for params in candidates]
+
+
+def tune(frames: list[np.ndarray], labels: list[dict | None], candidates: list[dict],
+         workers: int | None = None, latency: float = 0.01) -> list[dict]:
+    """
+    Evaluates parameter sets in parallel, the frames being shared with the workers through shared memory.
+
+    Parameters
+    ----------
+    `frames` : `list[np.ndarray]`
+        The BGR frames.
+    `labels` : `list[dict | None]`
+        The label of each frame.
+    `candidates` : `list[dict]`
+        The parameter sets to evaluate.
+    `workers` : `int | None`, optional
+        Number of worker processes. If `None`, one per CPU, by default `None`
+    `latency` : `float`, optional
+        The capture-to-click latency of the replayed clicks, in seconds, by default `0.01`
+
+    Returns
+    -------
+    `list[dict]`
+        The evaluations, ranked by decreasing score then increasing latency.
+    """
+    # One block holds every frame, padded to the largest size
+    sizes = [frame.shape[:2] for frame in frames]
+    shape = (len(frames), max(height for height, _ in sizes), max(width for _, width in sizes), 3)
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    try:
+        block = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        for i, frame in enumerate(frames):
+            block[i, :frame.shape[0], :frame.shape[1]] = frame
+        del block
+        with Pool(workers, initializer=_init_worker, initargs=(shm.name, shape, sizes, labels, latency)) as pool:
+            results = pool.map(evaluate, candidates, chunksize=max(1, len(candidates) // (8 * (workers or os.cpu_count()))))
+    finally:
+        shm.close()
+        shm.unlink()
+    return sorted(results, key=lambda result: (-result["score"], result["latency_ms"]))
+
+
+def pareto_front(results: list[dict]) -> list[dict]:
+    """
+    Gets the evaluations not beaten in both score and latency by another one.
+    """
+    front, best_latency = [], np.inf
+    for result in sorted(results, key=lambda result: (-result["score"], result["latency_ms"])):
+        if result["latency_ms"] < best_latency:
+            front.append(result)
+            best_latency = result["latency_ms"]
+    return front
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the detection & decision parameters on labeled frames.")
+    parser.add_argument("paths", nargs="*", default=[os.path.join("images", f"game_sample_{i}.jpg") for i in (1, 2, 3)],
+                        help="Images or folders of frames (recorder folders are labeled by their metadata)")
+    parser.add_argument("--labels", help="JSON file of the labels, by frame file name")
+    parser.add_argument("--samples", type=int, default=200, help="Number of random parameter sets (0 for the whole grid)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random parameter sets")
+    parser.add_argument("--latency", type=float, default=10, help="Capture-to-click latency of the replayed clicks, in ms")
+    parser.add_argument("--top", type=int, default=15, help="Number of ranked parameter sets printed")
+    parser.add_argument("--output", help="JSON file of all the evaluations")
+    parser.add_argument("--colors", nargs="?", const=COLOR_RANGES_PATH,
+                        help=f"Write the color ranges of the best parameters, reloaded by a running bot (default: {COLOR_RANGES_PATH})")
+    args = parser.parse_args()
+
+    frames, labels = load_labeled_frames(args.paths, args.labels)
+    if all(label is None for label in labels):
+        # Without labels, compare with the detections of the current parameters
+        labels = []
+        for frame in frames:
+            ball = Detector.detect_ball(frame)
+            labels.append({"ball": list(map(int, ball)) if ball[2] else None})
+        print("No labels: the detections of the current parameters are used as labels")
+
+    candidates = sample_params(SEARCH_SPACE, args.samples or None, args.seed)
+    start = perf_counter()
+    results = tune(frames, labels, candidates, args.workers, args.latency / 1000)
+    print(f"{len(candidates)} parameter sets evaluated on {len(frames)} frames in {perf_counter() - start:.1f} s")
+
+    front = {id(result) for result in pareto_front(results)}
+    names = list(DEFAULT_PARAMS)
+    print(f"{'Rank':>4}{'Score':>7}{'Ball':>7}{'Click':>7}{'ms':>7}  Pareto  " + " ".join(names))
+    for rank, result in enumerate(results[:args.top], 1):
+        ball = "-" if result["ball_accuracy"] is None else f"{result['ball_accuracy']:.2f}"
+        click = "-" if result["click_accuracy"] is None else f"{result['click_accuracy']:.2f}"
+        default = " (current)" if result["params"] == DEFAULT_PARAMS else ""
+        print(f"{rank:>4}{result['score']:>7.2f}{ball:>7}{click:>7}{result['latency_ms']:>7.3f}  "
+              f"{'*' if id(result) in front else ' ':^6}  " + " ".join(str(result["params"][name]) for name in names) + default)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.colors:
+        save_ranges(args.colors, {**COLOR_RANGES, "DIAMOND": diamond_range(results[0]["params"])})
+        print(f"Color ranges of the best parameters written to {args.colors}")
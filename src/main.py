@@ -1,77 +1,221 @@
-import cv2
-import os
-import pyautogui
-from time import time
+from time import perf_counter, time
 
-from .config import WINDOW_NAME, VISION_EN, WINDOW_HEIGHT, PROCESSING_DELAY
-from .constants import Align, Direction
+from .config import (WINDOW_NAME, VISION_EN, WINDOW_HEIGHT, PROCESSING_DELAY, FRAME_SOURCE, CAPTURE_ROI_EN, PIPELINE_THREADED,
+                     ACTUATOR, RECORDER_EN, ADAPTIVE_RESIZE_EN, PATH_MAP_EN, PATH_EDGES_INTERVAL,
+                     EDGES_INCREMENTAL_EN, GAME_STATE_EN)
+from .constants import Align, Direction, GameState
 
-from .capture.screen_capture import ScreenCapture
-from .control.action_controller import ActionController, Actions
+from .capture.frame_source import FrameSource, create_frame_source
+from .control.action_controller import ActionController
+from .control.actuator import create_actuator
+from .control.path_map import PathMap
+from .detection.ball_tracker import BallTracker
 from .detection.detector import Detector
-from .ui.drawing_manager import DrawingManager
+from .detection.edge_tracker import IncrementalEdgeDetector
+from .detection.game_state import GameStateDetector
+from .detection.resolution import ResolutionController
+from .pipeline.instrumentation import Instrumentation, create_instrumentation
+from .pipeline.recorder import SessionRecorder
+from .pipeline.runtime import PipelineRuntime
+from .ui.viewer import VisionPublisher
 
 
 def main():
-    pyautogui.PAUSE = 0
-
     # Setup initial game start conditions
-    ScreenCapture.set_window_pos_size(WINDOW_NAME, WINDOW_HEIGHT, Align.NONE)
-    center = ScreenCapture.get_window_center(WINDOW_NAME)
-    Actions.move_mouse_to(*center)
-    Actions.click()
+    if FRAME_SOURCE == "window":
+        # Imported here so the loops can run headless on the other sources
+        import pyautogui
+        from .capture.screen_capture import ScreenCapture
+        from .control.actions import Actions
+
+        pyautogui.PAUSE = 0
+
+        ScreenCapture.set_window_pos_size(WINDOW_NAME, WINDOW_HEIGHT, Align.NONE)
+        center = ScreenCapture.get_window_center(WINDOW_NAME)
+        Actions.move_mouse_to(*center)
+        Actions.click()
+
+    # Only capture the detection band when the frames are not displayed
+    roi = Detector.preprocessor.capture_rows if CAPTURE_ROI_EN and not VISION_EN else None
+    source = create_frame_source(FRAME_SOURCE, roi)
+    # The recordings and the vision window are handled by separate processes
+    recorder = SessionRecorder() if RECORDER_EN else None
+    publisher = VisionPublisher(on_save=recorder.save if recorder is not None else None) if VISION_EN else None
+    ActionController.actuator = create_actuator("simulator" if FRAME_SOURCE == "simulator" else ACTUATOR)
+    instrumentation = create_instrumentation()
+    resolution = ResolutionController(Detector.preprocessor) if ADAPTIVE_RESIZE_EN else None
+    path_map = PathMap() if PATH_MAP_EN else None
+    game_state = GameStateDetector() if GAME_STATE_EN else None
+    try:
+        if PIPELINE_THREADED:
+            run_threaded(source, publisher, instrumentation, recorder, resolution, path_map, game_state)
+        else:
+            run_sequential(source, publisher, instrumentation, recorder, resolution, path_map, game_state)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        instrumentation.close()
+        ActionController.actuator.close()
+        if publisher is not None:
+            publisher.close()
+        if recorder is not None:
+            recorder.close()
+        source.close()
 
+
+def run_sequential(source: FrameSource, publisher: VisionPublisher | None = None,
+                   instrumentation: Instrumentation | None = None, recorder: SessionRecorder | None = None,
+                   resolution: ResolutionController | None = None, path_map: PathMap | None = None,
+                   game_state: GameStateDetector | None = None) -> None:
+    """
+    Runs capture, detection and actuation one after another on the main thread.
+
+    Parameters
+    ----------
+    `source` : `FrameSource`
+        The source of the frames.
+    `publisher` : `VisionPublisher | None`, optional
+        Publisher of the processed frames to the vision window, by default `None`
+    `instrumentation` : `Instrumentation | None`, optional
+        Timings of the stages. If `None`, the timings are only kept in memory, by default `None`
+    `recorder` : `SessionRecorder | None`, optional
+        Recorder of the processed frames, saved when the ball is lost, by default `None`
+    `resolution` : `ResolutionController | None`, optional
+        Controller of the detection band downscale factor, fed with the frame processing time, by default `None`
+    `path_map` : `PathMap | None`, optional
+        Map of the path edges merged across frames. If specified, the path edges are only detected
+        every `PATH_EDGES_INTERVAL` frames and the decisions use the map, by default `None`
+    `game_state` : `GameStateDetector | None`, optional
+        Detector of the game state. If specified, the ball & path edges are only detected during the rounds,
+        and the menu screens are clicked through, by default `None`
+    """
+    instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+    instrumentation.add_metrics("click_timing", ActionController.timing.metrics)
+    record = instrumentation.record
     direction = Direction.RIGHT
     START_TIME = time()
-    balls_not_found = 0
+    tracker = BallTracker()
+    edge_detector = IncrementalEdgeDetector() if EDGES_INCREMENTAL_EN else None
+    detect_path_edges = edge_detector.detect if edge_detector is not None else Detector.detect_path_edges
     ball_detected = True
-    fps_list = []
-    loop_time = time()
-    while True:
-        frame = ScreenCapture.capture_window(WINDOW_NAME)
+    was_detected = False
+    index = 0
+    while publisher is None or not publisher.quit_requested:
+        timestamp = perf_counter()
+        frame = source.read()
+        if frame is None:
+            break
+        start = captured = record("capture", timestamp, index=index)
 
         # Start processing when game starts
         if time() - START_TIME >= PROCESSING_DELAY / 1000:
-            x, y, r = Detector.detect_ball(frame)
-            if (x, y, r) == (0, 0, 0):
-                balls_not_found += 1
-                if balls_not_found >= 10:
-                    ball_detected = False
-            else:
-                balls_not_found = 0
-            lines = Detector.detect_path_edges(frame)
-            lines_img = DrawingManager.get_path_edges_image(frame, lines)
+            if game_state is not None:
+                was_playing = game_state.state == GameState.PLAYING
+                ball = tracker.position if tracker.misses == 0 else None
+                state, click = game_state.update(frame, ball, not tracker.ball_detected, timestamp)
+                if click is not None:
+                    ActionController.actuator.click(*(source.screen_point(*click) or (None, None)))
+                start = record("game_state", start, index=index)
+                if state != GameState.PLAYING:
+                    was_detected = False
+                    if publisher is not None:
+                        publisher.publish(frame, (0, 0, 0), False, None, (), index)
+                        record("publish", start, index=index)
+                    record("frame", timestamp, index=index)
+                    instrumentation.maybe_dump()
+                    index += 1
+                    continue
+                if not was_playing:
+                    # New round
+                    direction = Direction.RIGHT
+                    tracker.reset()
+                    ActionController.timing.reset()
+                    if edge_detector is not None:
+                        edge_detector.reset()
+                    if path_map is not None:
+                        path_map.reset()
+
+            band = Detector.preprocessor.process(frame)
+            start = record("preprocess", start, index=index)
+            x, y, r = tracker.update(band, direction, timestamp)
+            ball_detected = tracker.ball_detected
+            start = record("detect_ball", start, index=index)
+            lines = None
+            if path_map is None or index % PATH_EDGES_INTERVAL == 0:
+                lines = detect_path_edges(frame, band)
+                start = record("detect_path_edges", start, index=index)
+            if path_map is not None:
+                if ball_detected:
+                    path_map.update((x, y, r), lines, direction, frame.shape)
+                else:
+                    path_map.reset()
+                lines = path_map.screen_lines(lines)
+                start = record("path_map", start, index=index)
 
+            frame_direction, changed_dir = direction, False
             if ball_detected:
-                changed_dir = ActionController.decide_action((x, y), lines_img, frame, direction)
+                changed_dir = ActionController.decide_action((x, y), lines, frame, direction, timestamp)
                 if changed_dir:
                     direction = Direction.RIGHT if direction == Direction.LEFT else Direction.LEFT
+                start = record("decide_action", start, index=index)
 
-        if VISION_EN:
-            # Start drawing when game starts
-            if time() - START_TIME >= PROCESSING_DELAY / 1000:
-                if ball_detected:
-                    DrawingManager.draw_ball(frame, x, y, r)
-                DrawingManager.draw_path_edges(frame, lines)
-
-            # Compute and display average FPS
-            fps = 1 / (time() - loop_time)
-            loop_time = time()
-            fps_list.append(fps)
-            if len(fps_list) > 50:
-                fps_list.pop(0)
-            avg_fps = sum(fps_list) / len(fps_list)
-            DrawingManager.draw_fps(frame, avg_fps)
-
-            cv2.imshow("ZigZag Vision", frame)
-
-        key = cv2.waitKey(1)
-        # Exit when 'q' key is pressed
-        if key == ord("q"):
-            cv2.destroyAllWindows()
-            break
-        elif key == ord("s"):
-            cv2.imwrite(os.path.join("images", "screenshot.jpg"), frame)
+            if resolution is not None:
+                ball_found = tracker.misses == 0 if ball_detected else None
+                resolution.update(start - captured, ball_found, ActionController.timing.speed, frame.shape[0])
+
+            if recorder is not None:
+                recorder.record(frame, timestamp, index, (x, y, r), ball_detected, lines, frame_direction, changed_dir)
+                # Save the end of the round when the ball is lost
+                if was_detected and not ball_detected:
+                    recorder.save("lost")
+                start = record("record", start, index=index)
+            was_detected = ball_detected
+
+            if publisher is not None:
+                probes = ActionController.last_probes if ball_detected else ()
+                publisher.publish(frame, (x, y, r), ball_detected, lines, probes, index)
+                record("publish", start, index=index)
+            record("frame", timestamp, index=index)
+            instrumentation.maybe_dump()
+        index += 1
+
+
+def run_threaded(source: FrameSource, publisher: VisionPublisher | None = None,
+                 instrumentation: Instrumentation | None = None, recorder: SessionRecorder | None = None,
+                 resolution: ResolutionController | None = None, path_map: PathMap | None = None,
+                 game_state: GameStateDetector | None = None) -> None:
+    """
+    Runs capture, detection and actuation on separate threads until the source ends or 'q' is pressed in the vision window.
+
+    Parameters
+    ----------
+    `source` : `FrameSource`
+        The source of the frames.
+    `publisher` : `VisionPublisher | None`, optional
+        Publisher of the processed frames to the vision window, by default `None`
+    `instrumentation` : `Instrumentation | None`, optional
+        Timings of the stages. If `None`, the timings are only kept in memory, by default `None`
+    `recorder` : `SessionRecorder | None`, optional
+        Recorder of the processed frames, saved when the ball is lost, by default `None`
+    `resolution` : `ResolutionController | None`, optional
+        Controller of the detection band downscale factor, fed with the detection time, by default `None`
+    `path_map` : `PathMap | None`, optional
+        Map of the path edges merged across frames. If specified, the path edges are only detected
+        every `PATH_EDGES_INTERVAL` frames and the decisions use the map, by default `None`
+    `game_state` : `GameStateDetector | None`, optional
+        Detector of the game state. If specified, the ball & path edges are only detected during the rounds,
+        and the menu screens are clicked through, by default `None`
+    """
+    runtime = PipelineRuntime(source, publisher=publisher, instrumentation=instrumentation, recorder=recorder,
+                              resolution=resolution, path_map=path_map, game_state=game_state)
+    runtime.start()
+    try:
+        while not runtime.wait(0.1):
+            runtime.instrumentation.maybe_dump()
+            if publisher is not None and publisher.quit_requested:
+                break
+    finally:
+        runtime.stop()
 
 
 if __name__ == "__main__":
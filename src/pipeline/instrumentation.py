@@ -0,0 +1,219 @@
+from collections import deque
+import json
+import os
+import threading
+from time import perf_counter, time
+from typing import Callable
+import numpy as np
+
+from ..config import METRICS_EN, METRICS_DIR, METRICS_INTERVAL, METRICS_WINDOW, TRACE_EN
+
+
+class StageStats:
+    """
+    Durations of the last runs of a stage, in a fixed-size ring buffer.
+    """
+    __slots__ = ("count", "total", "maximum", "_durations")
+
+    def __init__(self, window: int) -> None:
+        """
+        Parameters
+        ----------
+        `window` : `int`
+            Number of durations kept for the percentiles.
+        """
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self._durations = np.zeros(window)
+
+    def add(self, duration: float) -> None:
+        """
+        Records the duration of a run, in seconds.
+        """
+        self._durations[self.count % len(self._durations)] = duration
+        self.count += 1
+        self.total += duration
+        if duration > self.maximum:
+            self.maximum = duration
+
+    def summary(self) -> dict[str, float]:
+        """
+        Gets the statistics of the stage.
+
+        Returns
+        -------
+        `dict[str, float]`
+            The number of runs, the mean and maximum durations since the start,
+            and the p50, p95 & p99 durations over the last runs. Durations are in milliseconds.
+        """
+        durations = self._durations[:min(self.count, len(self._durations))] * 1000
+        p50, p95, p99 = np.percentile(durations, (50, 95, 99)) if len(durations) else (0.0, 0.0, 0.0)
+        return {
+            "count": self.count,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": self.maximum * 1000,
+        }
+
+
+class Instrumentation:
+    """
+    Low overhead timing of the pipeline stages.
+
+    Each stage run is recorded with its `perf_counter` start & end times. The durations go into per-stage ring buffers,
+    summarized with percentiles and periodically appended to a JSONL file, along with the metrics of other components. The runs can also be kept as Chrome trace events
+    (open the trace file in chrome://tracing or Perfetto) to see how the stages of each frame overlap.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW, jsonl_path: str | None = None, trace_path: str | None = None,
+                 dump_interval: float = METRICS_INTERVAL, max_trace_events: int = 200_000) -> None:
+        """
+        Parameters
+        ----------
+        `window` : `int`, optional
+            Number of durations kept per stage for the percentiles, by default `METRICS_WINDOW`
+        `jsonl_path` : `str | None`, optional
+            File to which the summaries are appended. If `None`, nothing is written, by default `None`
+        `trace_path` : `str | None`, optional
+            Chrome trace-event file written on close. If `None`, no trace is kept, by default `None`
+        `dump_interval` : `float`, optional
+            Minimum time between two summaries written to the JSONL file, in seconds, by default `METRICS_INTERVAL`
+        `max_trace_events` : `int`, optional
+            Number of most recent stage runs kept in the trace, by default `200_000`
+        """
+        self.window = window
+        self.jsonl_path = jsonl_path
+        self.trace_path = trace_path
+        self.dump_interval = dump_interval
+        self.stages: dict[str, StageStats] = {}
+        self.metrics: dict[str, Callable[[], dict]] = {}  # Metrics providers dumped with the stages, by name
+        self._events = deque(maxlen=max_trace_events) if trace_path else None
+        self._origin = perf_counter()
+        self._last_dump = self._origin
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, start: float, end: float | None = None, index: int = -1) -> float:
+        """
+        Records a run of a stage.
+
+        Parameters
+        ----------
+        `stage` : `str`
+            The name of the stage.
+        `start` : `float`
+            The `perf_counter` time at which the run started.
+        `end` : `float | None`, optional
+            The `perf_counter` time at which the run ended. If `None`, the current time is used, by default `None`
+        `index` : `int`, optional
+            The index of the processed frame, shown in the trace, by default `-1`
+
+        Returns
+        -------
+        `float`
+            The end time, so that consecutive stages can be chained.
+        """
+        end = perf_counter() if end is None else end
+        stats = self.stages.get(stage)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(stage, StageStats(self.window))
+        stats.add(end - start)
+        if self._events is not None:
+            self._events.append((stage, start, end, threading.get_ident(), index))
+        return end
+
+    def add_metrics(self, name: str, provider: Callable[[], dict]) -> None:
+        """
+        Adds metrics to the summaries appended to the JSONL file.
+
+        Parameters
+        ----------
+        `name` : `str`
+            The key of the metrics in the summaries.
+        `provider` : `Callable[[], dict]`
+            Function giving the current metrics, called on each dump.
+        """
+        self.metrics[name] = provider
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        Gets the statistics of every stage.
+        """
+        return {stage: stats.summary() for stage, stats in list(self.stages.items())}
+
+    def maybe_dump(self) -> bool:
+        """
+        Appends the summary to the JSONL file if the dump interval elapsed since the previous one.
+
+        Returns
+        -------
+        `bool`
+            `True` if the summary was written; otherwise, `False`.
+        """
+        if self.jsonl_path is None or perf_counter() - self._last_dump < self.dump_interval:
+            return False
+        self.dump()
+        return True
+
+    def dump(self) -> None:
+        """
+        Appends the summary to the JSONL file.
+        """
+        self._last_dump = perf_counter()
+        if self.jsonl_path is None:
+            return
+        os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+        with open(self.jsonl_path, "a") as file:
+            metrics = {name: provider() for name, provider in self.metrics.items()}
+            file.write(json.dumps({"time": time(), "uptime": self._last_dump - self._origin, "stages": self.summary(),
+                                   **metrics}) + "\n")
+
+    def write_trace(self) -> None:
+        """
+        Writes the recorded stage runs to the Chrome trace-event file.
+        """
+        if self.trace_path is None:
+            return
+        pid = os.getpid()
+        events = [{
+            "name": stage, "ph": "X", "pid": pid, "tid": tid,
+            "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6,
+            "args": {"frame": index},
+        } for stage, start, end, tid, index in list(self._events)]
+        os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+        with open(self.trace_path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def close(self) -> None:
+        """
+        Writes the last summary and the trace.
+        """
+        if self.stages:
+            self.dump()
+        self.write_trace()
+
+
+def create_instrumentation(name: str = "pipeline") -> Instrumentation:
+    """
+    Creates the instrumentation of a process with the files selected in the configuration.
+
+    The stages are always timed; the files are only written when `METRICS_EN` is `True`.
+
+    Parameters
+    ----------
+    `name` : `str`, optional
+        The base name of the files in `METRICS_DIR`, by default `"pipeline"`
+
+    Returns
+    -------
+    `Instrumentation`
+        The created instrumentation.
+    """
+    if not METRICS_EN:
+        return Instrumentation()
+    jsonl_path = os.path.join(METRICS_DIR, f"{name}.jsonl")
+    trace_path = os.path.join(METRICS_DIR, f"{name}_trace.json") if TRACE_EN else None
+    return Instrumentation(jsonl_path=jsonl_path, trace_path=trace_path)
@@ -0,0 +1,75 @@
+import threading
+
+
+class LatestSlot:
+    """
+    Single-slot buffer between two threads where the latest item wins.
+
+    Putting an item replaces the one waiting in the slot, so a slow consumer always gets the most recent item
+    instead of a backlog of stale ones.
+    """
+
+    def __init__(self) -> None:
+        self._item = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self.dropped = 0  # Number of items replaced before being consumed
+
+    def put(self, item):
+        """
+        Puts an item in the slot, replacing the waiting one.
+
+        Parameters
+        ----------
+        `item` : `Any`
+            The item to put. Must not be `None`.
+
+        Returns
+        -------
+        `Any | None`
+            The replaced item that was never consumed, or `None`.
+        """
+        with self._condition:
+            dropped, self._item = self._item, item
+            if dropped is not None:
+                self.dropped += 1
+            self._condition.notify()
+        return dropped
+
+    def get(self, timeout: float | None = None):
+        """
+        Takes the item from the slot, waiting for one if the slot is empty.
+
+        Parameters
+        ----------
+        `timeout` : `float | None`, optional
+            Maximum waiting time in seconds. If `None`, waits until an item is put or the slot is closed, by default `None`
+
+        Returns
+        -------
+        `Any | None`
+            The item, or `None` if the timeout expired or the slot is closed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+        return item
+
+    def close(self):
+        """
+        Closes the slot and wakes up the waiting consumer.
+
+        Returns
+        -------
+        `Any | None`
+            The item left in the slot, or `None`.
+        """
+        with self._condition:
+            self._closed = True
+            item, self._item = self._item, None
+            self._condition.notify_all()
+        return item
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
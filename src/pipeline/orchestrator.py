@@ -0,0 +1,528 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import re
+from time import perf_counter
+import cv2
+import numpy as np
+
+from ..config import (WINDOW_HEIGHT, CAPTURE_ROI_EN, PIPELINE_THREADED, ACTUATOR, ACTUATOR_ASYNC, ADAPTIVE_RESIZE_EN,
+                      PATH_MAP_EN, GAME_STATE_EN, METRICS_INTERVAL, REPLAY_FPS, SIM_SEED)
+from ..constants import Align
+
+from ..capture.frame_source import FrameSource, WindowFrameSource
+from ..control.action_controller import ActionController
+from ..control.actuator import Actuator, AsyncActuator, create_actuator
+from ..control.path_map import PathMap
+from ..detection.detector import Detector
+from ..detection.game_state import GameStateDetector
+from ..detection.resolution import ResolutionController
+from .instrumentation import create_instrumentation
+
+INSTANCE_KINDS = ("window", "replay", "simulator")
+
+
+class InstanceSpec:
+    """
+    Game instance driven by the orchestrator: an emulator window, a recording or a simulated game.
+    """
+    __slots__ = ("kind", "target", "name", "position")
+
+    def __init__(self, kind: str, target: str | int | None = None, name: str | None = None) -> None:
+        """
+        Parameters
+        ----------
+        `kind` : `str`
+            The kind of frame source: `"window"`, `"replay"` or `"simulator"`.
+        `target` : `str | int | None`, optional
+            The window name, the replayed path or the simulator seed, by default `None`
+        `name` : `str | None`, optional
+            The name of the instance in the reports and the metrics files. If `None`, it is derived
+            from the kind and the target, by default `None`
+
+        Raises
+        ------
+        `ValueError`
+            If the kind is invalid, or a window or replay instance has no target.
+        """
+        if kind not in INSTANCE_KINDS:
+            raise ValueError(f"Invalid instance kind: {kind} (expected: {', '.join(map(repr, INSTANCE_KINDS))})")
+        if kind != "simulator" and not target:
+            raise ValueError(f"Invalid {kind} instance: no target (expected: '{kind}:<{'window name' if kind == 'window' else 'path'}>')")
+        self.kind = kind
+        self.target = target
+        self.name = name if name is not None else re.sub(r"\W+", "_", f"{kind}_{target}").strip("_")
+        self.position = None  # Screen position of the clicks, set when a window is prepared
+
+    @classmethod
+    def parse(cls, text: str, index: int = 0) -> "InstanceSpec":
+        """
+        Parses an instance from the command line: `window:<window name>`, `replay:<path>` or `simulator[:<seed>]`.
+
+        Parameters
+        ----------
+        `text` : `str`
+            The instance description.
+        `index` : `int`, optional
+            The position of the instance, giving the seed of the simulators without one, by default `0`
+
+        Returns
+        -------
+        `InstanceSpec`
+            The parsed instance.
+        """
+        kind, _, target = text.partition(":")
+        if kind == "simulator":
+            return cls(kind, int(target) if target else SIM_SEED + index)
+        return cls(kind, target)
+
+    def __repr__(self) -> str:
+        return f"InstanceSpec({self.kind!r}, {self.target!r}, name={self.name!r})"
+
+
+def available_cpus() -> list[int]:
+    """
+    Gets the CPUs the current process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(count: int, cpus: list[int] | None = None) -> list[list[int]]:
+    """
+    Splits the CPUs between the instances.
+
+    Each instance gets its own contiguous group of CPUs while there are enough of them; otherwise the instances
+    share the CPUs one each, in turn.
+
+    Parameters
+    ----------
+    `count` : `int`
+        The number of instances.
+    `cpus` : `list[int] | None`, optional
+        The CPUs to use. If `None`, every available CPU is used, by default `None`
+
+    Returns
+    -------
+    `list[list[int]]`
+        The CPUs of each instance.
+    """
+    cpus = available_cpus() if cpus is None else list(cpus)
+    if count <= len(cpus):
+        return [group.tolist() for group in np.array_split(cpus, count)]
+    return [[cpus[i % len(cpus)]] for i in range(count)]
+
+
+def pin_process(cpus: list[int]) -> None:
+    """
+    Restricts the current process, and the OpenCV threads, to the specified CPUs.
+
+    Parameters
+    ----------
+    `cpus` : `list[int]`
+        The CPUs to run on.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    elif os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetProcessAffinityMask(kernel32.GetCurrentProcess(), sum(1 << cpu for cpu in cpus))
+    # One OpenCV worker per CPU, so the instances do not oversubscribe each other's CPUs
+    cv2.setNumThreads(len(cpus))
+
+
+def prepare_window(spec: InstanceSpec) -> None:
+    """
+    Resizes the window of an instance, starts the game and sets the click position to the window center.
+
+    The windows are prepared one at a time by the orchestrator, as they are brought to the foreground.
+
+    Parameters
+    ----------
+    `spec` : `InstanceSpec`
+        The window instance.
+    """
+    # Imported here so the other instances can run headless
+    import pyautogui
+    from ..capture.screen_capture import ScreenCapture
+
+    pyautogui.PAUSE = 0
+    ScreenCapture.set_window_pos_size(spec.target, WINDOW_HEIGHT, Align.NONE)
+    spec.position = ScreenCapture.get_window_center(spec.target)
+    pyautogui.click(*spec.position)
+
+
+class InstanceSource(FrameSource):
+    """
+    Frame source of an instance process, ending at the deadline or on the orchestrator request,
+    and periodically reporting the frame rate.
+    """
+
+    def __init__(self, source: FrameSource, name: str, reports, stop, duration: float | None = None,
+                 interval: float = METRICS_INTERVAL) -> None:
+        """
+        Parameters
+        ----------
+        `source` : `FrameSource`
+            The frame source of the instance.
+        `name` : `str`
+            The name of the instance.
+        `reports` : `multiprocessing.Queue`
+            The queue of the reports to the orchestrator.
+        `stop` : `multiprocessing.Event`
+            The event set by the orchestrator to stop the instances.
+        `duration` : `float | None`, optional
+            The running time of the instance, in seconds. If `None`, it runs until the source ends, by default `None`
+        `interval` : `float`, optional
+            The time between two progress reports, in seconds, by default `METRICS_INTERVAL`
+        """
+        self.source = source
+        self.name = name
+        self.reports = reports
+        self.stop = stop
+        self.interval = interval
+        self.frames = 0
+        self.start = perf_counter()
+        self.deadline = None if duration is None else self.start + duration
+        self._last_report = (self.start, 0)
+
+    def read(self) -> np.ndarray | None:
+        now = perf_counter()
+        if self.stop.is_set() or (self.deadline is not None and now >= self.deadline):
+            return None
+        last_time, last_frames = self._last_report
+        if now - last_time >= self.interval:
+            self.reports.put(("progress", self.name, {"frames": self.frames, "fps": (self.frames - last_frames) / (now - last_time)}))
+            self._last_report = (now, self.frames)
+        frame = self.source.read()
+        if frame is not None:
+            self.frames += 1
+        return frame
+
+    def screen_point(self, x: int, y: int) -> tuple[int, int] | None:
+        return self.source.screen_point(x, y)
+
+    def close(self) -> None:
+        self.source.close()
+
+
+def create_instance(spec: InstanceSpec, roi, paced: bool = True) -> tuple[FrameSource, Actuator, object | None]:
+    """
+    Creates the frame source and the actuator of an instance.
+
+    Parameters
+    ----------
+    `spec` : `InstanceSpec`
+        The instance.
+    `roi` : `Callable[[int], tuple[int, int]] | None`
+        Function giving the (top, bottom) rows to capture for a frame height.
+    `paced` : `bool`, optional
+        Whether the replays and the simulators run at their real frame rate, instead of as fast as possible,
+        by default `True`
+
+    Returns
+    -------
+    `tuple[FrameSource, Actuator, ZigZagSimulator | None]`
+        The frame source, the actuator, and the simulator of a simulated instance.
+    """
+    if spec.kind == "window":
+        return WindowFrameSource(spec.target, roi), create_actuator(ACTUATOR, position=spec.position), None
+    elif spec.kind == "replay":
+        from ..capture.replay_source import ReplayFrameSource
+        source = ReplayFrameSource(spec.target, fps=REPLAY_FPS if paced else None, loop=True, roi=roi)
+        return source, create_actuator("recording"), None
+    else:
+        from ..simulation.simulator import SimulatorActuator, ZigZagSimulator
+        simulator = ZigZagSimulator(seed=spec.target, realtime=paced)
+        actuator = SimulatorActuator(simulator)
+        return simulator, AsyncActuator(actuator) if ACTUATOR_ASYNC else actuator, simulator
+
+
+def run_instance(spec: InstanceSpec, cpus: list[int] | None, duration: float | None, paced: bool, reports, stop) -> None:
+    """
+    Entry point of an instance process: runs the pipeline on the instance with its own capture, detection
+    and actuation state, then reports its summary.
+
+    Parameters
+    ----------
+    `spec` : `InstanceSpec`
+        The instance.
+    `cpus` : `list[int] | None`
+        The CPUs the instance is pinned to. If `None`, it is not pinned.
+    `duration` : `float | None`
+        The running time, in seconds. If `None`, it runs until the source ends or the orchestrator stops it.
+    `paced` : `bool`
+        Whether the replays and the simulators run at their real frame rate.
+    `reports` : `multiprocessing.Queue`
+        The queue of the reports to the orchestrator.
+    `stop` : `multiprocessing.Event`
+        The event set by the orchestrator to stop the instances.
+    """
+    from ..main import run_sequential, run_threaded
+
+    summary = {"name": spec.name, "kind": spec.kind, "cpus": cpus}
+    source = simulator = instrumentation = None
+    try:
+        if cpus is not None:
+            pin_process(cpus)
+        # Instances never display their frames
+        roi = Detector.preprocessor.capture_rows if CAPTURE_ROI_EN else None
+        source, ActionController.actuator, simulator = create_instance(spec, roi, paced)
+        ActionController.timing.reset()
+        source = InstanceSource(source, spec.name, reports, stop, duration)
+        instrumentation = create_instrumentation(f"pipeline_{spec.name}")
+        resolution = ResolutionController(Detector.preprocessor) if ADAPTIVE_RESIZE_EN else None
+        path_map = PathMap() if PATH_MAP_EN else None
+        game_state = GameStateDetector() if GAME_STATE_EN else None
+        if PIPELINE_THREADED:
+            run_threaded(source, instrumentation=instrumentation, resolution=resolution, path_map=path_map,
+                         game_state=game_state)
+        else:
+            run_sequential(source, instrumentation=instrumentation, resolution=resolution, path_map=path_map,
+                           game_state=game_state)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        summary["error"] = repr(e)
+    finally:
+        if instrumentation is not None:
+            instrumentation.close()
+        ActionController.actuator.close()
+        if source is not None:
+            source.close()
+
+    if isinstance(source, InstanceSource):
+        elapsed = perf_counter() - source.start
+        stages = instrumentation.summary()
+        processed = stages["frame"]["count"] if "frame" in stages else 0
+        summary.update({
+            "elapsed": elapsed,
+            "frames": source.frames,
+            "capture_fps": source.frames / elapsed,
+            "fps": processed / elapsed,
+            "clicks": ActionController.actuator.clicks,
+            "click_timing": ActionController.timing.metrics(),
+            "stages": stages,
+        })
+        if simulator is not None:
+            distances = [stats.distance for stats in simulator.rounds]
+            summary.update({"rounds": len(distances), "mean_distance": float(np.mean(distances)) if distances else 0.0})
+    reports.put(("done", spec.name, summary))
+
+
+def run_instances(specs: list[InstanceSpec], duration: float | None = None, paced: bool = True, pin: bool = True,
+                  cpus: list[int] | None = None, on_progress=None) -> list[dict]:
+    """
+    Runs one pipeline process per instance, concurrently, and gathers their summaries.
+
+    Parameters
+    ----------
+    `specs` : `list[InstanceSpec]`
+        The instances.
+    `duration` : `float | None`, optional
+        The running time of the instances, in seconds. If `None`, they run until their source ends
+        or the orchestrator is interrupted, by default `None`
+    `paced` : `bool`, optional
+        Whether the replays and the simulators run at their real frame rate, by default `True`
+    `pin` : `bool`, optional
+        Whether each instance is pinned to its own CPUs, by default `True`
+    `cpus` : `list[int] | None`, optional
+        The CPUs split between the instances. If `None`, every available CPU is used, by default `None`
+    `on_progress` : `Callable[[str, dict], None] | None`, optional
+        Function called with the name and the frame rate report of an instance, by default `None`
+
+    Returns
+    -------
+    `list[dict]`
+        The summary of each instance, in the order of the specs: frames, capture & processed FPS, clicks,
+        stages timings, and the rounds played by the simulators, or the error of a failed instance.
+
+    Raises
+    ------
+    `ValueError`
+        If two instances have the same name.
+    """
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Invalid instances: duplicate names (expected: unique names, got: {names})")
+    for spec in specs:
+        if spec.kind == "window":
+            prepare_window(spec)
+
+    groups = assign_cpus(len(specs), cpus) if pin else [None] * len(specs)
+    reports, stop = mp.Queue(), mp.Event()
+    processes = [mp.Process(target=run_instance, name=f"instance-{spec.name}",
+                            args=(spec, group, duration, paced, reports, stop))
+                 for spec, group in zip(specs, groups)]
+    for process in processes:
+        process.start()
+
+    summaries = {}
+    try:
+        while len(summaries) < len(specs):
+            try:
+                kind, name, report = reports.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+                continue
+            if kind == "done":
+                summaries[name] = report
+            elif on_progress is not None:
+                on_progress(name, report)
+    except KeyboardInterrupt:
+        stop.set()
+        # Gather the summaries of the stopping instances
+        while len(summaries) < len(specs) and any(process.is_alive() for process in processes):
+            try:
+                kind, name, report = reports.get(timeout=1)
+            except queue.Empty:
+                continue
+            if kind == "done":
+                summaries[name] = report
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    return [summaries.get(spec.name, {"name": spec.name, "kind": spec.kind, "error": "instance process died"})
+            for spec in specs]
+
+
+def aggregate(summaries: list[dict]) -> dict:
+    """
+    Aggregates the summaries of concurrent instances.
+
+    Parameters
+    ----------
+    `summaries` : `list[dict]`
+        The summaries returned by `run_instances`.
+
+    Returns
+    -------
+    `dict`
+        The number of instances and of failed ones, the total, mean & minimum processed FPS, the total clicks & rounds,
+        the worst p95 time of each stage and the worst p95 click timing error over the instances (ms).
+    """
+    ok = [summary for summary in summaries if "error" not in summary]
+    fps = [summary["fps"] for summary in ok]
+    stages = {}
+    for summary in ok:
+        for stage, stats in summary["stages"].items():
+            stages[stage] = max(stages.get(stage, 0.0), stats["p95_ms"])
+    return {
+        "instances": len(summaries),
+        "failed": len(summaries) - len(ok),
+        "total_fps": float(sum(fps)),
+        "mean_fps": float(np.mean(fps)) if fps else 0.0,
+        "min_fps": float(min(fps)) if fps else 0.0,
+        "clicks": sum(summary["clicks"] for summary in ok),
+        "rounds": sum(summary.get("rounds", 0) for summary in ok),
+        "stages_p95_ms": stages,
+        "timing_error_p95_ms": max((summary["click_timing"]["timing_error_p95_ms"] for summary in ok), default=0.0),
+    }
+
+
+def scaling_report(specs: list[InstanceSpec], counts: list[int], duration: float, paced: bool = True,
+                   pin: bool = True) -> list[dict]:
+    """
+    Measures how the throughput scales with the number of concurrent instances.
+
+    Parameters
+    ----------
+    `specs` : `list[InstanceSpec]`
+        The instances, the first ones being used for the smaller counts.
+    `counts` : `list[int]`
+        The numbers of concurrent instances to measure.
+    `duration` : `float`
+        The running time of each measure, in seconds.
+    `paced` : `bool`, optional
+        Whether the replays and the simulators run at their real frame rate, by default `True`
+    `pin` : `bool`, optional
+        Whether each instance is pinned to its own CPUs, by default `True`
+
+    Returns
+    -------
+    `list[dict]`
+        The aggregated summary of each count, with the scaling efficiency: the total FPS relative to
+        the FPS of a single instance times the number of instances.
+
+    Raises
+    ------
+    `ValueError`
+        If a count exceeds the number of instances.
+    """
+    if max(counts) > len(specs):
+        raise ValueError(f"Invalid instance count: {max(counts)} (expected: at most the {len(specs)} instances)")
+    rows = []
+    base_fps = None
+    for count in sorted(counts):
+        row = aggregate(run_instances(specs[:count], duration, paced, pin))
+        base_fps = row["total_fps"] / count if base_fps is None else base_fps
+        row["efficiency"] = row["total_fps"] / (count * base_fps) if base_fps else 0.0
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive several game instances concurrently, one pipeline process each.")
+    parser.add_argument("instances", nargs="*",
+                        help="Instances: 'window:<window name>', 'replay:<path>' or 'simulator[:<seed>]'")
+    parser.add_argument("--simulators", type=int, default=0, help="Number of simulated instances to add")
+    parser.add_argument("--duration", type=float, default=None, help="Running time in seconds (default: until interrupted)")
+    parser.add_argument("--unpaced", action="store_true", help="Run the replays & simulators as fast as possible")
+    parser.add_argument("--no-pin", action="store_true", help="Do not pin the instances to CPUs")
+    parser.add_argument("--scaling", type=int, nargs="*", default=None,
+                        help="Measure the throughput for these instance counts (default: 1 to the number of instances)")
+    parser.add_argument("--output", help="JSON file of the report")
+    args = parser.parse_args()
+
+    specs = [InstanceSpec.parse(text, i) for i, text in enumerate(args.instances)]
+    specs += [InstanceSpec("simulator", SIM_SEED + len(specs) + i) for i in range(args.simulators)]
+    if not specs:
+        parser.error("no instance")
+    paced, pin = not args.unpaced, not args.no_pin
+
+    if args.scaling is not None:
+        duration = args.duration if args.duration is not None else 30.0
+        counts = args.scaling or list(range(1, len(specs) + 1))
+        report = scaling_report(specs, counts, duration, paced, pin)
+        print(f"{'Instances':>10}{'Total FPS':>11}{'FPS/inst':>10}{'Min FPS':>9}{'Efficiency':>12}{'Failed':>8}")
+        for row in report:
+            print(f"{row['instances']:>10}{row['total_fps']:>11.1f}{row['mean_fps']:>10.1f}{row['min_fps']:>9.1f}"
+                  f"{row['efficiency']:>12.0%}{row['failed']:>8}")
+    else:
+        def on_progress(name: str, progress: dict) -> None:
+            print(f"[{name}] {progress['frames']} frames, {progress['fps']:.1f} FPS")
+
+        summaries = run_instances(specs, args.duration, paced, pin, on_progress=on_progress)
+        report = {"instances": summaries, "aggregate": aggregate(summaries)}
+        width = max(len(summary["name"]) for summary in summaries) + 2
+        print(f"{'Instance':<{width}}{'CPUs':>10}{'FPS':>8}{'Capture':>9}{'Clicks':>8}{'Rounds':>8}"
+              f"{'Latency':>9}{'Err p50':>9}{'Err p95':>9}")
+        for summary in summaries:
+            if "error" in summary:
+                print(f"{summary['name']:<{width}}failed: {summary['error']}")
+                continue
+            cpus = ",".join(map(str, summary["cpus"])) if summary["cpus"] is not None else "-"
+            timing = summary["click_timing"]
+            print(f"{summary['name']:<{width}}{cpus:>10}{summary['fps']:>8.1f}{summary['capture_fps']:>9.1f}"
+                  f"{summary['clicks']:>8}{summary.get('rounds', '-'):>8}{timing['latency_ms']:>9.1f}"
+                  f"{timing['timing_error_p50_ms']:>9.1f}{timing['timing_error_p95_ms']:>9.1f}")
+        total = report["aggregate"]
+        print(f"Total: {total['total_fps']:.1f} FPS over {total['instances']} instances ({total['failed']} failed)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import json
+import multiprocessing as mp
+import os
+import time
+from time import perf_counter
+import cv2
+import numpy as np
+
+from ..config import RECORDER_SECONDS, RECORDER_FPS, RECORDER_SCALE, RECORDER_QUALITY, RECORDER_MAX_MEMORY, RECORDINGS_DIR
+from ..constants import Direction
+from ..ui.viewer import FrameRing, MAX_OVERLAY_LINES
+
+RECORD_DTYPE = np.dtype([
+    ("seq", np.int64),  # Sequence number of the slot, -1 while it is written
+    ("index", np.int64),  # Index of the frame
+    ("timestamp", np.float64),  # Capture time of the frame (perf_counter), in seconds
+    ("frame_size", np.int32, 2),  # Full resolution (width, height) of the frame
+    ("ball", np.int32, 3),  # Ball (x, y, r)
+    ("ball_detected", np.bool_),
+    ("n_lines", np.int32),
+    ("lines", np.int32, (MAX_OVERLAY_LINES, 4)),  # Path edges lines (x1, y1, x2, y2)
+    ("direction", np.int8),  # Ball direction when the decision was taken
+    ("clicked", np.bool_),  # A click was decided on the frame
+])
+
+
+def record_metadata(record: np.void) -> dict:
+    """
+    Converts a record of the ring to the JSON metadata of a recorded frame.
+    """
+    n_lines = int(record["n_lines"])
+    return {
+        "index": int(record["index"]),
+        "timestamp": float(record["timestamp"]),
+        "frame_size": record["frame_size"].tolist(),
+        "ball": record["ball"].tolist(),
+        "ball_detected": bool(record["ball_detected"]),
+        "lines": record["lines"][:n_lines].tolist(),
+        "direction": Direction(int(record["direction"])).name,
+        "clicked": bool(record["clicked"]),
+    }
+
+
+def run_encoder(ring_name: str, shape: tuple[int, int, int], slots: int, requests, output_dir: str,
+                seconds: float, quality: int) -> None:
+    """
+    Entry point of the encoder process: saves the last seconds of the ring to disk on each request.
+
+    Each recording is a folder of JPEG frames, readable by the `ReplayFrameSource`,
+    with a `metadata.jsonl` file holding the timestamp, detections and decision of each frame.
+
+    Parameters
+    ----------
+    `ring_name` : `str`
+        The name of the shared memory ring.
+    `shape` : `tuple[int, int, int]`
+        The shape of the recorded frames.
+    `slots` : `int`
+        The number of slots of the ring.
+    `requests` : `multiprocessing.Queue`
+        The (last sequence number, reason) save requests, `None` to stop.
+    `output_dir` : `str`
+        The folder of the recordings.
+    `seconds` : `float`
+        The duration kept before the last frame.
+    `quality` : `int`
+        The JPEG quality of the frames.
+    """
+    ring = FrameRing(shape, slots, name=ring_name, dtype=RECORD_DTYPE)
+    try:
+        while (request := requests.get()) is not None:
+            last_seq, reason = request
+            # Copy the frames first, from the oldest which is the next to be overwritten
+            snapshot = []
+            for seq in range(max(0, last_seq - slots + 1), last_seq + 1):
+                slot = ring.read(seq)
+                if slot is not None:
+                    snapshot.append(slot)
+            if not snapshot:
+                continue
+
+            end = snapshot[-1][1]["timestamp"]
+            snapshot = [(frame, record) for frame, record in snapshot if record["timestamp"] >= end - seconds]
+            folder = os.path.join(output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{last_seq}_{reason}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, "metadata.jsonl"), "w") as file:
+                for i, (frame, record) in enumerate(snapshot):
+                    cv2.imwrite(os.path.join(folder, f"frame_{i:06d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                    file.write(json.dumps(record_metadata(record)) + "\n")
+    finally:
+        ring.close()
+
+
+class SessionRecorder:
+    """
+    Records the last seconds of the session, to save them when a round ends or on demand.
+
+    Every processed frame is downscaled into a shared memory ring with its timestamp, detections and decision,
+    which only costs a copy on the processing loop. The saves are done by a separate encoder process.
+    The ring is created on the first frame, with at most `max_memory` MB of frames: past that, fewer frames
+    are recorded per second, so the saves still cover `seconds`.
+    """
+
+    def __init__(self, seconds: float = RECORDER_SECONDS, fps: float = RECORDER_FPS, scale: float = RECORDER_SCALE,
+                 output_dir: str = RECORDINGS_DIR, quality: int = RECORDER_QUALITY,
+                 max_memory: float = RECORDER_MAX_MEMORY) -> None:
+        """
+        Parameters
+        ----------
+        `seconds` : `float`, optional
+            The duration kept by each save, by default `RECORDER_SECONDS`
+        `fps` : `float`, optional
+            The maximum recorded frame rate, from which the ring size is derived, by default `RECORDER_FPS`
+        `scale` : `float`, optional
+            The scale of the recorded frames relative to the captured frames, by default `RECORDER_SCALE`
+        `output_dir` : `str`, optional
+            The folder of the recordings, by default `RECORDINGS_DIR`
+        `quality` : `int`, optional
+            The JPEG quality of the saved frames, by default `RECORDER_QUALITY`
+        `max_memory` : `float`, optional
+            The maximum size of the frames ring, in MB, by default `RECORDER_MAX_MEMORY`
+        """
+        self.seconds = seconds
+        self.fps = fps
+        self.scale = scale
+        self.output_dir = output_dir
+        self.quality = quality
+        self.max_memory = max_memory
+        self.slots = max(1, int(seconds * fps))
+        self.ring = None
+        self.process = None
+        self.saves = 0
+        self._requests = mp.Queue()
+        self._min_period = 1 / fps
+        self._last_timestamp = -np.inf
+
+    def _start(self, frame: np.ndarray) -> None:
+        """
+        Creates the ring for the size of the frame and starts the encoder process.
+        """
+        shape = (max(1, round(frame.shape[0] * self.scale)), max(1, round(frame.shape[1] * self.scale)), 3)
+        slot_size = int(np.prod(shape)) + RECORD_DTYPE.itemsize
+        slots = max(1, int(self.max_memory * 2**20) // slot_size)
+        if slots < self.slots:
+            # Spread the slots over the recorded duration
+            self.slots = slots
+            self._min_period = self.seconds / slots
+        self.ring = FrameRing(shape, self.slots, dtype=RECORD_DTYPE)
+        # Touch the whole ring now, so the page faults are not paid while recording
+        self.ring.frames.fill(0)
+        self.process = mp.Process(target=run_encoder, name="encoder", daemon=True,
+                                  args=(self.ring.name, shape, self.slots, self._requests, self.output_dir,
+                                        self.seconds, self.quality))
+        self.process.start()
+
+    def record(self, frame: np.ndarray, timestamp: float, index: int, ball: tuple[int, int, int] | None = None,
+               ball_detected: bool = False, lines: np.ndarray | None = None, direction: Direction = Direction.RIGHT,
+               clicked: bool = False) -> bool:
+        """
+        Copies a processed frame and its detections into the ring, unless it comes faster than the recorded frame rate.
+
+        Parameters
+        ----------
+        `frame` : `np.ndarray`
+            The processed frame. It is not modified.
+        `timestamp` : `float`
+            The `perf_counter` capture time of the frame, in seconds.
+        `index` : `int`
+            The index of the frame.
+        `ball` : `tuple[int, int, int] | None`, optional
+            The ball (x, y, r), by default `None`
+        `ball_detected` : `bool`, optional
+            Whether the ball is detected, by default `False`
+        `lines` : `np.ndarray | None`, optional
+            The path edges lines coming from HoughLinesP, by default `None`
+        `direction` : `Direction`, optional
+            The ball direction when the decision was taken, by default `Direction.RIGHT`
+        `clicked` : `bool`, optional
+            Whether a click was decided, by default `False`
+
+        Returns
+        -------
+        `bool`
+            `True` if the frame was recorded; otherwise, `False`.
+        """
+        if timestamp - self._last_timestamp < self._min_period * 0.9:
+            return False
+        self._last_timestamp = timestamp
+
+        if self.ring is None:
+            self._start(frame)
+        seq, slot, record = self.ring.begin_write()
+        if slot.shape == frame.shape:
+            np.copyto(slot, frame)
+        else:
+            cv2.resize(frame, (slot.shape[1], slot.shape[0]), dst=slot, interpolation=cv2.INTER_AREA)
+
+        record["index"] = index
+        record["timestamp"] = timestamp
+        record["frame_size"] = (frame.shape[1], frame.shape[0])
+        record["ball"] = ball if ball is not None else (0, 0, 0)
+        record["ball_detected"] = ball_detected and ball is not None
+        n_lines = 0 if lines is None else min(len(lines), MAX_OVERLAY_LINES)
+        record["n_lines"] = n_lines
+        if n_lines:
+            record["lines"][0, :n_lines] = lines.reshape(-1, 4)[:n_lines]
+        record["direction"] = direction.value
+        record["clicked"] = clicked
+        self.ring.end_write(seq)
+        return True
+
+    def save(self, reason: str = "manual") -> bool:
+        """
+        Asks the encoder process to save the last seconds, without waiting for it.
+
+        Parameters
+        ----------
+        `reason` : `str`, optional
+            The reason of the save, appended to the folder name, by default `"manual"`
+
+        Returns
+        -------
+        `bool`
+            `True` if a save was requested; otherwise (nothing recorded yet), `False`.
+        """
+        if self.ring is None or self.ring.head[0] < 0:
+            return False
+        self._requests.put((int(self.ring.head[0]), reason))
+        self.saves += 1
+        return True
+
+    def close(self, timeout: float = 30) -> None:
+        """
+        Waits for the requested saves, then stops the encoder process and frees the ring.
+
+        Parameters
+        ----------
+        `timeout` : `float`, optional
+            Maximum waiting time for the saves, in seconds, by default `30`
+        """
+        if self.process is not None:
+            self._requests.put(None)
+            self.process.join(timeout=timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+if __name__ == "__main__":
+    # Measure the recording cost of a sample frame
+    frame = cv2.imread("images/game_sample_1.jpg")
+    recorder = SessionRecorder(seconds=2, output_dir=os.path.join(RECORDINGS_DIR, "sample"))
+    costs = []
+    for i in range(300):
+        start = perf_counter()
+        recorder.record(frame, i / RECORDER_FPS, i, (160, 578, 16), True, None, Direction.RIGHT, False)
+        costs.append(perf_counter() - start)
+    recorder.save("sample")
+    recorder.close()
+    print(f"Recording: {np.mean(costs[1:]) * 1000:.3f} ms/frame (p99 {np.percentile(costs[1:], 99) * 1000:.3f} ms)")
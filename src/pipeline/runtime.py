@@ -0,0 +1,362 @@
+import queue
+import threading
+from time import perf_counter, sleep
+import numpy as np
+
+from ..config import PROCESSING_DELAY, MAX_FRAME_AGE, PATH_EDGES_INTERVAL, EDGES_INCREMENTAL_EN
+from ..constants import Direction, GameState
+
+from ..capture.frame_source import FrameSource
+from ..control.action_controller import ActionController
+from ..control.path_map import PathMap
+from ..detection.ball_tracker import BallTracker
+from ..detection.detector import Detector
+from ..detection.edge_tracker import IncrementalEdgeDetector
+from ..detection.game_state import GameStateDetector
+from ..detection.resolution import ResolutionController
+from ..ui.viewer import VisionPublisher
+from .instrumentation import Instrumentation
+from .latest_slot import LatestSlot
+from .recorder import SessionRecorder
+
+
+class TimedFrame:
+    """
+    Captured frame with its index and capture timestamp.
+    """
+    __slots__ = ("index", "timestamp", "image")
+
+    def __init__(self, index: int, timestamp: float, image: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        `index` : `int`
+            The index of the frame since the pipeline started.
+        `timestamp` : `float`
+            The `perf_counter` time at which the capture of the frame started, in seconds.
+        `image` : `np.ndarray`
+            The BGR frame.
+        """
+        self.index = index
+        self.timestamp = timestamp
+        self.image = image
+
+    @property
+    def age(self) -> float:
+        """
+        Time elapsed since the frame was captured, in seconds.
+        """
+        return perf_counter() - self.timestamp
+
+
+class FrameResult:
+    """
+    Detections of a frame, handed from the detection stage to the actuation stage.
+    """
+    __slots__ = ("frame", "ball", "lines", "ball_detected", "changed_dir")
+
+    def __init__(self, frame: TimedFrame, ball: tuple[int, int, int], lines: np.ndarray | None) -> None:
+        self.frame = frame
+        self.ball = ball
+        self.lines = lines
+        self.ball_detected = True
+        self.changed_dir = False
+
+
+class FramePool:
+    """
+    Pool of reusable frame buffers, so the capture stage does not allocate a new frame each time.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Parameters
+        ----------
+        `size` : `int`
+            Number of buffers in the pool. It must cover every frame that can be in flight at the same time.
+        """
+        self._free = queue.Queue()
+        for _ in range(size):
+            self._free.put(None)
+
+    def acquire(self, like: np.ndarray, timeout: float | None = None) -> np.ndarray | None:
+        """
+        Gets a free buffer with the same shape & type as the specified frame.
+
+        Parameters
+        ----------
+        `like` : `np.ndarray`
+            The frame the buffer must be able to hold.
+        `timeout` : `float | None`, optional
+            Maximum waiting time for a free buffer, in seconds, by default `None`
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The buffer, or `None` if no buffer was freed in time.
+        """
+        try:
+            buffer = self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if buffer is None or buffer.shape != like.shape or buffer.dtype != like.dtype:
+            buffer = np.empty_like(like)
+        return buffer
+
+    def release(self, buffer: np.ndarray) -> None:
+        """
+        Gives a buffer back to the pool.
+        """
+        self._free.put(buffer)
+
+
+class PipelineRuntime:
+    """
+    Runs the capture, detection and actuation stages on separate threads.
+
+    The stages are connected by `LatestSlot` buffers: when a stage is slower than the previous one, stale frames
+    are dropped instead of being queued. Each frame carries its capture timestamp, and decisions are skipped
+    for frames older than `max_frame_age`.
+    """
+
+    def __init__(self, source: FrameSource, max_frame_age: float = MAX_FRAME_AGE / 1000,
+                 publisher: VisionPublisher | None = None, instrumentation: Instrumentation | None = None,
+                 recorder: SessionRecorder | None = None, resolution: ResolutionController | None = None,
+                 path_map: PathMap | None = None, game_state: GameStateDetector | None = None) -> None:
+        """
+        Parameters
+        ----------
+        `source` : `FrameSource`
+            The source of the frames.
+        `max_frame_age` : `float`, optional
+            Maximum age of a frame for a decision to be taken on it, in seconds, by default `MAX_FRAME_AGE / 1000`
+        `publisher` : `VisionPublisher | None`, optional
+            Publisher of the processed frames to the vision window. If `None`, nothing is displayed, by default `None`
+        `instrumentation` : `Instrumentation | None`, optional
+            Timings of the stages. If `None`, the timings are only kept in memory, by default `None`
+        `recorder` : `SessionRecorder | None`, optional
+            Recorder of the processed frames, saved when the ball is lost. If `None`, nothing is recorded, by default `None`
+        `resolution` : `ResolutionController | None`, optional
+            Controller of the detection band downscale factor, fed with the detection time.
+            If `None`, the factor is fixed, by default `None`
+        `path_map` : `PathMap | None`, optional
+            Map of the path edges merged across frames. If specified, the path edges are only detected
+            every `PATH_EDGES_INTERVAL` frames and the decisions use the map, by default `None`
+        `game_state` : `GameStateDetector | None`, optional
+            Detector of the game state. If specified, the ball & path edges are only detected during the rounds,
+            and the menu screens are clicked through, by default `None`
+        """
+        self.source = source
+        self.max_frame_age = max_frame_age
+        self.publisher = publisher
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.instrumentation.add_metrics("click_timing", ActionController.timing.metrics)
+        self.recorder = recorder
+        self.resolution = resolution
+        self.path_map = path_map
+        self.game_state = game_state
+        self.direction = Direction.RIGHT
+        self.tracker = BallTracker()
+        self.edge_detector = IncrementalEdgeDetector() if EDGES_INCREMENTAL_EN else None
+        self.detect_path_edges = self.edge_detector.detect if self.edge_detector is not None else Detector.detect_path_edges
+
+        self.frames_captured = 0
+        self.frames_detected = 0
+        self.frames_acted = 0
+        self.stale_frames = 0
+
+        # Frames in flight: capture, 2 slots, detection & actuation
+        self._pool = FramePool(5)
+        self._capture_slot = LatestSlot()
+        self._action_slot = LatestSlot()
+        self._stop = threading.Event()
+        self._error = None
+        self._threads = [
+            threading.Thread(target=self._run_stage, args=(self._capture_loop,), name="capture", daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._detection_loop,), name="detection", daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._action_loop,), name="actuation", daemon=True),
+        ]
+
+    @property
+    def running(self) -> bool:
+        return not self._stop.is_set()
+
+    @property
+    def dropped_frames(self) -> int:
+        """
+        Number of frames dropped because a later stage was busy.
+        """
+        return self._capture_slot.dropped + self._action_slot.dropped
+
+    def start(self) -> None:
+        """
+        Starts the stages threads, after the processing delay.
+        """
+        sleep(PROCESSING_DELAY / 1000)
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the stages threads and waits for them to finish.
+        """
+        self._stop.set()
+        for slot in (self._capture_slot, self._action_slot):
+            self.release(slot.close())
+        for thread in self._threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=1)
+        if self._error is not None:
+            raise self._error
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits for the pipeline to stop (end of the frame source or error).
+
+        Returns
+        -------
+        `bool`
+            `True` if the pipeline is stopped; otherwise, `False`.
+        """
+        return self._stop.wait(timeout)
+
+    def release(self, result: FrameResult | TimedFrame | None) -> None:
+        """
+        Gives the buffer of a frame back to the capture stage.
+        """
+        if isinstance(result, FrameResult):
+            result = result.frame
+        if result is not None:
+            self._pool.release(result.image)
+
+    def reset_round(self) -> None:
+        """
+        Forgets the state of the previous round when a new one starts.
+        """
+        self.direction = Direction.RIGHT
+        self.tracker.reset()
+        ActionController.timing.reset()
+        if self.edge_detector is not None:
+            self.edge_detector.reset()
+        if self.path_map is not None:
+            self.path_map.reset()
+
+    def _run_stage(self, loop) -> None:
+        """
+        Runs a stage loop, stopping the whole pipeline when it ends or fails.
+        """
+        try:
+            loop()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._stop.set()
+            for slot in (self._capture_slot, self._action_slot):
+                self.release(slot.close())
+
+    def _capture_loop(self) -> None:
+        while self.running:
+            timestamp = perf_counter()
+            image = self.source.read()
+            if image is None:
+                break
+            self.instrumentation.record("capture", timestamp, index=self.frames_captured)
+
+            buffer = None
+            while buffer is None and self.running:
+                buffer = self._pool.acquire(image, timeout=0.1)
+            if buffer is None:
+                break
+            np.copyto(buffer, image)
+
+            frame = TimedFrame(self.frames_captured, timestamp, buffer)
+            self.frames_captured += 1
+            self.release(self._capture_slot.put(frame))
+
+    def _detection_loop(self) -> None:
+        while self.running:
+            frame = self._capture_slot.get()
+            if frame is None:
+                continue
+            record = self.instrumentation.record
+            start = detection_start = perf_counter()
+            if self.game_state is not None:
+                was_playing = self.game_state.state == GameState.PLAYING
+                ball = self.tracker.position if self.tracker.misses == 0 else None
+                state, click = self.game_state.update(frame.image, ball, not self.tracker.ball_detected, frame.timestamp)
+                if click is not None:
+                    ActionController.actuator.click(*(self.source.screen_point(*click) or (None, None)))
+                start = detection_start = record("game_state", start, index=frame.index)
+                if state != GameState.PLAYING:
+                    # Nothing to detect outside the rounds
+                    result = FrameResult(frame, (0, 0, 0), None)
+                    result.ball_detected = False
+                    self.release(self._action_slot.put(result))
+                    continue
+                if not was_playing:
+                    self.reset_round()
+            band = Detector.preprocessor.process(frame.image)
+            start = record("preprocess", start, index=frame.index)
+            ball = self.tracker.update(band, self.direction, frame.timestamp)
+            start = record("detect_ball", start, index=frame.index)
+            lines = None
+            if self.path_map is None or self.frames_detected % PATH_EDGES_INTERVAL == 0:
+                lines = self.detect_path_edges(frame.image, band)
+                start = record("detect_path_edges", start, index=frame.index)
+            if self.path_map is not None:
+                if self.tracker.ball_detected:
+                    self.path_map.update(ball, lines, self.direction, frame.image.shape)
+                else:
+                    self.path_map.reset()
+                lines = self.path_map.screen_lines(lines)
+                start = record("path_map", start, index=frame.index)
+            if self.resolution is not None:
+                # The detection thread bounds the frame rate
+                ball_found = self.tracker.misses == 0 if self.tracker.ball_detected else None
+                self.resolution.update(start - detection_start, ball_found, ActionController.timing.speed, frame.image.shape[0])
+            self.frames_detected += 1
+            result = FrameResult(frame, ball, lines)
+            result.ball_detected = self.tracker.ball_detected
+            self.release(self._action_slot.put(result))
+
+    def _action_loop(self) -> None:
+        was_detected = False
+        while self.running:
+            result = self._action_slot.get()
+            if result is None:
+                continue
+
+            record = self.instrumentation.record
+            ball_detected = result.ball_detected
+            direction = self.direction
+            if ball_detected:
+                if result.frame.age > self.max_frame_age:
+                    self.stale_frames += 1
+                else:
+                    x, y, _ = result.ball
+                    start = perf_counter()
+                    result.changed_dir = ActionController.decide_action((x, y), result.lines, result.frame.image, self.direction,
+                                                                        result.frame.timestamp)
+                    record("decide_action", start, index=result.frame.index)
+                    if result.changed_dir:
+                        self.direction = Direction.RIGHT if self.direction == Direction.LEFT else Direction.LEFT
+                    self.frames_acted += 1
+
+            if self.recorder is not None:
+                start = perf_counter()
+                self.recorder.record(result.frame.image, result.frame.timestamp, result.frame.index, result.ball,
+                                     ball_detected, result.lines, direction, result.changed_dir)
+                # Save the end of the round when the ball is lost
+                if was_detected and not ball_detected:
+                    self.recorder.save("lost")
+                record("record", start, index=result.frame.index)
+            was_detected = ball_detected
+
+            if self.publisher is not None:
+                start = perf_counter()
+                probes = ActionController.last_probes if ball_detected else ()
+                self.publisher.publish(result.frame.image, result.ball, ball_detected, result.lines, probes, result.frame.index)
+                record("publish", start, index=result.frame.index)
+            # Time from the capture of the frame to the end of its processing
+            record("frame", result.frame.timestamp, index=result.frame.index)
+            self.release(result)
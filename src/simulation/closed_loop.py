@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+from time import perf_counter
+import numpy as np
+
+from ..config import GAME_STATE_EN
+from ..control.action_controller import ActionController
+from ..detection.game_state import GameStateDetector
+from ..main import run_sequential
+from ..pipeline.instrumentation import Instrumentation
+from .simulator import SimulatorActuator, ZigZagSimulator
+
+
+def run_closed_loop(rounds: int, input_lag: float, speed: float, **simulator_args) -> dict:
+    """
+    Plays simulated rounds with the sequential main loop, on the reproducible simulator clock.
+
+    Parameters
+    ----------
+    `rounds` : `int`
+        The number of rounds to play.
+    `input_lag` : `float`
+        The delay between a click and the ball turn, in seconds. It stands for the whole capture-to-turn latency.
+    `speed` : `float`
+        The initial ball speed, in tiles per second.
+    `**simulator_args`
+        Other arguments of the `ZigZagSimulator`.
+
+    Returns
+    -------
+    `dict`
+        The settings, the throughput (frames & decisions per second of real time, rounds per hour of real
+        and of game time) and the distance survived per round (mean, median, max).
+    """
+    simulator = ZigZagSimulator(speed=speed, input_lag=input_lag, realtime=False, max_rounds=rounds, **simulator_args)
+    actuator = ActionController.actuator
+    ActionController.actuator = SimulatorActuator(simulator)
+    ActionController.timing.reset()
+    instrumentation = Instrumentation()
+    start = perf_counter()
+    try:
+        run_sequential(simulator, instrumentation=instrumentation,
+                       game_state=GameStateDetector() if GAME_STATE_EN else None)
+    finally:
+        ActionController.actuator = actuator
+    elapsed = perf_counter() - start
+
+    distances = np.array([stats.distance for stats in simulator.rounds])
+    decisions = instrumentation.stages["decide_action"].count if "decide_action" in instrumentation.stages else 0
+    return {
+        "input_lag_ms": input_lag * 1000,
+        "speed": speed,
+        "rounds": len(simulator.rounds),
+        "frames": simulator.frames,
+        "fps": simulator.frames / elapsed,
+        "decisions_per_s": decisions / elapsed,
+        "rounds_per_hour": len(simulator.rounds) * 3600 / elapsed,
+        "game_rounds_per_hour": len(simulator.rounds) * 3600 / simulator.time if simulator.time else 0.0,
+        "mean_distance": float(distances.mean()) if len(distances) else 0.0,
+        "median_distance": float(np.median(distances)) if len(distances) else 0.0,
+        "max_distance": int(distances.max()) if len(distances) else 0,
+        "survived": sum(stats.survived for stats in simulator.rounds),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the bot survival against the input lag and the ball speed in the headless simulator.")
+    parser.add_argument("--rounds", type=int, default=10, help="Number of rounds per setting")
+    parser.add_argument("--lags", type=float, nargs="+", default=[0, 30, 60, 100], help="Input lags to test, in milliseconds")
+    parser.add_argument("--speeds", type=float, nargs="+", default=[3.0, 5.0, 7.0], help="Initial ball speeds to test, in tiles per second")
+    parser.add_argument("--speed-up", type=float, default=0.0, help="Ball speed gained per tile travelled")
+    parser.add_argument("--max-tiles", type=int, default=300, help="Distance at which a round is ended as survived")
+    parser.add_argument("--fps", type=float, default=60, help="Simulated frame rate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the paths")
+    parser.add_argument("--output", help="JSON file of the results")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'Lag (ms)':>9}{'Speed':>7}{'Rounds':>8}{'FPS':>8}{'Decisions/s':>13}{'Rounds/h':>10}{'Game R/h':>10}"
+          f"{'Mean dist':>11}{'Median':>8}{'Max':>6}{'Survived':>10}")
+    for speed in args.speeds:
+        for lag in args.lags:
+            result = run_closed_loop(args.rounds, lag / 1000, speed, speed_up=args.speed_up, fps=args.fps,
+                                     seed=args.seed, max_round_tiles=args.max_tiles)
+            results.append(result)
+            print(f"{lag:>9.0f}{speed:>7.1f}{result['rounds']:>8}{result['fps']:>8.0f}{result['decisions_per_s']:>13.0f}"
+                  f"{result['rounds_per_hour']:>10.0f}{result['game_rounds_per_hour']:>10.0f}{result['mean_distance']:>11.1f}{result['median_distance']:>8.0f}"
+                  f"{result['max_distance']:>6}{result['survived']:>10}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,414 @@
+from collections import deque
+from functools import lru_cache
+import math
+import threading
+from time import perf_counter, sleep
+import cv2
+import numpy as np
+
+from ..config import (SIM_WIDTH, SIM_HEIGHT, SIM_FPS, SIM_SPEED, SIM_SPEED_UP, SIM_MAX_SPEED, SIM_INPUT_LAG,
+                      SIM_REALTIME, SIM_SEED, SIM_GAME_OVER_SCREEN)
+from ..constants import Direction
+
+from ..capture.frame_source import FrameSource
+from ..control.actuator import Actuator
+
+COS30, SIN30 = math.cos(math.radians(30)), math.sin(math.radians(30))
+
+# Colors (BGR) sampled from the game screenshots
+BACKGROUND_COLOR = (255, 255, 255)
+TOP_COLOR = (255, 212, 122)
+LEFT_COLOR = (151, 101, 59)
+RIGHT_COLOR = (198, 133, 78)
+BALL_COLOR = (38, 38, 38)
+BALL_HIGHLIGHT_COLOR = (90, 90, 90)
+DIAMOND_LIGHT_COLOR = (236, 124, 253)
+DIAMOND_DARK_COLOR = (193, 46, 215)
+
+
+class RoundStats:
+    """
+    Result of a simulated round.
+    """
+    __slots__ = ("index", "distance", "diamonds", "clicks", "duration", "final_speed", "survived")
+
+    def __init__(self, index: int, distance: int, diamonds: int, clicks: int, duration: float, final_speed: float,
+                 survived: bool) -> None:
+        self.index = index
+        self.distance = distance  # Number of tiles travelled
+        self.diamonds = diamonds
+        self.clicks = clicks
+        self.duration = duration  # Simulated time, in seconds
+        self.final_speed = final_speed  # In tiles per second
+        self.survived = survived  # The round reached the maximum distance without falling
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ZigZagSimulator(FrameSource):
+    """
+    Deterministic headless ZigZag game, used as a frame source and a click sink for closed loop tests.
+
+    The path is a chain of square tiles on an isometric grid: each tile follows the previous one along the u axis
+    (the ball going right on screen) or the v axis (going left), so the tile `k` of the path always has `u + v == k`.
+    The ball moves at the center of the path tiles, and each click swaps its axis. A round ends when the ball leaves
+    the path, then a new path is generated after a short fall, keeping the ball direction so the bot stays in sync.
+
+    The simulated clock either advances by one frame period per read, so the rounds are reproducible and run as fast
+    as the bot processes them, or follows the real clock so the pipeline latency delays the clicks as in the game.
+    """
+
+    def __init__(self, width: int = SIM_WIDTH, height: int = SIM_HEIGHT, fps: float = SIM_FPS, speed: float = SIM_SPEED,
+                 speed_up: float = SIM_SPEED_UP, max_speed: float = SIM_MAX_SPEED, input_lag: float = SIM_INPUT_LAG / 1000,
+                 realtime: bool = SIM_REALTIME, seed: int = SIM_SEED, max_rounds: int | None = None,
+                 max_round_tiles: int | None = None, diamond_rate: float = 0.15, start_tiles: int = 8,
+                 restart_delay: float = 0.5, game_over_screen: str | None = SIM_GAME_OVER_SCREEN) -> None:
+        """
+        Parameters
+        ----------
+        `width` : `int`, optional
+            The width of the frames, by default `SIM_WIDTH`
+        `height` : `int`, optional
+            The height of the frames, by default `SIM_HEIGHT`
+        `fps` : `float`, optional
+            The frame rate, by default `SIM_FPS`
+        `speed` : `float`, optional
+            The initial ball speed, in tiles per second, by default `SIM_SPEED`
+        `speed_up` : `float`, optional
+            The ball speed gained per tile travelled, in tiles per second, by default `SIM_SPEED_UP`
+        `max_speed` : `float`, optional
+            The maximum ball speed, in tiles per second, by default `SIM_MAX_SPEED`
+        `input_lag` : `float`, optional
+            The delay between a click and the ball turn, in seconds, by default `SIM_INPUT_LAG / 1000`
+        `realtime` : `bool`, optional
+            Follow the real clock instead of advancing one frame period per read, by default `SIM_REALTIME`
+        `seed` : `int`, optional
+            The seed of the paths, by default `SIM_SEED`
+        `max_rounds` : `int | None`, optional
+            Number of rounds after which the source is exhausted. If `None`, it never ends, by default `None`
+        `max_round_tiles` : `int | None`, optional
+            Distance after which a round is ended as survived. If `None`, rounds only end by falling, by default `None`
+        `diamond_rate` : `float`, optional
+            Probability of a diamond on a tile, by default `0.15`
+        `start_tiles` : `int`, optional
+            Length of the straight path at the start of a round, by default `8`
+        `restart_delay` : `float`, optional
+            Time the ball falls before the next round, in seconds, by default `0.5`
+        `game_over_screen` : `str | None`, optional
+            Image shown after the fall until it is clicked, followed by a start screen where the ball waits for a click,
+            as in the game. If `None`, the next round starts right after the fall, by default `SIM_GAME_OVER_SCREEN`
+
+        Raises
+        ------
+        `ValueError`
+            If the game over screen cannot be read.
+        """
+        self.width, self.height = width, height
+        self.fps = fps
+        self.base_speed, self.speed_up, self.max_speed = speed, speed_up, max_speed
+        self.input_lag = input_lag
+        self.realtime = realtime
+        self.seed = seed
+        self.max_rounds = max_rounds
+        self.max_round_tiles = max_round_tiles
+        self.diamond_rate = diamond_rate
+        self.start_tiles = start_tiles
+        self.restart_delay = restart_delay
+        self.screen = None  # Menu screen shown: "game_over", "start", or None during the rounds
+        self._game_over_image = None
+        if game_over_screen is not None:
+            image = cv2.imread(game_over_screen)
+            if image is None:
+                raise ValueError(f"Game over screen '{game_over_screen}' not found")
+            self._game_over_image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+        # Screen geometry, scaled on the height like the game
+        self.tile_size = 0.062 * height
+        self.ball_radius = max(2, round(0.0145 * height))
+        self.ball_screen_y = 0.48 * height
+        self.depth = 4 * self.tile_size
+        tile_half_width = self.tile_size * COS30
+        self.lateral_limit = max(1, int((width / 2 - tile_half_width) / tile_half_width) - 1)
+
+        self.time = 0.0
+        self.direction = Direction.RIGHT
+        self.frames = 0
+        self.clicks = 0
+        self.rounds: list[RoundStats] = []
+        self._pending = deque()  # Times at which the clicks turn the ball
+        self._lock = threading.Lock()
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+        self._background = np.empty_like(self._frame)
+        self._background[:] = BACKGROUND_COLOR
+        self._clock_start = None
+        self._new_round()
+        if self._game_over_image is not None:
+            self.screen = "start"
+
+    @property
+    def speed(self) -> float:
+        """
+        The current ball speed, in tiles per second.
+        """
+        return min(self.max_speed, self.base_speed + self.speed_up * self.distance)
+
+    @property
+    def distance(self) -> int:
+        """
+        Number of tiles travelled in the current round.
+        """
+        return int(self.u) + int(self.v)
+
+    @property
+    def alive(self) -> bool:
+        return self._fall_end is None and self.screen is None
+
+    def click(self) -> None:
+        """
+        Turns the ball after the input lag. Thread safe.
+        """
+        with self._lock:
+            self._pending.append(self.time + self.input_lag)
+            self.clicks += 1
+
+    def _new_round(self) -> None:
+        """
+        Generates a new path, starting in the current direction, and puts the ball on its first tile.
+        """
+        self._rng = np.random.default_rng((self.seed, len(self.rounds)))
+        self.path = [(0, 0)]
+        self.diamond_tiles = set()
+        self._axis = self.direction
+        self._run = min(self.start_tiles, 2 * self.lateral_limit)
+        # Lateral position (u - v) of the screen center, so that the straight start is centered
+        self._center = self._run // 2 if self.direction == Direction.RIGHT else -(self._run // 2)
+        self.u, self.v = 0.5, 0.5
+        self.diamonds = 0
+        self._round_start = self.time
+        self._round_clicks = self.clicks
+        self._fall_end = None
+
+    def _extend_path(self, length: int) -> None:
+        """
+        Adds tiles to the path until it has the specified length.
+        """
+        while len(self.path) < length:
+            i, j = self.path[-1]
+            if self._run == 0:
+                self._axis = Direction.LEFT if self._axis == Direction.RIGHT else Direction.RIGHT
+                self._run = int(self._rng.integers(1, 6))
+            # Keep the path on the screen
+            if self._axis == Direction.RIGHT and i + 1 - j - self._center > self.lateral_limit:
+                self._axis, self._run = Direction.LEFT, int(self._rng.integers(1, 6))
+            elif self._axis == Direction.LEFT and j + 1 - i + self._center > self.lateral_limit:
+                self._axis, self._run = Direction.RIGHT, int(self._rng.integers(1, 6))
+            self.path.append((i + 1, j) if self._axis == Direction.RIGHT else (i, j + 1))
+            self._run -= 1
+            if len(self.path) > self.start_tiles and self._rng.random() < self.diamond_rate:
+                self.diamond_tiles.add(len(self.path) - 1)
+
+    def _end_round(self, survived: bool) -> None:
+        self.rounds.append(RoundStats(len(self.rounds), self.distance, self.diamonds, self.clicks - self._round_clicks,
+                                      self.time - self._round_start, self.speed, survived))
+        self._fall_end = self.time + (0 if survived else self.restart_delay)
+
+    def step(self, dt: float) -> None:
+        """
+        Advances the game by the specified time, turning the ball at the time of each click.
+
+        Parameters
+        ----------
+        `dt` : `float`
+            The simulated time to advance, in seconds.
+        """
+        end = self.time + dt
+        while self.time < end:
+            with self._lock:
+                turn = self._pending[0] if self._pending and self._pending[0] <= end else None
+            target = end if turn is None else max(turn, self.time)
+            self._advance(target)
+            if turn is not None:
+                with self._lock:
+                    self._pending.popleft()
+                self._tap()
+
+    def _tap(self) -> None:
+        """
+        Applies a click: goes through the menu screens, or turns the ball.
+        """
+        if self.screen == "game_over":
+            # The rounds started from the menus go to the right, as when the bot starts
+            self.direction = Direction.RIGHT
+            self._new_round()
+            self.screen = "start"
+        elif self.screen == "start":
+            self.screen = None
+            self._round_start = self.time
+            self._round_clicks = self.clicks
+        else:
+            # The direction also changes while falling, so it stays in sync with the clicks of the bot
+            self.direction = Direction.LEFT if self.direction == Direction.RIGHT else Direction.RIGHT
+
+    def _advance(self, target: float) -> None:
+        """
+        Moves the ball until the specified time, by steps of less than half a tile.
+        """
+        while self.time < target:
+            if self.screen is not None:
+                # The ball waits for a click
+                self.time = target
+                return
+            if self._fall_end is not None:
+                if target < self._fall_end:
+                    self.time = target
+                    return
+                self.time = self._fall_end
+                if self._game_over_image is not None:
+                    self.screen = "game_over"
+                else:
+                    self._new_round()
+                continue
+
+            speed = self.speed
+            dt = min(target - self.time, 0.5 / speed)
+            if self.direction == Direction.RIGHT:
+                self.u += speed * dt
+            else:
+                self.v += speed * dt
+            self.time += dt
+
+            tile = (int(self.u), int(self.v))
+            k = tile[0] + tile[1]
+            self._extend_path(k + 1)
+            if self.path[k] != tile:
+                self._end_round(False)
+            elif self.max_round_tiles is not None and k >= self.max_round_tiles:
+                self._end_round(True)
+            elif k in self.diamond_tiles:
+                self.diamond_tiles.discard(k)
+                self.diamonds += 1
+
+    def render(self, frame: np.ndarray | None = None) -> np.ndarray:
+        """
+        Draws the current state of the game.
+
+        Parameters
+        ----------
+        `frame` : `np.ndarray | None`, optional
+            The BGR frame to draw in. If `None`, the internal frame is used, by default `None`
+
+        Returns
+        -------
+        `np.ndarray`
+            The drawn frame.
+        """
+        frame = self._frame if frame is None else frame
+        if self.screen == "game_over":
+            np.copyto(frame, self._game_over_image)
+            return frame
+        np.copyto(frame, self._background)
+        s = self.tile_size
+        dx, dy = s * COS30, s * SIN30
+        # The camera follows the ball vertically and is fixed horizontally
+        ball_sum = self.u + self.v
+        origin_x, origin_y = self.width / 2, self.ball_screen_y + ball_sum * dy
+
+        first = max(0, int(ball_sum - (self.height - self.ball_screen_y + self.depth) / dy) - 1)
+        last = int(ball_sum + self.ball_screen_y / dy) + 2
+        self._extend_path(last + 1)
+
+        # Far tiles first, so the nearer blocks hide them
+        for k in range(last, first - 1, -1):
+            i, j = self.path[k]
+            bx, by = origin_x + (i - j - self._center) * dx, origin_y - (i + j) * dy
+            bottom, right, top, left = (bx, by), (bx + dx, by - dy), (bx, by - 2 * dy), (bx - dx, by - dy)
+            down = self.depth
+            # A side shared with the previous tile of the path is hidden
+            previous = self.path[k - 1] if k > 0 else None
+            if previous != (i - 1, j):
+                self._fill(frame, (left, bottom, (bottom[0], bottom[1] + down), (left[0], left[1] + down)), LEFT_COLOR)
+            if previous != (i, j - 1):
+                self._fill(frame, (bottom, right, (right[0], right[1] + down), (bottom[0], bottom[1] + down)), RIGHT_COLOR)
+            self._fill(frame, (bottom, right, top, left), TOP_COLOR)
+            if k in self.diamond_tiles:
+                self._draw_diamond(frame, bx, by - dy - 0.7 * s)
+
+        if self._fall_end is None:
+            x = origin_x + (self.u - self.v - self._center) * dx
+            y = self.ball_screen_y - 0.5 * self.ball_radius
+            center = (round(x), round(y))
+            cv2.circle(frame, center, self.ball_radius, BALL_COLOR, thickness=-1, lineType=cv2.LINE_AA)
+            highlight = (round(x - self.ball_radius / 3), round(y - self.ball_radius / 3))
+            cv2.circle(frame, highlight, max(1, self.ball_radius // 4), BALL_HIGHLIGHT_COLOR, thickness=-1, lineType=cv2.LINE_AA)
+        return frame
+
+    def _draw_diamond(self, frame: np.ndarray, x: float, y: float) -> None:
+        half_width, half_height = 0.37 * self.tile_size, 0.4 * self.tile_size
+        top, bottom = (x, y - half_height), (x, y + half_height)
+        left, right = (x - half_width, y - 0.2 * half_height), (x + half_width, y - 0.2 * half_height)
+        self._fill(frame, (top, left, bottom), DIAMOND_LIGHT_COLOR)
+        self._fill(frame, (top, right, bottom), DIAMOND_DARK_COLOR)
+
+    @staticmethod
+    def _fill(frame: np.ndarray, points, color: tuple[int, int, int]) -> None:
+        cv2.fillConvexPoly(frame, np.round(np.array(points)).astype(np.int32), color)
+
+    def read(self) -> np.ndarray | None:
+        """
+        Advances the game by one frame and draws it.
+
+        Returns
+        -------
+        `np.ndarray | None`
+            The frame, reused by the next read, or `None` once `max_rounds` rounds are played.
+        """
+        if self.max_rounds is not None and len(self.rounds) >= self.max_rounds:
+            return None
+        if self.realtime:
+            now = perf_counter()
+            if self._clock_start is None:
+                self._clock_start = now - self.time
+            # Pace the frames at the frame rate, then catch up with the real clock
+            next_frame = self._clock_start + (self.frames + 1) / self.fps
+            if next_frame > now:
+                sleep(next_frame - now)
+            self.step(perf_counter() - self._clock_start - self.time)
+        else:
+            self.step(1 / self.fps)
+        self.frames += 1
+        return self.render()
+
+
+class SimulatorActuator(Actuator):
+    """
+    Sends the clicks to a simulator.
+    """
+
+    def __init__(self, simulator: ZigZagSimulator, history: int = 1000) -> None:
+        super().__init__(history)
+        self.simulator = simulator
+
+    def _deliver(self, x: int | None, y: int | None) -> None:
+        self.simulator.click()
+
+
+@lru_cache(maxsize=1)
+def get_simulator() -> ZigZagSimulator:
+    """
+    Gets the simulator configured in the configuration, shared by the frame source and the actuator.
+    """
+    return ZigZagSimulator()
+
+
+if __name__ == "__main__":
+    # Play perfectly by turning on every corner tile, until 'q' is pressed
+    simulator = ZigZagSimulator(realtime=True)
+    while cv2.waitKey(1) != ord("q"):
+        k = simulator.distance
+        simulator._extend_path(k + 2)
+        corner = (simulator.path[k + 1][0] > simulator.path[k][0]) != (simulator.direction == Direction.RIGHT)
+        if (simulator.screen is not None or simulator.alive and corner) and not simulator._pending:
+            simulator.click()
+        cv2.imshow("ZigZag Simulator", simulator.read())
+    cv2.destroyAllWindows()
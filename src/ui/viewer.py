@@ -0,0 +1,359 @@
+import multiprocessing as mp
+import os
+from collections import deque
+from multiprocessing import shared_memory
+from time import perf_counter, sleep
+import cv2
+import numpy as np
+
+from ..config import VIEWER_FPS, VIEWER_SCALE, VIEWER_SLOTS
+from ..pipeline.instrumentation import Instrumentation, create_instrumentation
+from .drawing_manager import DrawingManager
+
+MAX_OVERLAY_LINES = 64
+
+OVERLAY_DTYPE = np.dtype([
+    ("seq", np.int64),  # Sequence number of the slot, -1 while it is written
+    ("index", np.int64),  # Index of the frame
+    ("frame_size", np.int32, 2),  # Full resolution (width, height) of the frame
+    ("ball", np.int32, 3),  # Ball (x, y, r)
+    ("ball_detected", np.bool_),
+    ("fps", np.float32),
+    ("n_lines", np.int32),
+    ("lines", np.int32, (MAX_OVERLAY_LINES, 4)),  # Path edges lines (x1, y1, x2, y2)
+    ("n_probes", np.int32),
+    ("probes", np.int32, (2, 2)),  # Action probes (x, y)
+])
+
+
+class FrameRing:
+    """
+    Ring of downscaled frames and their records (by default, overlay records) in shared memory.
+
+    Each slot is protected by its sequence number, set to -1 while the slot is written,
+    so the reader can detect a frame overwritten during its copy.
+    """
+
+    def __init__(self, shape: tuple[int, int, int], slots: int, name: str | None = None,
+                 dtype: np.dtype = OVERLAY_DTYPE) -> None:
+        """
+        Parameters
+        ----------
+        `shape` : `tuple[int, int, int]`
+            The shape of the preview frames.
+        `slots` : `int`
+            The number of slots of the ring.
+        `name` : `str | None`, optional
+            The name of an existing ring to attach to. If `None`, a new ring is created, by default `None`
+        `dtype` : `np.dtype`, optional
+            The structured type of the records, with an int64 `seq` field, by default `OVERLAY_DTYPE`
+        """
+        self.shape = shape
+        self.slots = slots
+        frames_size = slots * int(np.prod(shape))
+        size = frames_size + slots * dtype.itemsize + 8
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.name = self.shm.name
+        self.frames = np.ndarray((slots, *shape), dtype=np.uint8, buffer=self.shm.buf)
+        self.overlays = np.ndarray((slots,), dtype=dtype, buffer=self.shm.buf, offset=frames_size)
+        self.head = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=frames_size + slots * dtype.itemsize)
+        if self.owner:
+            self.overlays["seq"] = -1
+            self.head[0] = -1
+
+    def begin_write(self) -> tuple[int, np.ndarray, np.ndarray]:
+        """
+        Reserves the next slot of the ring for writing.
+
+        Returns
+        -------
+        `tuple[int, np.ndarray, np.ndarray]`
+            The sequence number, the frame and the overlay record of the slot.
+        """
+        seq = int(self.head[0]) + 1
+        slot = seq % self.slots
+        self.overlays[slot]["seq"] = -1
+        return seq, self.frames[slot], self.overlays[slot:slot + 1]
+
+    def end_write(self, seq: int) -> None:
+        """
+        Publishes a written slot.
+        """
+        self.overlays[seq % self.slots]["seq"] = seq
+        self.head[0] = seq
+
+    def read_latest(self, last_seq: int) -> tuple[int, np.ndarray, np.void] | None:
+        """
+        Copies the latest published slot if it is newer than the last one read.
+
+        Parameters
+        ----------
+        `last_seq` : `int`
+            The sequence number of the last slot read.
+
+        Returns
+        -------
+        `tuple[int, np.ndarray, np.void] | None`
+            The sequence number, the frame and the overlay record copies, or `None` if there is no new consistent slot.
+        """
+        seq = int(self.head[0])
+        if seq <= last_seq:
+            return None
+        latest = self.read(seq)
+        return None if latest is None else (seq, *latest)
+
+    def read(self, seq: int, frame: np.ndarray | None = None) -> tuple[np.ndarray, np.void] | None:
+        """
+        Copies a slot if it still holds the specified sequence number.
+
+        Parameters
+        ----------
+        `seq` : `int`
+            The sequence number to read.
+        `frame` : `np.ndarray | None`, optional
+            The array to copy the frame into. If `None`, a new array is allocated, by default `None`
+
+        Returns
+        -------
+        `tuple[np.ndarray, np.void] | None`
+            The frame and the overlay record copies, or `None` if the slot was overwritten.
+        """
+        slot = seq % self.slots
+        if frame is None:
+            frame = self.frames[slot].copy()
+        else:
+            np.copyto(frame, self.frames[slot])
+        overlay = self.overlays[slot].copy()
+        if overlay["seq"] != seq or self.overlays[slot]["seq"] != seq:
+            return None
+        return frame, overlay
+
+    def close(self) -> None:
+        """
+        Detaches from the ring, and frees it if it was created by this instance.
+        """
+        del self.frames, self.overlays, self.head
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def draw_overlay(frame: np.ndarray, overlay: np.void) -> None:
+    """
+    Draws an overlay record on a preview frame, scaling its full resolution coordinates to the preview size.
+
+    Parameters
+    ----------
+    `frame` : `np.ndarray`
+        The preview frame to draw on.
+    `overlay` : `np.void`
+        The overlay record of the frame.
+    """
+    width, height = overlay["frame_size"]
+    sx, sy = frame.shape[1] / max(width, 1), frame.shape[0] / max(height, 1)
+
+    if overlay["ball_detected"]:
+        x, y, r = overlay["ball"]
+        DrawingManager.draw_ball(frame, int(x * sx), int(y * sy), max(1, int(r * sx)))
+    n_lines = overlay["n_lines"]
+    if n_lines:
+        lines = (overlay["lines"][:n_lines] * (sx, sy, sx, sy)).astype(np.int32)
+        DrawingManager.draw_path_edges(frame, lines.reshape(-1, 1, 4))
+    for x, y in overlay["probes"][:overlay["n_probes"]]:
+        cv2.circle(frame, (int(x * sx), int(y * sy)), radius=3, color=(0, 0, 255), thickness=-1)
+    DrawingManager.draw_fps(frame, float(overlay["fps"]))
+
+
+def run_viewer(ring_name: str, shape: tuple[int, int, int], slots: int, max_fps: float,
+               stop_event, quit_event, screenshot_event, metrics_name: str | None = None) -> None:
+    """
+    Entry point of the viewer process: displays the latest frame of the ring with its overlay, at most `max_fps` times per second.
+
+    Parameters
+    ----------
+    `ring_name` : `str`
+        The name of the shared memory ring.
+    `shape` : `tuple[int, int, int]`
+        The shape of the preview frames.
+    `slots` : `int`
+        The number of slots of the ring.
+    `max_fps` : `float`
+        The maximum display rate.
+    `stop_event` : `multiprocessing.Event`
+        Set by the bot to stop the viewer.
+    `quit_event` : `multiprocessing.Event`
+        Set by the viewer when the 'q' key is pressed.
+    `screenshot_event` : `multiprocessing.Event`
+        Set by the viewer when the 's' key is pressed.
+    `metrics_name` : `str | None`, optional
+        The base name of the timings files of the drawing & display. If `None`, they are not written, by default `None`
+    """
+    instrumentation = create_instrumentation(metrics_name) if metrics_name else Instrumentation()
+    ring = FrameRing(shape, slots, name=ring_name)
+    last_seq = -1
+    try:
+        while not stop_event.is_set():
+            start = perf_counter()
+            latest = ring.read_latest(last_seq)
+            if latest is not None:
+                last_seq, frame, overlay = latest
+                index = int(overlay["index"])
+                draw_start = perf_counter()
+                draw_overlay(frame, overlay)
+                display_start = instrumentation.record("draw", draw_start, index=index)
+                cv2.imshow("ZigZag Vision", frame)
+                key = cv2.waitKey(1)
+                instrumentation.record("display", display_start, index=index)
+            else:
+                key = cv2.waitKey(1)
+            instrumentation.maybe_dump()
+
+            # Exit when 'q' key is pressed
+            if key == ord("q"):
+                quit_event.set()
+            elif key == ord("s"):
+                screenshot_event.set()
+
+            remaining = 1 / max_fps - (perf_counter() - start)
+            if remaining > 0:
+                sleep(remaining)
+    finally:
+        instrumentation.close()
+        cv2.destroyAllWindows()
+        ring.close()
+
+
+class VisionPublisher:
+    """
+    Publishes the processed frames to a viewer process through a shared memory ring.
+
+    Frames are only published at the preview rate, downscaled, and read without being modified,
+    so the vision window costs almost nothing to the processing and does not change what the detectors see.
+    """
+
+    def __init__(self, max_fps: float = VIEWER_FPS, scale: float = VIEWER_SCALE, slots: int = VIEWER_SLOTS,
+                 metrics_name: str | None = "viewer", on_save=None) -> None:
+        """
+        Parameters
+        ----------
+        `max_fps` : `float`, optional
+            The maximum preview rate, by default `VIEWER_FPS`
+        `scale` : `float`, optional
+            The scale of the preview relative to the first published frame, by default `VIEWER_SCALE`
+        `slots` : `int`, optional
+            The number of slots of the shared memory ring, by default `VIEWER_SLOTS`
+        `metrics_name` : `str | None`, optional
+            The base name of the timings files of the viewer process, by default `"viewer"`
+        `on_save` : `Callable[[], object] | None`, optional
+            Called when 's' is pressed in the viewer. If `None`, a screenshot of the frame is written, by default `None`
+        """
+        self.max_fps = max_fps
+        self.scale = scale
+        self.slots = slots
+        self.metrics_name = metrics_name
+        self.on_save = on_save
+        self.ring = None
+        self.process = None
+        self._stop_event = mp.Event()
+        self._quit_event = mp.Event()
+        self._screenshot_event = mp.Event()
+        self._last_publish = 0.0
+        self._frame_times = deque(maxlen=50)
+
+    @property
+    def quit_requested(self) -> bool:
+        """
+        `True` if the 'q' key was pressed in the viewer.
+        """
+        return self._quit_event.is_set()
+
+    @property
+    def fps(self) -> float:
+        """
+        The average processing frame rate over the last frames.
+        """
+        if len(self._frame_times) < 2:
+            return 0.0
+        return (len(self._frame_times) - 1) / (self._frame_times[-1] - self._frame_times[0])
+
+    def _start(self, frame: np.ndarray) -> None:
+        """
+        Creates the ring for the size of the frame and starts the viewer process.
+        """
+        shape = (max(1, round(frame.shape[0] * self.scale)), max(1, round(frame.shape[1] * self.scale)), 3)
+        self.ring = FrameRing(shape, self.slots)
+        self.process = mp.Process(target=run_viewer, name="viewer", daemon=True,
+                                  args=(self.ring.name, shape, self.slots, self.max_fps,
+                                        self._stop_event, self._quit_event, self._screenshot_event, self.metrics_name))
+        self.process.start()
+
+    def publish(self, frame: np.ndarray, ball: tuple[int, int, int] | None = None, ball_detected: bool = False,
+                lines: np.ndarray | None = None, probes: tuple[tuple[int, int], ...] = (), index: int = 0) -> bool:
+        """
+        Publishes a processed frame and its overlay, unless the previous one was published less than a preview period ago.
+
+        Parameters
+        ----------
+        `frame` : `np.ndarray`
+            The processed frame. It is not modified.
+        `ball` : `tuple[int, int, int] | None`, optional
+            The ball (x, y, r), by default `None`
+        `ball_detected` : `bool`, optional
+            Whether the ball is drawn, by default `False`
+        `lines` : `np.ndarray | None`, optional
+            The path edges lines coming from HoughLinesP, by default `None`
+        `probes` : `tuple[tuple[int, int], ...]`, optional
+            The (x, y) action probes, by default `()`
+        `index` : `int`, optional
+            The index of the frame, by default `0`
+
+        Returns
+        -------
+        `bool`
+            `True` if the frame was published; otherwise, `False`.
+        """
+        now = perf_counter()
+        self._frame_times.append(now)
+        if self._screenshot_event.is_set():
+            self._screenshot_event.clear()
+            if self.on_save is not None:
+                self.on_save()
+            else:
+                cv2.imwrite(os.path.join("images", "screenshot.jpg"), frame)
+        if now - self._last_publish < 1 / self.max_fps:
+            return False
+        self._last_publish = now
+
+        if self.ring is None:
+            self._start(frame)
+        seq, preview, overlay = self.ring.begin_write()
+        cv2.resize(frame, (preview.shape[1], preview.shape[0]), dst=preview, interpolation=cv2.INTER_NEAREST)
+
+        overlay["index"] = index
+        overlay["frame_size"] = (frame.shape[1], frame.shape[0])
+        overlay["ball"] = ball if ball is not None else (0, 0, 0)
+        overlay["ball_detected"] = ball_detected and ball is not None
+        overlay["fps"] = self.fps
+        n_lines = 0 if lines is None else min(len(lines), MAX_OVERLAY_LINES)
+        overlay["n_lines"] = n_lines
+        if n_lines:
+            overlay["lines"][0, :n_lines] = lines.reshape(-1, 4)[:n_lines]
+        overlay["n_probes"] = len(probes)
+        if probes:
+            overlay["probes"][0, :len(probes)] = probes
+        self.ring.end_write(seq)
+        return True
+
+    def close(self) -> None:
+        """
+        Stops the viewer process and frees the ring.
+        """
+        self._stop_event.set()
+        if self.process is not None:
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
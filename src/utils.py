@@ -27,6 +27,33 @@ def crop_centered(frame: np.ndarray, center_ratio: float, crop_ratio: float) ->
     return frame[crop_y1:crop_y2, :], crop_y1, crop_y2
 
 
+def crop_rows(height: int, center_ratio: float, crop_ratio: float, resize_factor: int = 1) -> tuple[int, int]:
+    """
+    Computes the full resolution rows of the region `crop_centered` would keep after downscaling the frame by `resize_factor`.
+
+    Parameters
+    ----------
+    `height` : `int`
+        The height of the full resolution frame.
+    `center_ratio` : `float`
+        The ratio of the height of the frame defining the center.
+    `crop_ratio` : `float`
+        The ratio of the height of the frame to crop.
+    `resize_factor` : `int`, optional
+        The downscale factor applied before cropping, by default `1`
+
+    Returns
+    -------
+    `tuple[int, int]`
+        The y-coordinates of the top and bottom of the region in the full resolution frame, aligned on `resize_factor`.
+    """
+    # Same rounding as cv2.resize for the downscaled height
+    resized_height = round(height / resize_factor)
+    crop_y1 = int(resized_height * (center_ratio - crop_ratio / 2))
+    crop_y2 = int(resized_height * (center_ratio + crop_ratio / 2))
+    return crop_y1 * resize_factor, crop_y2 * resize_factor
+
+
 def isometric_front_point(center_pos: tuple[int, int], horiz_dist: int, direction: Direction) -> tuple[int, int]:
     """
     Computes the position of the point isometrically in front of the ball in the specified direction based on the horizontal distance from the center.
@@ -55,3 +82,50 @@ def isometric_front_point(center_pos: tuple[int, int], horiz_dist: int, directio
         raise ValueError(f"Invalid direction: {direction}. Expected LEFT or RIGHT.")
     iso_y = y - horiz_dist * math.tan(math.radians(30)) / 2
     return int(iso_x), int(iso_y)
+
+
+def segments_near_boxes(lines: np.ndarray | None, boxes: np.ndarray, distance: float = 0) -> np.ndarray:
+    """
+    Checks for each box if any line segment passes within a distance of it, without drawing the segments.
+
+    The boxes are grown by `distance` on every side and clipped against every segment (Liang-Barsky),
+    so the distance is measured along the axes.
+
+    Parameters
+    ----------
+    `lines` : `np.ndarray | None`
+        The line segments (x1, y1, x2, y2), as returned by HoughLinesP (shape (N, 1, 4) or (N, 4)).
+    `boxes` : `np.ndarray`
+        The boxes (x_min, y_min, x_max, y_max), inclusive pixel coordinates (shape (M, 4)).
+    `distance` : `float`, optional
+        The maximum distance between a segment and a box, in pixels, by default `0`
+
+    Returns
+    -------
+    `np.ndarray`
+        A boolean array of shape (M,), `True` where a segment passes within the distance of the box.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if lines is None or len(lines) == 0:
+        return np.zeros(len(boxes), dtype=bool)
+
+    segments = np.asarray(lines, dtype=np.float32).reshape(-1, 1, 4)
+    x1, y1, x2, y2 = segments[..., 0], segments[..., 1], segments[..., 2], segments[..., 3]
+    dx, dy = x2 - x1, y2 - y1
+    x_min, y_min = boxes[:, 0] - distance, boxes[:, 1] - distance
+    x_max, y_max = boxes[:, 2] + distance, boxes[:, 3] + distance
+
+    # Clip the segments (N, 1) against the boxes (M,) with the parametric form p(t) = p1 + t * d, t in [0, 1]
+    t0 = np.zeros((segments.shape[0], boxes.shape[0]), dtype=np.float32)
+    t1 = np.ones_like(t0)
+    inside = np.ones_like(t0, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x1 - x_min), (dx, x_max - x1), (-dy, y1 - y_min), (dy, y_max - y1)):
+            p = np.broadcast_to(p, t0.shape)
+            q = np.broadcast_to(q, t0.shape)
+            ratio = q / p
+            # Segments parallel to this box side and outside of it never cross the box
+            inside &= ~((p == 0) & (q < 0))
+            t0 = np.where(p < 0, np.maximum(t0, ratio), t0)
+            t1 = np.where(p > 0, np.minimum(t1, ratio), t1)
+    return np.any(inside & (t0 <= t1), axis=0)
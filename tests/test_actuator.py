@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from src.control.actuator import AsyncActuator, RecordingActuator
+
+
+class FailingActuator(RecordingActuator):
+    """
+    Recording actuator whose deliveries fail after a number of clicks.
+    """
+
+    def __init__(self, succeeding: int) -> None:
+        super().__init__()
+        self.succeeding = succeeding
+
+    def _deliver(self, x, y):
+        if self.clicks >= self.succeeding:
+            raise OSError("Click rejected")
+
+
+def test_recording_actuator_keeps_the_click_order():
+    actuator = RecordingActuator(history=3)
+    for i in range(5):
+        actuator.click(i, -i)
+    assert actuator.clicks == 5
+    assert [(r.x, r.y) for r in actuator.records] == [(2, -2), (3, -3), (4, -4)]
+
+
+def test_recording_actuator_timestamps_the_delivery():
+    actuator = RecordingActuator(delay=0.02)
+    delivered = []
+    record = actuator.click(1, 2, on_delivered=delivered.append)
+    assert delivered == [record]
+    assert record.delivered_at >= record.enqueued_at
+    assert 0.02 <= record.latency < 0.5
+
+
+def test_clicks_default_to_the_actuator_position():
+    actuator = RecordingActuator()
+    actuator.position = (10, 20)
+    record = actuator.click()
+    assert (record.x, record.y) == (10, 20)
+    record = actuator.click(3, 4)
+    assert (record.x, record.y) == (3, 4)
+
+
+def test_async_actuator_returns_before_the_delivery():
+    actuator = AsyncActuator(RecordingActuator(delay=0.05))
+    record = actuator.click(1, 1)
+    assert record.delivered_at is None and record.latency is None
+    assert actuator.flush(timeout=1)
+    assert record.latency >= 0.05
+    actuator.close()
+
+
+def test_async_actuator_delivers_in_order_on_its_thread():
+    actuator = AsyncActuator(RecordingActuator(delay=0.001))
+    threads = []
+    records = [actuator.click(i, i, on_delivered=lambda r: threads.append(threading.current_thread().name))
+               for i in range(20)]
+    assert actuator.flush(timeout=1)
+    assert [(r.x, r.y) for r in actuator.records] == [(i, i) for i in range(20)]
+    assert list(actuator.records) == records
+    assert actuator.clicks == 20 and threads == ["actuator"] * 20
+    assert all(a.delivered_at <= b.delivered_at for a, b in zip(records, records[1:]))
+    actuator.close()
+
+
+def test_async_actuator_close_delivers_the_pending_clicks():
+    backend = RecordingActuator(delay=0.01)
+    actuator = AsyncActuator(backend)
+    for i in range(10):
+        actuator.click(i, i)
+    assert actuator.pending > 0
+    actuator.close()
+    assert actuator.pending == 0
+    assert backend.clicks == 10
+    assert all(r.delivered_at is not None for r in backend.records)
+
+
+def test_async_actuator_raises_the_delivery_error():
+    actuator = AsyncActuator(FailingActuator(succeeding=2))
+    for i in range(3):
+        actuator.click(i, i)
+    assert actuator.flush(timeout=1)
+    assert actuator.clicks == 2
+    with pytest.raises(OSError, match="Click rejected"):
+        actuator.click()
+    actuator.close()
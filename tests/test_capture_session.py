@@ -0,0 +1,162 @@
+import ctypes
+import importlib
+import sys
+import types
+
+import numpy as np
+import pytest
+
+TITLE_BAR = 30  # Twice SM_CYMENUCHECK
+BORDER = 4  # SM_CYFRAME
+SM_CYMENUCHECK, SM_CYFRAME = 71, 33
+
+
+class FakeGdi32:
+    """
+    gdi32 keeping the DIB sections in ctypes buffers, and counting the live objects.
+    """
+
+    def __init__(self) -> None:
+        self.handles = 100
+        self.live = set()
+        self.sections = {}  # DIB section handle -> buffer
+        self.selected = {}  # Memory DC handle -> selected object
+
+    def _new(self) -> int:
+        self.handles += 1
+        self.live.add(self.handles)
+        return self.handles
+
+    def CreateCompatibleDC(self, dc):
+        return self._new()
+
+    def CreateDIBSection(self, dc, bmi, usage, bits, section, offset):
+        header = bmi._obj.bmiHeader
+        buffer = (ctypes.c_ubyte * (header.biWidth * abs(header.biHeight) * 4))()
+        handle = self._new()
+        self.sections[handle] = buffer
+        bits._obj.value = ctypes.addressof(buffer)
+        return handle
+
+    def SelectObject(self, dc, obj):
+        previous = self.selected.get(dc, 1)
+        self.selected[dc] = obj
+        return previous
+
+    def DeleteObject(self, obj):
+        self.live.discard(obj)
+        self.sections.pop(obj, None)
+        return 1
+
+    def DeleteDC(self, dc):
+        self.live.discard(dc)
+        self.selected.pop(dc, None)
+        return 1
+
+    def GdiFlush(self):
+        return 1
+
+
+class FakeUser32:
+    """
+    user32 drawing an increasing gray level into the bitmap selected in the DC at each `PrintWindow`.
+    """
+
+    def __init__(self, gdi32: FakeGdi32) -> None:
+        self.gdi32 = gdi32
+        self.prints = 0
+
+    def SetProcessDPIAware(self):
+        return 1
+
+    def PrintWindow(self, hwnd, dc, flags):
+        self.prints += 1
+        section = self.gdi32.sections[self.gdi32.selected[dc]]
+        ctypes.memset(section, self.prints % 256, len(section))
+        return 1
+
+
+@pytest.fixture
+def window(monkeypatch):
+    """
+    Stubs the Windows modules with a 400x300 window, and imports the capture modules against them.
+    """
+    state = {"rect": (100, 50, 500, 350), "dcs": 0}
+    gdi32 = FakeGdi32()
+    user32 = FakeUser32(gdi32)
+
+    win32gui = types.ModuleType("win32gui")
+    win32gui.FindWindow = lambda class_name, window_name: 1
+    win32gui.GetWindowRect = lambda hwnd: state["rect"]
+
+    def get_window_dc(hwnd):
+        state["dcs"] += 1
+        return 10
+
+    def release_dc(hwnd, dc):
+        state["dcs"] -= 1
+        return 1
+
+    win32gui.GetWindowDC = get_window_dc
+    win32gui.ReleaseDC = release_dc
+    win32con = types.ModuleType("win32con")
+    win32con.SM_CYMENUCHECK, win32con.SM_CYFRAME = SM_CYMENUCHECK, SM_CYFRAME
+    win32api = types.ModuleType("win32api")
+    win32api.GetSystemMetrics = lambda index: {SM_CYMENUCHECK: TITLE_BAR // 2, SM_CYFRAME: BORDER}[index]
+
+    for module in (win32gui, win32con, win32api):
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    monkeypatch.setattr(ctypes, "windll", types.SimpleNamespace(user32=user32, gdi32=gdi32), raising=False)
+    for name in ("src.capture.screen_capture", "src.capture.capture_session"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module("src.capture.capture_session")
+    for name in ("src.capture.screen_capture", "src.capture.capture_session"):
+        # Forget the modules imported against the stubs after the test
+        monkeypatch.setitem(sys.modules, name, sys.modules[name])
+
+    return types.SimpleNamespace(CaptureSession=module.CaptureSession, gdi32=gdi32, user32=user32, state=state)
+
+
+def test_capture_reuses_the_session_buffers(window):
+    session = window.CaptureSession("ZigZag", gdi32=window.gdi32)
+    first = session.capture()
+    for i in range(2, 51):
+        frame = session.capture()
+        assert session.allocations == 1
+        assert frame is first
+        assert (frame == i).all()
+
+    assert first.shape == (300 - TITLE_BAR - 2 * BORDER, 400 - 2 * BORDER, 3)
+    assert first.flags["C_CONTIGUOUS"]
+    assert session.frames == 50
+    assert session.screen_point(0, 0) == (100 + BORDER, 50 + TITLE_BAR + BORDER)
+
+
+def test_capture_reallocates_once_after_a_resize(window):
+    session = window.CaptureSession("ZigZag", gdi32=window.gdi32)
+    for _ in range(5):
+        session.capture()
+    objects = len(window.gdi32.live)
+
+    window.state["rect"] = (100, 50, 420, 290)
+    for _ in range(5):
+        frame = session.capture()
+        assert session.allocations == 2
+
+    assert frame.shape == (240 - TITLE_BAR - 2 * BORDER, 320 - 2 * BORDER, 3)
+    # The previous DC & DIB section are released
+    assert len(window.gdi32.live) == objects
+    assert window.state["dcs"] == 1
+
+    session.close()
+    assert not window.gdi32.live
+    assert window.state["dcs"] == 0
+
+
+def test_capture_only_copies_the_region_of_interest(window):
+    session = window.CaptureSession("ZigZag", roi=lambda height: (100, 150), gdi32=window.gdi32)
+    frame = session.capture()
+
+    assert (frame[100:150] == 1).all()
+    assert not frame[:100].any() and not frame[150:].any()
+    assert np.shares_memory(session.capture(), frame)
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.config import COLOR_RANGES
+from src.constants import ColorClass
+from src.detection.colors import ColorClassifier
+from src.detection.detector import Detector
+from src.detection.preprocessor import FramePreprocessor
+
+# Detections of the default parameters, the same as with the diamonds masked by the exact HSV range
+SAMPLE_DETECTIONS = {
+    "images/game_sample_1.jpg": ((160, 578, 16), [
+        (8, 554, 72, 522), (8, 626, 8, 556), (12, 556, 150, 626), (18, 558, 152, 626), (84, 516, 102, 508),
+        (142, 552, 236, 506), (182, 574, 266, 618), (226, 596, 264, 616), (272, 592, 306, 574), (336, 540, 338, 506),
+    ]),
+    "images/game_sample_2.jpg": ((496, 540, 14), [
+        (380, 584, 436, 558), (438, 554, 438, 498), (442, 492, 478, 476), (442, 554, 476, 536), (444, 498, 496, 524),
+        (506, 584, 616, 528), (564, 494, 608, 472), (564, 496, 616, 522), (566, 492, 588, 480), (622, 584, 622, 472),
+    ]),
+    "images/game_sample_3.jpg": ((224, 540, 14), [
+        (92, 584, 188, 538), (190, 536, 190, 472), (212, 530, 228, 524), (216, 584, 328, 528), (220, 584, 436, 474),
+        (224, 520, 312, 476), (436, 584, 436, 516), (438, 510, 498, 480),
+    ]),
+}
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return ColorClassifier(path=None)
+
+
+def exact_classes(bgr: np.ndarray) -> np.ndarray:
+    """
+    Classifies the pixels with the HSV ranges, the class of highest priority first.
+    """
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    labels = np.full(bgr.shape[:2], ColorClass.OTHER.value, dtype=np.uint8)
+    for name, (low, high) in sorted(COLOR_RANGES.items(), key=lambda item: ColorClass[item[0]].value):
+        labels[cv2.inRange(hsv, np.array(low), np.array(high)) > 0] = ColorClass[name].value
+    return labels
+
+
+def test_each_bin_takes_the_class_of_most_of_its_colors(classifier):
+    rng = np.random.default_rng(0)
+    # Random bins, and the bins of the pixels of the classes
+    codes = np.unique(np.concatenate((rng.integers(0, 1 << 16, 2000), *(np.flatnonzero(classifier.table == color_class.value)[::50]
+                                                                        for color_class in ColorClass))))
+    lowest = cv2.cvtColor(codes.astype(np.uint16).view(np.uint8).reshape(-1, 1, 2), cv2.COLOR_BGR5652BGR)
+    offsets = np.array([(b, g, r) for b in range(8) for g in range(4) for r in range(8)], dtype=np.uint8)
+    colors = lowest + offsets[None]
+    labels = exact_classes(colors)
+
+    counts = np.stack([(labels == color_class.value).sum(axis=1) for color_class in ColorClass], axis=1)
+    assigned = counts[np.arange(len(codes)), classifier.table[codes]]
+    assert (assigned == counts.max(axis=1)).all()
+    # The bins are looked up from the colors themselves
+    assert (classifier.classify(colors)[:, 0] == classifier.table[codes]).all()
+
+
+@pytest.mark.parametrize("path", SAMPLE_DETECTIONS)
+def test_detections_on_the_sample_images(path, classifier, monkeypatch):
+    monkeypatch.setattr(Detector, "colors", classifier)
+    frame = cv2.imread(path)
+    ball, lines = SAMPLE_DETECTIONS[path]
+
+    assert tuple(map(int, Detector.detect_ball(frame))) == ball
+    assert sorted(map(tuple, Detector.detect_path_edges(frame).reshape(-1, 4).tolist())) == lines
+
+
+@pytest.mark.parametrize("resize_factor", [1, 2, 3])
+@pytest.mark.parametrize("path", SAMPLE_DETECTIONS)
+def test_detections_at_each_resize_factor(path, resize_factor, classifier, monkeypatch):
+    monkeypatch.setattr(Detector, "colors", classifier)
+    frame = cv2.imread(path)
+    preprocessor = FramePreprocessor(resize_factor=resize_factor)
+    (x, y, r), lines = SAMPLE_DETECTIONS[path]
+
+    # The ball is found at every factor, within the precision of the band pixels
+    found = Detector.detect_ball(frame, preprocessor.process(frame))
+    assert abs(int(found[0]) - x) <= 2 * resize_factor and abs(int(found[1]) - y) <= 2 * resize_factor
+    assert abs(int(found[2]) - r) <= 2 * resize_factor
+    # The path edges keep about as many lines as at the default factor
+    assert abs(len(Detector.detect_path_edges(frame, preprocessor.process(frame))) - len(lines)) <= 3
@@ -0,0 +1,68 @@
+from src.constants import GameState
+from src.control.action_controller import ActionController
+from src.detection.game_state import GameStateDetector
+from src.main import run_sequential
+from src.pipeline.instrumentation import Instrumentation
+from src.simulation.simulator import SimulatorActuator, ZigZagSimulator
+
+
+class LimitedSource:
+    """
+    Simulator frame source ending after a number of frames.
+    """
+
+    def __init__(self, simulator: ZigZagSimulator, frames: int) -> None:
+        self.simulator = simulator
+        self.frames = frames
+
+    def read(self):
+        self.frames -= 1
+        return self.simulator.read() if self.frames >= 0 else None
+
+    def screen_point(self, x, y):
+        return None
+
+    def close(self):
+        pass
+
+
+def running_simulator() -> ZigZagSimulator:
+    """
+    Simulator whose start screen was already clicked, as the bot does before processing.
+    """
+    simulator = ZigZagSimulator(realtime=False)
+    simulator.click()
+    return simulator
+
+
+def test_a_game_running_at_start_is_played():
+    simulator = running_simulator()
+    detector = GameStateDetector()
+    states = [detector.update(simulator.read(), None, False, i / 60)[0] for i in range(10)]
+
+    assert states[0] == GameState.UNKNOWN
+    assert states[-1] == GameState.PLAYING
+    assert detector.rounds == 1
+    assert detector.clicks == 0
+
+
+def test_the_fall_after_a_lost_ball_is_not_a_round():
+    simulator = running_simulator()
+    detector = GameStateDetector()
+    detector.state = GameState.PLAYING
+    states = [detector.update(simulator.read(), None, True, i / 60)[0] for i in range(10)]
+
+    # The screen still moves, but a menu must be seen before the next round
+    assert GameState.PLAYING not in states
+    assert detector.rounds == 0
+
+
+def test_the_bot_plays_the_round_running_at_start(monkeypatch):
+    simulator = running_simulator()
+    monkeypatch.setattr(ActionController, "actuator", SimulatorActuator(simulator))
+    ActionController.timing.reset()
+    run_sequential(LimitedSource(simulator, 600), instrumentation=Instrumentation(), game_state=GameStateDetector())
+
+    assert not simulator.rounds
+    assert simulator.clicks > 5
+    assert simulator.distance > 20
@@ -0,0 +1,24 @@
+import cv2
+
+from src.pipeline.recorder import SessionRecorder
+
+
+def test_the_ring_is_created_on_the_first_frame():
+    recorder = SessionRecorder(output_dir="unused")
+    assert recorder.ring is None and recorder.process is None
+    assert not recorder.save()
+    recorder.close()
+
+
+def test_the_ring_memory_is_capped():
+    frame = cv2.imread("images/game_sample_1.jpg")
+    recorder = SessionRecorder(seconds=5, fps=60, scale=0.5, output_dir="unused", max_memory=16)
+    try:
+        assert recorder.record(frame, 0.0, 0)
+        assert recorder.ring.frames.nbytes <= 16 * 2**20
+        assert recorder.slots < 5 * 60
+        # Fewer frames per second are recorded, so the ring still holds about the whole duration
+        recorded = 1 + sum(recorder.record(frame, i / 60, i) for i in range(1, 5 * 60))
+        assert abs(recorded - recorder.slots) <= 0.1 * recorder.slots + 1
+    finally:
+        recorder.close()